@@ -0,0 +1,65 @@
+import asyncio
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+from app.models.schemas import SummaryEntry, SummaryListResponse, PurgeResponse
+from app.api.dependencies import AdminTokenDep, PDFRendererDep, PromptRegistryDep, SummaryStoreDep
+from app.services.llm_executor import llm_executor
+from app.utils.resilience import circuit_breakers
+from app.utils.singleflight import singleflight_stats
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+@router.get("/summaries", response_model=SummaryListResponse)
+async def list_summaries(
+    summary_store: SummaryStoreDep,
+    _admin: AdminTokenDep,
+    company_code: Optional[str] = None
+):
+    """保存済み要約の一覧を取得"""
+    try:
+        entries = await asyncio.to_thread(summary_store.list_entries, company_code)
+        return SummaryListResponse(
+            success=True,
+            entries=[SummaryEntry(**entry) for entry in entries]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/summaries", response_model=PurgeResponse)
+async def purge_summaries(
+    summary_store: SummaryStoreDep,
+    _admin: AdminTokenDep,
+    company_code: Optional[str] = None,
+    expired_only: bool = False
+):
+    """保存済み要約を削除（企業コード・期限切れのみで絞り込み可能）"""
+    try:
+        deleted = await asyncio.to_thread(summary_store.purge, company_code, expired_only)
+        return PurgeResponse(success=True, deleted=deleted)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/llm-executor")
+async def llm_executor_stats(_admin: AdminTokenDep):
+    """LLM実行器の待ち行列・待ち時間の統計"""
+    return llm_executor.stats()
+
+@router.get("/pdf-renderer")
+async def pdf_renderer_stats(pdf_renderer: PDFRendererDep, _admin: AdminTokenDep):
+    """PDF生成ワーカーの待ち行列とレポートキャッシュの統計"""
+    return pdf_renderer.stats()
+
+@router.get("/singleflight")
+async def singleflight_statistics(_admin: AdminTokenDep):
+    """同時実行の重複排除の統計（実行数・合流した呼び出し数）"""
+    return singleflight_stats()
+
+@router.get("/circuit-breakers")
+async def circuit_breaker_states(_admin: AdminTokenDep):
+    """上流ホストごとのサーキットブレーカーの状態（closed / half_open / open）と失敗数"""
+    return circuit_breakers.stats()
+
+@router.get("/prompts")
+async def prompt_templates(prompt_registry: PromptRegistryDep, _admin: AdminTokenDep):
+    """読み込み済みプロンプトの版（SHA-256）・プレースホルダー・固定部分のトークン数"""
+    return prompt_registry.describe()
@@ -1,13 +1,29 @@
-from fastapi import Depends, HTTPException, status
-from typing import Annotated
+from fastapi import Depends, Header, HTTPException, Request, status
+from typing import Annotated, Awaitable, List, Optional, Sequence, Tuple, TypeVar
+import asyncio
+import hmac
+import ipaddress
 import logging
+import math
+import time
 from app.config import settings
+from app.services.company_directory import CompanyDirectory
 from app.services.company_service import CompanyService
 from app.services.solution_service import SolutionService
 from app.services.gemini_service import GeminiService
+from app.services.summary_store import SummaryStore
+from app.services.job_runner import JobRunner
+from app.services.pdf_renderer import PDFRenderer
+from app.services.prompt_registry import PromptRegistry
+from app.services.quota_governor import QuotaExceeded
+from app.services.container import container
+from app.utils.resilience import CircuitOpenError
+from app.utils.ttl_cache import TTLCache, create_ttl_cache
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 # API Key validation
 async def verify_api_key():
     """Google API キーの検証"""
@@ -19,30 +35,197 @@ async def verify_api_key():
         )
     return True
 
-# Service dependencies
+async def verify_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """管理APIトークンの検証（ADMIN_API_TOKEN 未設定時は管理APIを使えない）"""
+    if not settings.ADMIN_API_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="管理APIは無効です（ADMIN_API_TOKEN を設定してください）"
+        )
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, settings.ADMIN_API_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="管理APIトークンが不正です"
+        )
+    return True
+
+# Service dependencies（起動時に生成した共有インスタンスを返す）
+def _gemini_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail="Gemini サービスを利用できません（GOOGLE_API_KEY を確認してください）"
+    )
+
 async def get_company_service() -> CompanyService:
     """CompanyServiceの依存性注入"""
-    return CompanyService()
+    await container.startup()
+    if container.company_service is None:
+        raise _gemini_unavailable()
+    return container.company_service
 
 async def get_solution_service() -> SolutionService:
     """SolutionServiceの依存性注入"""
-    return SolutionService()
+    await container.startup()
+    return container.solution_service
 
 async def get_gemini_service() -> GeminiService:
     """GeminiServiceの依存性注入"""
-    return GeminiService()
+    await container.startup()
+    if container.gemini_service is None:
+        raise _gemini_unavailable()
+    return container.gemini_service
+
+async def get_summary_store() -> SummaryStore:
+    """SummaryStoreの依存性注入"""
+    await container.startup()
+    return container.summary_store
+
+async def get_job_runner() -> JobRunner:
+    """JobRunnerの依存性注入"""
+    await container.startup()
+    if container.job_runner is None:
+        raise _gemini_unavailable()
+    return container.job_runner
+
+async def get_company_directory() -> CompanyDirectory:
+    """CompanyDirectoryの依存性注入"""
+    await container.startup()
+    return container.company_directory
+
+async def get_prompt_registry() -> PromptRegistry:
+    """PromptRegistryの依存性注入"""
+    await container.startup()
+    return container.prompt_registry
+
+async def get_pdf_renderer() -> PDFRenderer:
+    """PDFRendererの依存性注入"""
+    await container.startup()
+    return container.pdf_renderer
 
-# Rate limiting (将来的な拡張用)
+# Rate limiting
 class RateLimiter:
-    """レート制限クラス（将来的な実装用）"""
-    def __init__(self, requests_per_minute: int = 10):
+    """クライアントごとのトークンバケットによるレート制限
+
+    1分あたり requests_per_minute 回の割合でトークンが補充され、最大 burst 回まで
+    連続して受け付ける。トークンがなければ 429 と Retry-After を返す。
+    クライアントは接続元アドレスで識別する。接続元が TRUSTED_PROXIES の場合のみ
+    X-Forwarded-For を右端から辿り、最初の信頼しないアドレスを使う。
+    バケットは scope（エンドポイントの種類）ごとに分け、共有キャッシュ
+    （CACHE_BACKEND）に置いて全ワーカーで1つの上限を数える。
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        requests_per_minute: int = settings.RATE_LIMIT_PER_MINUTE,
+        burst: int = settings.RATE_LIMIT_BURST,
+        buckets: Optional[TTLCache] = None,
+        trusted_proxies: Sequence[str] = settings.TRUSTED_PROXIES
+    ):
+        self.scope = scope
         self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        # クライアント → [残りトークン数, 最終更新時刻]（満タンに戻る頃に期限切れ）
+        self.buckets = buckets or create_ttl_cache("rate_limit")
+        self.trusted_proxies = [ipaddress.ip_network(p, strict=False) for p in trusted_proxies]
+    
+    def _is_trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
     
-    async def __call__(self):
-        # 実際のレート制限ロジックはここに実装
-        # 現在はパススルー
+    def _client_key(self, request: Request) -> str:
+        peer = request.client.host if request.client else "unknown"
+        forwarded = request.headers.get("X-Forwarded-For")
+        if not forwarded or not self._is_trusted(peer):
+            return peer
+        # 右端ほど信頼するプロキシが付けた値。クライアントが偽装できるのは左側だけ
+        addresses = [a.strip() for a in forwarded.split(",") if a.strip()]
+        for address in reversed(addresses):
+            if not self._is_trusted(address):
+                return address
+        return addresses[0] if addresses else peer
+    
+    async def __call__(self, request: Request):
+        if self.requests_per_minute <= 0:
+            return True
+        
+        # ワーカー・ホスト間で比較するため壁時計の時刻を使う
+        now = time.time()
+        refill_per_second = self.requests_per_minute / 60
+        key = f"{self.scope}:{self._client_key(request)}"
+
+        def take(bucket: Optional[List[float]]) -> Tuple[List[float], int]:
+            tokens, updated_at = bucket if bucket is not None else (float(self.burst), now)
+            tokens = min(float(self.burst), tokens + max(0.0, now - updated_at) * refill_per_second)
+            if tokens < 1:
+                return [tokens, now], math.ceil((1 - tokens) / refill_per_second)
+            return [tokens - 1, now], 0
+
+        retry_after = await asyncio.to_thread(
+            self.buckets.update, key, take, self.burst / refill_per_second
+        )
+        if retry_after:
+            logger.warning(f"レート制限超過: {key}")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="リクエストが多すぎます。しばらくしてから再試行してください",
+                headers={"Retry-After": str(retry_after)}
+            )
         return True
 
+def quota_exceeded_error(e: QuotaExceeded) -> HTTPException:
+    """Gemini クォータ超過を 429 に変換"""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def upstream_error(e: Exception) -> HTTPException:
+    """上流の障害（ブレーカー開放）を 503、時間予算の超過を 504 に変換"""
+    if isinstance(e, CircuitOpenError):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+
+# Conditional requests
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match が ETag に一致するか（弱い比較）"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+# Client disconnect handling
+async def cancel_on_disconnect(
+    request: Request,
+    awaitable: Awaitable[T],
+    poll_interval: float = 0.5
+) -> T:
+    """クライアントが切断したら処理（実行中のLLM呼び出しを含む）をキャンセル"""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("クライアント切断のため処理をキャンセルします")
+                task.cancel()
+                raise HTTPException(
+                    status_code=499,
+                    detail="クライアントが切断されました"
+                )
+    finally:
+        if not task.done():
+            task.cancel()
+
 # Request validation
 async def validate_company_name(company_name: str):
     """企業名のバリデーション"""
@@ -65,4 +248,16 @@ ApiKeyDep = Annotated[bool, Depends(verify_api_key)]
 CompanyServiceDep = Annotated[CompanyService, Depends(get_company_service)]
 SolutionServiceDep = Annotated[SolutionService, Depends(get_solution_service)]
 GeminiServiceDep = Annotated[GeminiService, Depends(get_gemini_service)]
-RateLimitDep = Annotated[bool, Depends(RateLimiter())]
\ No newline at end of file
+SummaryStoreDep = Annotated[SummaryStore, Depends(get_summary_store)]
+JobRunnerDep = Annotated[JobRunner, Depends(get_job_runner)]
+PDFRendererDep = Annotated[PDFRenderer, Depends(get_pdf_renderer)]
+CompanyDirectoryDep = Annotated[CompanyDirectory, Depends(get_company_directory)]
+PromptRegistryDep = Annotated[PromptRegistry, Depends(get_prompt_registry)]
+AdminTokenDep = Annotated[bool, Depends(verify_admin_token)]
+# 分析系（Gemini を呼ぶ）と参照系（一覧・入力補完）でバケットを分ける
+RateLimitDep = Annotated[bool, Depends(RateLimiter("analysis"))]
+LookupRateLimitDep = Annotated[bool, Depends(RateLimiter(
+    "lookup",
+    requests_per_minute=settings.RATE_LIMIT_LOOKUP_PER_MINUTE,
+    burst=settings.RATE_LIMIT_LOOKUP_BURST
+))]
\ No newline at end of file
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, HTTPException, status
+from app.models.schemas import (
+    CompanySearchRequest,
+    JobAcceptedResponse,
+    JobStatusResponse
+)
+from app.api.dependencies import ApiKeyDep, JobRunnerDep, RateLimitDep
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+@router.post("", response_model=JobAcceptedResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_analysis_job(
+    request: CompanySearchRequest,
+    job_runner: JobRunnerDep,
+    _api_key: ApiKeyDep,
+    _rate_limit: RateLimitDep
+):
+    """企業分析ジョブを登録（結果は GET /jobs/{job_id} で取得）"""
+    job_id = await job_runner.submit(request)
+    return JobAcceptedResponse(job_id=job_id, status="queued")
+
+@router.get("/{job_id}", response_model=JobStatusResponse)
+async def get_analysis_job(job_id: str, job_runner: JobRunnerDep):
+    """ジョブの状態と完了済みステージの結果を取得"""
+    job = await job_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return JobStatusResponse(job_id=job["id"], **{k: v for k, v in job.items() if k != "id"})
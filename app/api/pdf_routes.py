@@ -1,14 +1,53 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
-import io
+from starlette.background import BackgroundTask
+from typing import List, Dict, Any, Optional
+from urllib.parse import quote
 from datetime import datetime
-from app.services.pdf_service import PDFService
+from app.config import settings
 from app.models.schemas import Solution
+from app.api.dependencies import PDFRendererDep, etag_matches
+from app.services.pdf_renderer import PDFRendererBusy
+from app.services.report_cache import report_key
+from app.utils.pdf_spool import SpooledPDF, iter_chunks, remove_spooled
 
 router = APIRouter(prefix="/pdf", tags=["PDF"])
 
+def _busy_error(e: PDFRendererBusy) -> HTTPException:
+    """生成待ちが溢れたときの 503 レスポンス"""
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def _content_disposition(filename: str, fallback: str) -> str:
+    """添付ファイル名のヘッダー（日本語名は RFC 5987 の filename* で渡す）
+
+    filename* に対応しないクライアント向けに ASCII の fallback も付ける。
+    """
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+def _pdf_response(
+    pdf: SpooledPDF,
+    filename: str,
+    fallback: str,
+    headers: Optional[Dict[str, str]] = None,
+    delete: bool = False
+) -> StreamingResponse:
+    """PDFを固定サイズの断片で送信（delete=True なら送信後に一時ファイルを削除）"""
+    return StreamingResponse(
+        iter_chunks(pdf, settings.PDF_STREAM_CHUNK_BYTES),
+        media_type="application/pdf",
+        headers={
+            **(headers or {}),
+            "Content-Length": str(pdf.size),
+            "Content-Disposition": _content_disposition(filename, fallback),
+        },
+        background=BackgroundTask(remove_spooled, pdf) if delete else None
+    )
+
 class PDFGenerateRequest(BaseModel):
     """PDF生成リクエスト"""
     company_data: Dict[str, str]
@@ -21,66 +60,75 @@ class SimplePDFRequest(BaseModel):
     title: str = "レポート"
 
 @router.post("/generate-report")
-async def generate_analysis_report(request: PDFGenerateRequest):
-    """分析レポートPDFを生成"""
+async def generate_analysis_report(
+    request: PDFGenerateRequest,
+    http_request: Request,
+    pdf_renderer: PDFRendererDep
+):
+    """分析レポートPDFを生成（同じ内容なら保存済みのPDFを返し、ETag が一致すれば 304）"""
+    headers = {
+        "ETag": f'"{report_key(request.company_data, request.results, request.solutions)}"',
+        "Cache-Control": "private, no-cache",
+    }
+    if etag_matches(http_request.headers.get("If-None-Match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
     try:
-        pdf_service = PDFService()
-        pdf_buffer = pdf_service.generate_analysis_report(
+        report = await pdf_renderer.get_analysis_report(
             company_data=request.company_data,
             results=request.results,
             solutions=request.solutions
         )
         
-        # ファイル名を生成
+        # ファイル名を生成（日付はレポートの生成日時）
         company_name = request.company_data.get('company_name', '企業')
-        current_date = datetime.now().strftime("%Y%m%d")
-        filename = f"{company_name}_分析結果_{current_date}.pdf"
+        generated_date = datetime.fromtimestamp(report.generated_at).strftime("%Y%m%d")
         
-        return StreamingResponse(
-            io.BytesIO(pdf_buffer.read()),
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        # 大きいPDFはキャッシュのファイルから直接送る（削除しない）
+        return _pdf_response(
+            report.pdf,
+            filename=f"{company_name}_分析結果_{generated_date}.pdf",
+            fallback=f"analysis_report_{generated_date}.pdf",
+            headers=headers
         )
     
+    except PDFRendererBusy as e:
+        raise _busy_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"PDF生成エラー: {str(e)}")
 
 @router.post("/generate-simple")
-async def generate_simple_pdf(request: SimplePDFRequest):
+async def generate_simple_pdf(request: SimplePDFRequest, pdf_renderer: PDFRendererDep):
     """シンプルなテキストPDFを生成"""
     try:
-        pdf_service = PDFService()
-        pdf_buffer = pdf_service.generate_simple_text_pdf(
+        pdf = await pdf_renderer.render_simple_text_pdf(
             text=request.text,
             title=request.title
         )
         
         # ファイル名を生成
         current_date = datetime.now().strftime("%Y%m%d")
-        filename = f"{request.title}_{current_date}.pdf"
-        
-        return StreamingResponse(
-            io.BytesIO(pdf_buffer.read()),
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        return _pdf_response(
+            pdf,
+            filename=f"{request.title}_{current_date}.pdf",
+            fallback=f"report_{current_date}.pdf",
+            delete=True
         )
     
+    except PDFRendererBusy as e:
+        raise _busy_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"PDF生成エラー: {str(e)}")
 
 @router.get("/test")
-async def test_pdf_generation():
+async def test_pdf_generation(pdf_renderer: PDFRendererDep):
     """PDF生成テスト"""
     try:
-        pdf_service = PDFService()
         test_text = "これはPDF生成のテストです。\n\n日本語フォントが正しく表示されているかを確認します。"
-        pdf_buffer = pdf_service.generate_simple_text_pdf(test_text, "テストレポート")
-        
-        return StreamingResponse(
-            io.BytesIO(pdf_buffer.read()),
-            media_type="application/pdf",
-            headers={"Content-Disposition": "attachment; filename=test_report.pdf"}
-        )
+        pdf = await pdf_renderer.render_simple_text_pdf(test_text, "テストレポート")
+        return _pdf_response(pdf, filename="test_report.pdf", fallback="test_report.pdf", delete=True)
     
+    except PDFRendererBusy as e:
+        raise _busy_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"テストPDF生成エラー: {str(e)}")
\ No newline at end of file
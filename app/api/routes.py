@@ -1,16 +1,35 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+from dataclasses import asdict
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+from app.config import settings
 from app.models.schemas import (
+    BatchSearchRequest,
+    BatchSearchResponse,
     CompanySearchRequest,
     CompanySearchResponse,
+    CompanySuggestion,
+    CompanySuggestResponse,
     SolutionsResponse,
     HealthResponse
 )
 from app.api.dependencies import (
     ApiKeyDep,
+    CompanyDirectoryDep,
     CompanyServiceDep,
     SolutionServiceDep,
-    RateLimitDep
+    LookupRateLimitDep,
+    RateLimitDep,
+    cancel_on_disconnect,
+    etag_matches,
+    quota_exceeded_error,
+    upstream_error
 )
+from app.services.quota_governor import QuotaExceeded
+from app.utils.metrics import render_metrics
+from app.utils.resilience import CircuitOpenError, DeadlineExceeded
 
 router = APIRouter()
 
@@ -19,29 +38,69 @@ async def health_check():
     """ヘルスチェック"""
     return HealthResponse(message="顧客理解AIエージェント API")
 
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 形式のメトリクス"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 @router.get("/solutions", response_model=SolutionsResponse)
 async def get_solutions(
+    request: Request,
     solution_service: SolutionServiceDep,
-    _: RateLimitDep
+    _: LookupRateLimitDep
 ):
-    """ソリューション一覧を取得"""
+    """ソリューション一覧を取得（ETag が一致すれば 304）"""
     try:
-        solutions = solution_service.get_solutions()
-        return SolutionsResponse(success=True, solutions=solutions)
+        catalog = solution_service.get_catalog()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    headers = {"ETag": f'"{catalog.version}"', "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    body = SolutionsResponse(success=True, solutions=catalog.solutions)
+    return Response(
+        content=body.model_dump_json(),
+        media_type="application/json",
+        headers=headers
+    )
+
+@router.get("/companies/suggest", response_model=CompanySuggestResponse)
+async def suggest_companies(
+    company_directory: CompanyDirectoryDep,
+    _rate_limit: LookupRateLimitDep,
+    q: str = Query(..., description="入力途中の企業名", min_length=1, max_length=100),
+    limit: int = Query(10, description="候補数", ge=1, le=50)
+):
+    """企業名の入力補完（表記揺れ・全角半角・法人格の有無を吸収）"""
+    suggestions = company_directory.suggest(q, limit)
+    return CompanySuggestResponse(
+        success=True,
+        query=q,
+        suggestions=[CompanySuggestion(**asdict(s)) for s in suggestions]
+    )
 
 @router.post("/search-company", response_model=CompanySearchResponse)
 async def search_company(
     request: CompanySearchRequest,
+    http_request: Request,
     company_service: CompanyServiceDep,
     _api_key: ApiKeyDep,
     _rate_limit: RateLimitDep
 ):
     """企業検索・分析を実行"""
     try:
-        result = await company_service.analyze_company(request)
+        result = await cancel_on_disconnect(
+            http_request, company_service.analyze_company(request)
+        )
         return result
+    except HTTPException:
+        raise
+    except QuotaExceeded as e:
+        raise quota_exceeded_error(e)
+    except (CircuitOpenError, DeadlineExceeded) as e:
+        raise upstream_error(e)
     except Exception as e:
         return CompanySearchResponse(
             success=False,
@@ -49,6 +108,73 @@ async def search_company(
         )
 
 
+@router.post("/search-company/batch", response_model=BatchSearchResponse)
+async def search_company_batch(
+    request: BatchSearchRequest,
+    http_request: Request,
+    company_service: CompanyServiceDep,
+    _api_key: ApiKeyDep,
+    _rate_limit: RateLimitDep
+):
+    """複数の企業検索・分析を一括実行（同じ企業の取得・要約は共有）"""
+    if len(request.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"一度に分析できるのは{settings.BATCH_MAX_ITEMS}件までです"
+        )
+    return await cancel_on_disconnect(
+        http_request,
+        company_service.analyze_batch(request.items, request.max_concurrency)
+    )
+
+def _sse(event: str, data: dict) -> str:
+    """Server-Sent Events 形式に整形"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/search-company/stream")
+async def search_company_stream(
+    request: CompanySearchRequest,
+    company_service: CompanyServiceDep,
+    _api_key: ApiKeyDep,
+    _rate_limit: RateLimitDep
+):
+    """企業検索・分析を実行し、ステージ完了と生成テキストを SSE で逐次送信"""
+    
+    async def event_stream():
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def run():
+            try:
+                result = await company_service.analyze_company(
+                    request, on_event=queue.put, stream_tokens=True
+                )
+            except Exception as e:
+                result = CompanySearchResponse(
+                    success=False,
+                    error_message=f"APIサーバーエラー: {str(e)}"
+                )
+            await queue.put({"event": "result", **result.model_dump()})
+            await queue.put(None)
+        
+        # クライアント切断時はジェネレーターごとキャンセルされ、分析も中断される
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield _sse(event.pop("event"), event)
+        finally:
+            if not task.done():
+                task.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/debug/env-direct")
 async def env_direct():
     import os
@@ -7,6 +7,18 @@ load_dotenv()
 class Settings:
     """アプリケーション設定"""
     
+    # サーバー設定（run.py）
+    # development: 自動リロード付きの1プロセス / production: 複数ワーカー
+    SERVER_MODE: str = os.getenv("SERVER_MODE", "development").lower()
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    # production のワーカープロセス数（Gemini のクォータはワーカー間で等分する）
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "2" if SERVER_MODE == "production" else "1"))
+    # 終了時に処理中のリクエストの完了を待つ秒数（超えたリクエストは打ち切る）
+    GRACEFUL_TIMEOUT: float = float(os.getenv("GRACEFUL_TIMEOUT", "60"))
+    # 終了時に実行中の Gemini 呼び出し（ジョブ）の完了を待つ秒数
+    LLM_DRAIN_SECONDS: float = float(os.getenv("LLM_DRAIN_SECONDS", "30"))
+
     # API設定
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "顧客理解AIエージェント"
@@ -21,6 +33,17 @@ class Settings:
     # Google AI設定
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY")
     GEMINI_MODEL_NAME: str = "gemini-2.5-pro"
+    # Gemini 呼び出しの同時実行数上限
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+    # Gemini のクォータ（1分あたりのリクエスト数・トークン数、0 で無制限）
+    GEMINI_RPM_LIMIT: int = int(os.getenv("GEMINI_RPM_LIMIT", "60"))
+    GEMINI_TPM_LIMIT: int = int(os.getenv("GEMINI_TPM_LIMIT", "1000000"))
+    # 出力トークン数の見込み（実際の出力量は完了後に反映する）
+    GEMINI_EXPECTED_OUTPUT_TOKENS: int = int(os.getenv("GEMINI_EXPECTED_OUTPUT_TOKENS", "2000"))
+    # クォータ待ちの見込みがこの秒数を超える呼び出しは待たずに断る（優先度別）
+    LLM_QUOTA_MAX_WAIT_INTERACTIVE: float = float(os.getenv("LLM_QUOTA_MAX_WAIT_INTERACTIVE", "20"))
+    LLM_QUOTA_MAX_WAIT_BATCH: float = float(os.getenv("LLM_QUOTA_MAX_WAIT_BATCH", "600"))
+    LLM_QUOTA_MAX_WAIT_PREFETCH: float = float(os.getenv("LLM_QUOTA_MAX_WAIT_PREFETCH", "60"))
 
     def _get_required_env_var(self, var_name: str) -> str:
         """必須環境変数を取得"""
@@ -32,9 +55,141 @@ class Settings:
     # ファイルパス設定
     DATA_DIR: str = "app/data"
     PROMPTS_DIR: str = "app/data/prompts"
+    # プロンプトファイルの変更を再起動なしで反映する（開発用）
+    PROMPT_HOT_RELOAD: bool = os.getenv("PROMPT_HOT_RELOAD", "false").lower() == "true"
     SOLUTIONS_FILE: str = "app/data/solutions.json"
+    # マッチングに渡すソリューション数（仮説との類似度の上位、0 なら全件）
+    SOLUTION_TOP_K: int = int(os.getenv("SOLUTION_TOP_K", "20"))
+    # 上場企業一覧（code, name[, kana] 列のCSV）
+    COMPANY_DIRECTORY_CSV: str = os.getenv("COMPANY_DIRECTORY_CSV", "app/data/companies.csv")
+    # 表記揺れの企業名を類似度で解決する際の下限（bigram の Dice 係数）
+    COMPANY_MATCH_THRESHOLD: float = float(os.getenv("COMPANY_MATCH_THRESHOLD", "0.6"))
+    # 接頭辞だけで企業を確定する入力の最短文字数（正規化後、これより短い入力は類似検索のみ）
+    COMPANY_PREFIX_MIN_CHARS: int = int(os.getenv("COMPANY_PREFIX_MIN_CHARS", "3"))
     
+    # バッチ分析設定
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+
     # PDF処理設定
     MAX_PDF_CHARS: int = 90000
+    # テキスト抽出の並列プロセス数（1 ならプロセスを使わずスレッドで逐次抽出）
+    PDF_EXTRACT_WORKERS: int = int(os.getenv("PDF_EXTRACT_WORKERS", "1"))
+    PDF_EXTRACT_PAGES_PER_TASK: int = int(os.getenv("PDF_EXTRACT_PAGES_PER_TASK", "8"))
+    # 有価証券報告書から章単位で抜粋して渡す（見出しが検出できない場合は先頭から MAX_PDF_CHARS 文字）
+    PDF_SECTION_SELECTION: bool = os.getenv("PDF_SECTION_SELECTION", "true").lower() == "true"
+    PDF_TOKEN_BUDGET: int = int(os.getenv("PDF_TOKEN_BUDGET", "60000"))
+    # 優先して含める章（見出しに含まれる語、優先順）
+    PDF_PRIORITY_SECTIONS: List[str] = [
+        "経営方針",
+        "対処すべき課題",
+        "事業等のリスク",
+        "経営者による財政状態",
+        "事業の内容",
+        "企業の概況",
+        "サステナビリティ",
+        "研究開発活動",
+        "設備投資",
+        "従業員の状況",
+        "主要な経営指標",
+    ]
+    # 含めない章（表紙・目次・監査報告書など）
+    PDF_EXCLUDED_SECTIONS: List[str] = [
+        "表紙",
+        "目次",
+        "監査報告書",
+        "内部統制報告書",
+        "確認書",
+        "株式事務の概要",
+        "提出会社の参考情報",
+    ]
+
+    # 有価証券報告書の取得元（ベンチマークではローカルの代替サーバーを指定する）
+    NIKKEI_BASE_URL: str = os.getenv("NIKKEI_BASE_URL", "https://www.nikkei.com").rstrip("/")
+
+    # HTTPクライアント設定
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "8"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    # 1回のGETの全体タイムアウト（接続・読み込みの個別タイムアウトとは別）
+    HTTP_REQUEST_TIMEOUT: float = float(os.getenv("HTTP_REQUEST_TIMEOUT", "30"))
+    PDF_DOWNLOAD_TIMEOUT: float = float(os.getenv("PDF_DOWNLOAD_TIMEOUT", "120"))
+    # PDFのダウンロードがこの秒数で終わらなければ同じURLを並行にもう1本取得（0 で無効）
+    PDF_HEDGE_DELAY_SECONDS: float = float(os.getenv("PDF_HEDGE_DELAY_SECONDS", "0"))
+    # Gemini 呼び出し1回のタイムアウト
+    GEMINI_CALL_TIMEOUT: float = float(os.getenv("GEMINI_CALL_TIMEOUT", "180"))
+
+    # 外部呼び出しの再試行（一時的な失敗のみ、ジッター付き指数バックオフ）
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+    RETRY_BASE_DELAY: float = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+    RETRY_MAX_DELAY: float = float(os.getenv("RETRY_MAX_DELAY", "8"))
+    # 上流ホストごとのサーキットブレーカー（連続失敗で開き、一定時間は即座に失敗させる）
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_SECONDS: float = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+    # 1件の分析全体の時間予算（各呼び出しのタイムアウトは残りの予算で打ち切る、0 で無制限）
+    REQUEST_BUDGET_SECONDS: float = float(os.getenv("REQUEST_BUDGET_SECONDS", "300"))
+    JOB_BUDGET_SECONDS: float = float(os.getenv("JOB_BUDGET_SECONDS", "900"))
+
+    # PDFレポート生成設定（プロセスプール）
+    PDF_RENDER_WORKERS: int = int(os.getenv("PDF_RENDER_WORKERS", "2"))
+    # ワーカー数を超えて待機できる生成リクエスト数（超えると503）
+    PDF_RENDER_MAX_QUEUE: int = int(os.getenv("PDF_RENDER_MAX_QUEUE", "8"))
+    # これを超えるPDFはワーカーが一時ファイルに書き出し、メモリに載せずに送信する
+    PDF_SPOOL_MAX_MEMORY: int = int(os.getenv("PDF_SPOOL_MAX_MEMORY", str(1024 * 1024)))
+    PDF_STREAM_CHUNK_BYTES: int = int(os.getenv("PDF_STREAM_CHUNK_BYTES", str(64 * 1024)))
+
+    # キャッシュ設定
+    CACHE_DIR: str = os.getenv("CACHE_DIR", ".cache")
+    PDF_CACHE_DIR: str = os.path.join(CACHE_DIR, "pdf")
+    PDF_CACHE_MAX_BYTES: int = int(os.getenv("PDF_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    # この秒数以内に検証済みのPDFは再検証せずにそのまま使う
+    PDF_CACHE_FRESH_SECONDS: int = int(os.getenv("PDF_CACHE_FRESH_SECONDS", str(24 * 60 * 60)))
+    # 読み込み中のPDFを削除させない期限（プロセスが落ちて解除されなかった場合に備える）
+    PDF_CACHE_PIN_SECONDS: int = int(os.getenv("PDF_CACHE_PIN_SECONDS", "1800"))
+    # 企業コード → PDF URL の解決結果キャッシュ（ワーカー間で共有）
+    RESOLUTION_CACHE_PATH: str = os.path.join(CACHE_DIR, "resolution.sqlite3")
+    PDF_URL_CACHE_TTL_SECONDS: int = int(os.getenv("PDF_URL_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+    # 「PDFが見つからない」結果を覚えておく秒数
+    PDF_URL_NEGATIVE_TTL_SECONDS: int = int(os.getenv("PDF_URL_NEGATIVE_TTL_SECONDS", str(10 * 60)))
+    # 複数のワーカープロセスで共有するキャッシュのバックエンド
+    # （memory: プロセス内LRU / sqlite: 同じホストのワーカー間で共有 / redis: ホストをまたいで共有）
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "sqlite").lower()
+    SHARED_CACHE_PATH: str = os.path.join(CACHE_DIR, "shared.sqlite3")
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # memory バックエンドで namespace ごとに保持するエントリ数の上限
+    MEMORY_CACHE_MAX_ENTRIES: int = int(os.getenv("MEMORY_CACHE_MAX_ENTRIES", "10000"))
+    SUMMARY_STORE_PATH: str = os.path.join(CACHE_DIR, "summaries.sqlite3")
+    SUMMARY_TTL_SECONDS: int = int(os.getenv("SUMMARY_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+    # 生成済み分析レポートPDF（同じ内容のリクエストには保存済みのPDFを返す）
+    REPORT_CACHE_DIR: str = os.path.join(CACHE_DIR, "reports")
+    PDF_SPOOL_DIR: str = os.path.join(CACHE_DIR, "spool")
+    REPORT_CACHE_MAX_BYTES: int = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    REPORT_CACHE_MEMORY_BYTES: int = int(os.getenv("REPORT_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+
+    # 非同期ジョブ設定
+    JOB_STORE_PATH: str = os.path.join(CACHE_DIR, "jobs.sqlite3")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    # 処理中ジョブの占有期限（更新が途絶えたジョブは他のワーカーが引き継ぐ）
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+    JOB_POLL_SECONDS: float = float(os.getenv("JOB_POLL_SECONDS", "2"))
+    # 再起動をまたいで同じジョブを試行する上限回数
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+    # APIのレート制限（クライアントごとのトークンバケット）
+    # 分析系（Gemini を呼ぶエンドポイント）
+    RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "10"))
+    # 参照系（ソリューション一覧・企業名の入力補完）は分析系とは別のバケットで数える
+    RATE_LIMIT_LOOKUP_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_LOOKUP_PER_MINUTE", "600"))
+    RATE_LIMIT_LOOKUP_BURST: int = int(os.getenv("RATE_LIMIT_LOOKUP_BURST", "60"))
+    # X-Forwarded-For を信頼するプロキシ（IPアドレスまたはCIDR、カンマ区切り）
+    TRUSTED_PROXIES: List[str] = [
+        p.strip() for p in os.getenv("TRUSTED_PROXIES", "").split(",") if p.strip()
+    ]
+
+    # 管理API設定（X-Admin-Token ヘッダーで指定、未設定なら管理APIは常に 403）
+    ADMIN_API_TOKEN: str = os.getenv("ADMIN_API_TOKEN", "")
 
 settings = Settings()
@@ -1,11 +1,59 @@
+import logging
+import time
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.config import settings
 from app.api.routes import router
 from app.api.pdf_routes import router as pdf_router
+from app.api.admin_routes import router as admin_router
+from app.api.job_routes import router as job_router
+from app.services.container import container
+from app.utils.logging_config import configure_logging
+from app.utils.metrics import HTTP_IN_FLIGHT, HTTP_REQUEST_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """リクエストの所要時間（応答の送信完了まで）と処理中の件数を計測
+
+    receive をそのまま渡す ASGI ミドルウェア。BaseHTTPMiddleware で包むと
+    ルート側の request.is_disconnected() が切断を検知できなくなるため使わない。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        status = "500"
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # パスパラメータを含む実際のパスではなく、ルートのパターンで集計する
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], getattr(route, "path", "unmatched"), status
+            ).observe(time.perf_counter() - started_at)
 
 def create_app() -> FastAPI:
     """FastAPIアプリケーションを作成"""
+    configure_logging()
+    
     app = FastAPI(
         title="顧客理解AIエージェント API",
         description="企業分析とソリューション提案API",
@@ -21,32 +69,31 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # リクエストの所要時間と処理中の件数を計測
+    app.add_middleware(RequestMetricsMiddleware)
+
     # ★ここに追加 - 起動時イベント
     @app.on_event("startup")
     async def startup_event():
-        print("=== 環境変数確認 ===")
-        
-        # 全ての環境変数を確認
+        # 環境変数確認
         import os
-        all_vars = dict(os.environ)
-        print(f"全環境変数数: {len(all_vars)}")
-        
-        # Google関連の変数を探す
-        google_vars = {k: v for k, v in all_vars.items() if 'GOOGLE' in k.upper()}
-        print(f"Google関連変数: {google_vars}")
-        
-        # 具体的に確認
+        logger.info(f"環境変数数: {len(os.environ)}")
+        google_vars = [k for k in os.environ if 'GOOGLE' in k.upper()]
+        logger.info(f"Google関連変数: {google_vars}")
         api_key = os.getenv('GOOGLE_API_KEY')
-        print(f"GOOGLE_API_KEY: {api_key is not None}")
-        if api_key:
-            print(f"キーの長さ: {len(api_key)}")
-            print(f"最初の10文字: {api_key[:10]}...")
+        logger.info(f"GOOGLE_API_KEY: {api_key is not None}" + (f" (長さ {len(api_key)})" if api_key else ""))
         
-        print("================")
+        await container.startup()
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        await container.shutdown()
 
     # ルーターを登録
     app.include_router(router)
     app.include_router(pdf_router)
+    app.include_router(job_router)
+    app.include_router(admin_router)
 
     return app
 
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Optional
 
 # リクエストモデル
 class CompanySearchRequest(BaseModel):
@@ -9,6 +9,11 @@ class CompanySearchRequest(BaseModel):
     position_name: Optional[str] = Field("", description="役職名")
     job_scope: Optional[str] = Field("", description="業務範囲")
 
+class BatchSearchRequest(BaseModel):
+    """一括企業分析リクエスト"""
+    items: List[CompanySearchRequest] = Field(..., description="分析対象の一覧", min_length=1)
+    max_concurrency: Optional[int] = Field(None, description="同時実行数（省略時は設定値）", ge=1, le=32)
+
 class SolutionMatchRequest(BaseModel):
     """ソリューションマッチングリクエスト"""
     hypothesis: str = Field(..., description="仮説", min_length=1)
@@ -28,13 +33,84 @@ class CompanySearchResponse(BaseModel):
     hearing_items: Optional[str] = Field("", description="ヒアリング項目")
     matching_result: Optional[str] = Field("", description="マッチング結果")
     error_message: Optional[str] = Field("", description="エラーメッセージ")
+    stage_timings: Dict[str, float] = Field({}, description="ステージ別処理時間（ミリ秒）")
+    stage_errors: Dict[str, str] = Field({}, description="失敗したステージとエラー内容")
+
+class BatchItemResult(BaseModel):
+    """一括企業分析の1件分の結果"""
+    index: int = Field(..., description="リクエスト内の位置")
+    request: CompanySearchRequest = Field(..., description="分析条件")
+    result: CompanySearchResponse = Field(..., description="分析結果")
+    elapsed_ms: float = Field(0, description="処理時間（ミリ秒）")
+
+class BatchSearchResponse(BaseModel):
+    """一括企業分析レスポンス"""
+    success: bool = Field(..., description="全件成功フラグ")
+    results: List[BatchItemResult] = Field([], description="各件の結果")
+    unique_companies: int = Field(0, description="企業数（重複除外）")
+    elapsed_ms: float = Field(0, description="全体の処理時間（ミリ秒）")
+
+class JobAcceptedResponse(BaseModel):
+    """ジョブ受付レスポンス"""
+    job_id: str = Field(..., description="ジョブID")
+    status: str = Field(..., description="ジョブの状態")
+
+class JobStatusResponse(BaseModel):
+    """ジョブ状態レスポンス"""
+    job_id: str = Field(..., description="ジョブID")
+    status: str = Field(..., description="ジョブの状態（queued / running / succeeded / failed）")
+    request: CompanySearchRequest = Field(..., description="分析条件")
+    stage_results: Dict[str, Optional[str]] = Field({}, description="完了したステージの結果")
+    stage_timings: Dict[str, float] = Field({}, description="ステージ別処理時間（ミリ秒）")
+    stage_errors: Dict[str, str] = Field({}, description="失敗したステージとエラー内容")
+    result: Optional[CompanySearchResponse] = Field(None, description="最終結果（完了時のみ）")
+    error_message: Optional[str] = Field(None, description="エラーメッセージ")
+    attempts: int = Field(0, description="試行回数")
+    created_at: float = Field(..., description="登録時刻（UNIX時間）")
+    updated_at: float = Field(..., description="更新時刻（UNIX時間）")
 
 class SolutionsResponse(BaseModel):
     """ソリューション一覧レスポンス"""
     success: bool = Field(..., description="成功フラグ")
     solutions: List[Solution] = Field([], description="ソリューション一覧")
 
+class CompanySuggestion(BaseModel):
+    """企業名の候補"""
+    code: str = Field(..., description="企業コード")
+    name: str = Field(..., description="企業名")
+    score: float = Field(..., description="一致度（1.0 は接頭辞・完全一致）")
+
+class CompanySuggestResponse(BaseModel):
+    """企業名補完レスポンス"""
+    success: bool = Field(..., description="成功フラグ")
+    query: str = Field(..., description="入力文字列")
+    suggestions: List[CompanySuggestion] = Field([], description="候補一覧")
+
 class HealthResponse(BaseModel):
     """ヘルスチェックレスポンス"""
     message: str = Field(..., description="メッセージ")
-    status: str = Field("ok", description="ステータス")
\ No newline at end of file
+    status: str = Field("ok", description="ステータス")
+
+class SummaryEntry(BaseModel):
+    """保存済み要約のエントリ情報"""
+    model_config = ConfigDict(protected_namespaces=())
+
+    company_code: str = Field(..., description="企業コード")
+    company_name: str = Field(..., description="企業名")
+    pdf_hash: str = Field(..., description="有価証券報告書PDFのSHA-256")
+    prompt_hash: str = Field(..., description="プロンプトのSHA-256")
+    model_name: str = Field(..., description="モデル名")
+    created_at: float = Field(..., description="作成時刻（UNIX時間）")
+    hit_count: int = Field(0, description="再利用回数")
+    summary_chars: int = Field(0, description="要約の文字数")
+    expired: bool = Field(False, description="有効期限切れフラグ")
+
+class SummaryListResponse(BaseModel):
+    """保存済み要約一覧レスポンス"""
+    success: bool = Field(..., description="成功フラグ")
+    entries: List[SummaryEntry] = Field([], description="要約一覧")
+
+class PurgeResponse(BaseModel):
+    """削除レスポンス"""
+    success: bool = Field(..., description="成功フラグ")
+    deleted: int = Field(0, description="削除件数")
@@ -0,0 +1,44 @@
+"""本番モード（gunicorn）のワーカー設定（run.py から使う）"""
+from typing import Tuple
+
+from uvicorn.workers import UvicornWorker
+
+from app.config import settings
+
+
+def server_impl() -> Tuple[str, str]:
+    """イベントループと HTTP パーサー（uvloop・httptools があれば使う）"""
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    try:
+        import httptools  # noqa: F401
+        http = "httptools"
+    except ImportError:
+        http = "h11"
+    return loop, http
+
+
+_LOOP, _HTTP = server_impl()
+
+
+class ProductionWorker(UvicornWorker):
+    """uvloop・httptools で動かす UvicornWorker
+
+    終了時は GRACEFUL_TIMEOUT 秒まで処理中のリクエストを待ち、それでも終わらない
+    リクエストは打ち切ってアプリの終了処理（Gemini 呼び出しの完了待ち）に移る。
+    """
+    CONFIG_KWARGS = {
+        "loop": _LOOP,
+        "http": _HTTP,
+        "timeout_graceful_shutdown": settings.GRACEFUL_TIMEOUT,
+    }
+
+
+def child_exit(server, worker):
+    """終了したワーカーのゲージをメトリクスの集計から外す（gunicorn のフック）"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
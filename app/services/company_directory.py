@@ -0,0 +1,256 @@
+import csv
+import logging
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.data.company_codes import company_codes
+
+logger = logging.getLogger(__name__)
+
+# 比較時に取り除く法人格の表記（NFKC 正規化後）
+# 英字の表記は単語として独立している場合のみ（「Cinco」「Corpus」などの一部は残す）
+_LEGAL_FORMS = re.compile(
+    r"株式会社|有限会社|合同会社|\(株\)|\(有\)"
+    r"|(?<![a-z0-9])(?:co\.?,?\s*ltd|inc|corp)(?![a-z0-9])\.?"
+)
+# 同じ意味の表記揺れ（正規化後の表記 → 統一後の表記）
+# 英字の表記は法人格と同じく単語として独立している場合のみ（「Groupon」などは残す）
+_SYNONYMS = [
+    (re.compile(r"ホールディングス"), "hd"),
+    (re.compile(r"(?<![a-z0-9])(?:holdings|hldgs)(?![a-z0-9])"), "hd"),
+    (re.compile(r"グループ"), "g"),
+    (re.compile(r"(?<![a-z0-9])group(?![a-z0-9])"), "g"),
+]
+# 区切り記号・空白（長音記号「ー」は残す）
+_SEPARATORS = re.compile(r"[\s・･\.,、。'\"&＆\-‐―~〜]+")
+
+NGRAM_SIZE = 2
+
+
+def _hiragana_to_katakana(text: str) -> str:
+    return "".join(
+        chr(ord(ch) + 0x60) if "ぁ" <= ch <= "ゖ" else ch
+        for ch in text
+    )
+
+
+def normalize_company_name(name: str) -> str:
+    """比較用に企業名を正規化
+
+    全角/半角（NFKC）、大文字/小文字、ひらがな/カタカナの違い、法人格、
+    「ホールディングス」と「HD」などの表記揺れ、空白・区切り記号を吸収する。
+    """
+    text = unicodedata.normalize("NFKC", name).lower()
+    text = _hiragana_to_katakana(text)
+    text = _LEGAL_FORMS.sub("", text)
+    # 単語の区切りを見るため、区切り記号を取り除く前に置き換える
+    for pattern, target in _SYNONYMS:
+        text = pattern.sub(target, text)
+    text = _SEPARATORS.sub("", text)
+    return text
+
+
+def _ngrams(text: str) -> Set[str]:
+    if len(text) < NGRAM_SIZE:
+        return {text} if text else set()
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+@dataclass
+class CompanyEntry:
+    """上場企業"""
+    code: str
+    name: str
+    kana: str = ""
+
+
+@dataclass
+class CompanyMatch:
+    """検索結果"""
+    code: str
+    name: str
+    score: float
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # この接頭辞を持つ企業（名前の短い順、上限件数まで）
+        self.ids: List[int] = []
+
+
+class CompanyDirectory:
+    """企業名 → 企業コードのメモリ内索引
+
+    正規化した企業名（と読み）の接頭辞トライと、文字 bigram の転置索引を持つ。
+    完全一致 → 接頭辞 → bigram の Dice 係数による類似検索の順に解決する。
+    """
+
+    # トライの各ノードに保持する候補数
+    MAX_IDS_PER_NODE = 20
+
+    def __init__(self, entries: Iterable[CompanyEntry]):
+        self.entries: List[CompanyEntry] = []
+        self._exact: Dict[str, int] = {}
+        self._keys: List[List[str]] = []
+        # 各キーの bigram 数（類似度計算用）
+        self._gram_counts: List[List[int]] = []
+        self._root = _TrieNode()
+        self._ngram_index: Dict[str, List[int]] = defaultdict(list)
+
+        seen_codes: Set[str] = set()
+        for entry in entries:
+            if entry.code in seen_codes:
+                continue
+            seen_codes.add(entry.code)
+            self._add(entry)
+
+        logger.info(f"企業ディレクトリ: {len(self.entries)}社")
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _add(self, entry: CompanyEntry):
+        index = len(self.entries)
+        self.entries.append(entry)
+        keys = [key for key in {normalize_company_name(entry.name),
+                                normalize_company_name(entry.kana)} if key]
+        self._keys.append(keys)
+        self._gram_counts.append([len(_ngrams(key)) for key in keys])
+
+        for key in keys:
+            self._exact.setdefault(key, index)
+            node = self._root
+            for ch in key:
+                node = node.children.setdefault(ch, _TrieNode())
+                self._insert_id(node, index)
+            for gram in _ngrams(key):
+                postings = self._ngram_index[gram]
+                if not postings or postings[-1] != index:
+                    postings.append(index)
+
+    def _insert_id(self, node: _TrieNode, index: int):
+        if index in node.ids:
+            return
+        node.ids.append(index)
+        node.ids.sort(key=lambda i: (len(self.entries[i].name), self.entries[i].code))
+        del node.ids[self.MAX_IDS_PER_NODE:]
+
+    @classmethod
+    def from_csv(cls, path: str = settings.COMPANY_DIRECTORY_CSV) -> "CompanyDirectory":
+        """CSV（code, name[, kana] 列）から読み込む
+
+        CSV がなければ app/data/company_codes.py の辞書だけで構成する。
+        辞書の企業は CSV に含まれていなくても常に登録する。
+        """
+        entries: List[CompanyEntry] = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8-sig", newline="") as f:
+                for row in csv.DictReader(f):
+                    code = (row.get("code") or "").strip()
+                    name = (row.get("name") or "").strip()
+                    if code and name:
+                        entries.append(CompanyEntry(code, name, (row.get("kana") or "").strip()))
+        else:
+            logger.warning(f"企業一覧CSVが見つかりません: {path}")
+
+        entries.extend(CompanyEntry(code, name) for name, code in company_codes.items())
+        return cls(entries)
+
+    def _prefix_ids(self, key: str) -> List[int]:
+        node = self._root
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        return node.ids
+
+    def _similar(self, key: str, limit: int) -> List[Tuple[float, int]]:
+        """bigram の Dice 係数で類似度の高い順に返す"""
+        grams = _ngrams(key)
+        if not grams:
+            return []
+        shared = Counter(chain.from_iterable(
+            self._ngram_index.get(gram, ()) for gram in grams
+        ))
+        # 共通 bigram の多い候補に絞ってから類似度を計算する
+        scored = []
+        for index, count in shared.most_common(max(limit * 5, 50)):
+            best = max(
+                2 * count / (len(grams) + gram_count)
+                for gram_count in self._gram_counts[index]
+            )
+            scored.append((best, index))
+        scored.sort(key=lambda item: (-item[0], len(self.entries[item[1]].name)))
+        return scored[:limit]
+
+    def _match(self, index: int, score: float) -> CompanyMatch:
+        entry = self.entries[index]
+        return CompanyMatch(code=entry.code, name=entry.name, score=round(score, 3))
+
+    def resolve(
+        self,
+        name: str,
+        threshold: float = settings.COMPANY_MATCH_THRESHOLD,
+        prefix_min_chars: int = settings.COMPANY_PREFIX_MIN_CHARS
+    ) -> Optional[CompanyMatch]:
+        """企業名を企業コードに解決（曖昧な場合は None）
+
+        接頭辞一致は prefix_min_chars 文字以上の入力に限り、スコアは
+        入力が企業名のどれだけを占めるか（1文字の入力で分析を始めないため）。
+        """
+        key = normalize_company_name(name)
+        if not key:
+            return None
+
+        index = self._exact.get(key)
+        if index is not None:
+            return self._match(index, 1.0)
+
+        # 接頭辞で1社に絞れる場合（例: 「ゼンショー」）
+        if len(key) >= prefix_min_chars:
+            prefix_ids = self._prefix_ids(key)
+            if len(prefix_ids) == 1:
+                full_key = min(
+                    (k for k in self._keys[prefix_ids[0]] if k.startswith(key)), key=len
+                )
+                return self._match(prefix_ids[0], round(len(key) / len(full_key), 3))
+
+        candidates = self._similar(key, 2)
+        if not candidates or candidates[0][0] < threshold:
+            return None
+        if len(candidates) > 1 and candidates[0][0] == candidates[1][0]:
+            logger.info(f"企業名が曖昧です: {name}")
+            return None
+        return self._match(candidates[0][1], candidates[0][0])
+
+    def suggest(self, query: str, limit: int = 10, min_score: float = 0.3) -> List[CompanyMatch]:
+        """入力途中の企業名の候補（接頭辞一致を優先し、類似検索で補う）"""
+        key = normalize_company_name(query)
+        if not key:
+            return []
+
+        results: List[CompanyMatch] = []
+        seen: Set[int] = set()
+        for index in self._prefix_ids(key)[:limit]:
+            seen.add(index)
+            results.append(self._match(index, 1.0))
+        if len(results) < limit:
+            for score, index in self._similar(key, limit * 2):
+                if score < min_score:
+                    break
+                if index in seen:
+                    continue
+                seen.add(index)
+                results.append(self._match(index, score))
+                if len(results) >= limit:
+                    break
+        return results
@@ -1,91 +1,297 @@
+import asyncio
 import logging
-from app.models.schemas import CompanySearchRequest, CompanySearchResponse
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.config import settings
+from app.models.schemas import (
+    BatchItemResult,
+    BatchSearchResponse,
+    CompanySearchRequest,
+    CompanySearchResponse
+)
+from app.services.company_directory import CompanyDirectory
 from app.services.gemini_service import GeminiService
-from app.services.solution_service import SolutionService
+from app.services.llm_executor import TokenCallback
+from app.services.pipeline import Pipeline, PipelineAbort, Stage, StageEvent
+from app.services.quota_governor import PRIORITY_BATCH, llm_priority
+from app.services.solution_service import SolutionCatalog, SolutionSelection, SolutionService
+from app.utils.resilience import deadline_scope
 from app.utils.web_scraper import WebScraper
-from app.data.company_codes import company_codes
 
 logger = logging.getLogger(__name__)
 
+# 分析の進捗イベント（ステージ完了・生成中のテキスト断片）を受け取るコールバック
+AnalysisEventCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# 複数の分析で共有する処理結果（キー → 実行中または完了済みのタスク）
+SharedWork = Dict[str, "asyncio.Future[Any]"]
+
+async def _run_shared(
+    shared: Optional[SharedWork],
+    key: str,
+    factory: Callable[[], Awaitable[Any]]
+) -> Any:
+    """同じキーの処理は一度だけ実行し、結果を共有する"""
+    if shared is None:
+        return await factory()
+    task = shared.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        shared[key] = task
+    # 待っている側がキャンセルされても共有タスクは止めない
+    return await asyncio.shield(task)
+
 class CompanyService:
     """企業分析サービス"""
     
-    def __init__(self):
-        self.gemini_service = GeminiService()
-        self.solution_service = SolutionService()
-        self.web_scraper = WebScraper()
+    def __init__(
+        self,
+        gemini_service: Optional[GeminiService] = None,
+        solution_service: Optional[SolutionService] = None,
+        web_scraper: Optional[WebScraper] = None,
+        company_directory: Optional[CompanyDirectory] = None
+    ):
+        self.gemini_service = gemini_service or GeminiService()
+        self.solution_service = solution_service or SolutionService()
+        self.web_scraper = web_scraper or WebScraper()
+        self.company_directory = company_directory or CompanyDirectory.from_csv()
     
-    def get_company_code(self, company_name: str) -> str:
-        """企業名から企業コードを取得"""
-        return company_codes.get(company_name)
+    def get_company_code(self, company_name: str) -> Optional[str]:
+        """企業名から企業コードを取得（表記揺れは企業ディレクトリで吸収）"""
+        match = self.company_directory.resolve(company_name)
+        if match is None:
+            return None
+        if match.name != company_name:
+            logger.info(f"企業名を解決: {company_name} → {match.name} ({match.code}, score={match.score})")
+        return match.code
     
-    async def analyze_company(self, request: CompanySearchRequest) -> CompanySearchResponse:
-        """企業分析を実行"""
-        try:
-            logger.info(f"企業分析開始: {request.company_name}")
+    def _build_stages(
+        self,
+        request: CompanySearchRequest,
+        code: str,
+        on_event: Optional[AnalysisEventCallback] = None,
+        shared: Optional[SharedWork] = None,
+        stream_tokens: bool = False
+    ) -> List[Stage]:
+        """分析パイプラインのステージを構築"""
+        
+        def token_callback(stage_name: str) -> Optional[TokenCallback]:
+            # 断片の通知を求められた場合のみGeminiをストリーミングモードで呼ぶ
+            # （ストリーミングは断片を通知した後の失敗を再試行できない）
+            if on_event is None or not stream_tokens:
+                return None
             
-            # 企業コードを取得
-            code = self.get_company_code(request.company_name)
-            logger.info(f"企業コード: {code}")
-            
-            if not code:
-                return CompanySearchResponse(
-                    success=False,
-                    error_message="指定された企業名が辞書に存在しません。先に企業コードを登録してください。"
-                )
+            async def on_token(text: str):
+                await on_event({"event": "token", "stage": stage_name, "text": text})
             
+            return on_token
+        
+        async def scrape(_: Dict[str, Any]) -> str:
             # 有価証券報告書PDFを取得
-            pdf_url = self.web_scraper.fetch_securities_report_pdf(code)
+            pdf_url = await _run_shared(
+                shared, f"scrape:{code}",
+                lambda: self.web_scraper.fetch_securities_report_pdf(code)
+            )
             logger.info(f"PDF URL: {pdf_url}")
-            
             if not pdf_url:
-                return CompanySearchResponse(
-                    success=False,
-                    error_message="PDFリンクが見つかりませんでした。"
+                raise PipelineAbort("PDFリンクが見つかりませんでした。")
+            return pdf_url
+        
+        async def summary(deps: Dict[str, Any]) -> str:
+            result = await _run_shared(
+                shared, f"summary:{code}",
+                lambda: self.gemini_service.summarize_securities_report(
+                    deps["scrape"], request.company_name, code,
+                    on_token=token_callback("summary")
                 )
-            
-            # 要約を生成
-            summary = await self.gemini_service.summarize_securities_report(
-                pdf_url, request.company_name
             )
             logger.info("要約取得成功")
+            return result
+        
+        stages = [
+            Stage("scrape", scrape),
+            Stage("summary", summary, depends_on=("scrape",)),
+        ]
+        
+        # 部署名と役職が入力されている場合、仮説とヒアリング項目を生成
+        if request.department_name and request.position_name:
             
-            hypothesis = ""
-            hearing_items = ""
-            matching_result = ""
-            
-            # 部署名と役職が入力されている場合、仮説とヒアリング項目を生成
-            if request.department_name and request.position_name:
-                # 仮説生成
-                hypothesis = await self.gemini_service.generate_hypothesis(
-                    summary, request.department_name, 
-                    request.position_name, request.job_scope
+            async def hypothesis(deps: Dict[str, Any]) -> str:
+                result = await self.gemini_service.generate_hypothesis(
+                    deps["summary"], request.department_name,
+                    request.position_name, request.job_scope,
+                    on_token=token_callback("hypothesis")
                 )
                 logger.info("仮説取得成功")
-                
+                return result
+            
+            async def solutions(_: Dict[str, Any]) -> SolutionCatalog:
+                # メモリ上のカタログ（ファイルが変わった場合のみ読み直される）
+                return self.solution_service.get_catalog()
+            
+            async def retrieval(deps: Dict[str, Any]) -> SolutionSelection:
+                # 仮説に近いソリューションだけをマッチングに渡す
+                catalog: SolutionCatalog = deps["solutions"]
+                selection = catalog.select(deps["hypothesis"] or "")
+                logger.info(
+                    f"ソリューション絞り込み: {len(selection.solutions)}/{len(catalog.solutions)}件 "
+                    f"({selection.retrieval_ms}ms)"
+                )
+                return selection
+            
+            async def matching(deps: Dict[str, Any]) -> str:
                 # ソリューションマッチング
-                if hypothesis:
-                    solutions = self.solution_service.get_solutions()
-                    matching_result = await self.gemini_service.match_solutions(
-                        hypothesis, solutions
-                    )
-                    logger.info("マッチング取得成功")
-                
+                if not deps["hypothesis"]:
+                    return ""
+                selection: SolutionSelection = deps["retrieval"]
+                result = await self.gemini_service.match_solutions(
+                    deps["hypothesis"], selection.solutions,
+                    on_token=token_callback("matching"),
+                    solutions_text=selection.solutions_text
+                )
+                logger.info("マッチング取得成功")
+                return result
+            
+            async def hearing_items(deps: Dict[str, Any]) -> str:
                 # ヒアリング項目生成
-                hearing_items = await self.gemini_service.generate_hearing_items(
+                result = await self.gemini_service.generate_hearing_items(
                     request.company_name, request.department_name,
-                    request.position_name, hypothesis
+                    request.position_name, deps["hypothesis"],
+                    on_token=token_callback("hearing_items")
                 )
                 logger.info("ヒアリング項目取得成功")
+                return result
+            
+            # マッチングとヒアリング項目は仮説のみに依存するため並行に実行される
+            stages += [
+                Stage("hypothesis", hypothesis, depends_on=("summary",), critical=False),
+                Stage("solutions", solutions, critical=False),
+                Stage("retrieval", retrieval, depends_on=("hypothesis", "solutions"), critical=False),
+                Stage("matching", matching, depends_on=("hypothesis", "retrieval"), critical=False),
+                Stage("hearing_items", hearing_items, depends_on=("hypothesis",), critical=False),
+            ]
+        
+        return stages
+    
+    async def analyze_company(
+        self,
+        request: CompanySearchRequest,
+        on_event: Optional[AnalysisEventCallback] = None,
+        shared: Optional[SharedWork] = None,
+        completed_stages: Optional[Dict[str, Any]] = None,
+        budget_seconds: Optional[float] = None,
+        stream_tokens: bool = False
+    ) -> CompanySearchResponse:
+        """企業分析を実行
+
+        on_event を指定すると、各ステージの完了（event="stage"）が逐次通知される。
+        stream_tokens=True なら Gemini の生成テキスト断片（event="token"）も通知する。
+        shared を渡した分析同士では、同じ企業のPDF取得と要約を共有する。
+        completed_stages に渡したステージ結果は再実行せずに使う。
+        外部呼び出しのタイムアウトは budget_seconds（省略時は
+        REQUEST_BUDGET_SECONDS）の残りで打ち切る。
+        """
+        try:
+            logger.info(f"企業分析開始: {request.company_name}")
+            
+            # 企業コードを取得
+            code = self.get_company_code(request.company_name)
+            logger.info(f"企業コード: {code}")
+            
+            if not code:
+                return CompanySearchResponse(
+                    success=False,
+                    error_message="指定された企業名が辞書に存在しません。先に企業コードを登録してください。"
+                )
+            
+            async def on_stage_event(stage_event: StageEvent):
+                event = {
+                    "event": "stage",
+                    "stage": stage_event.name,
+                    "elapsed_ms": stage_event.elapsed_ms,
+                }
+                if stage_event.error is not None:
+                    event["error"] = stage_event.error
+                elif isinstance(stage_event.value, str):
+                    event["data"] = stage_event.value
+                await on_event(event)
+            
+            if budget_seconds is None:
+                budget_seconds = settings.REQUEST_BUDGET_SECONDS
+            try:
+                with deadline_scope(budget_seconds):
+                    result = await Pipeline(self._build_stages(request, code, on_event, shared, stream_tokens)).run(
+                        on_stage_event if on_event is not None else None,
+                        completed=completed_stages
+                    )
+            except PipelineAbort as e:
+                return CompanySearchResponse(success=False, error_message=str(e))
             
             return CompanySearchResponse(
                 success=True,
-                summary=summary,
-                hypothesis=hypothesis,
-                hearing_items=hearing_items,
-                matching_result=matching_result
+                summary=result.results.get("summary", ""),
+                hypothesis=result.results.get("hypothesis", ""),
+                hearing_items=result.results.get("hearing_items", ""),
+                matching_result=result.results.get("matching", ""),
+                stage_timings=result.timings,
+                stage_errors=result.errors
             )
             
         except Exception as e:
             logger.error(f"企業分析エラー: {str(e)}")
-            raise e
\ No newline at end of file
+            raise e
+    
+    async def analyze_batch(
+        self,
+        requests: List[CompanySearchRequest],
+        max_concurrency: Optional[int] = None
+    ) -> BatchSearchResponse:
+        """複数の企業分析をまとめて実行
+
+        同じ企業のPDF取得・要約は1回だけ行い、全ペルソナで共有する。
+        同時に実行する分析数は max_concurrency で制限する。
+        Gemini 呼び出しはバッチ優先度でクォータを待つ。
+        """
+        started_at = time.perf_counter()
+        semaphore = asyncio.Semaphore(max_concurrency or settings.BATCH_MAX_CONCURRENCY)
+        shared: SharedWork = {}
+        
+        async def run_item(index: int, request: CompanySearchRequest) -> BatchItemResult:
+            async with semaphore:
+                item_started_at = time.perf_counter()
+                try:
+                    result = await self.analyze_company(request, shared=shared)
+                except Exception as e:
+                    result = CompanySearchResponse(
+                        success=False,
+                        error_message=f"APIサーバーエラー: {str(e)}"
+                    )
+                return BatchItemResult(
+                    index=index,
+                    request=request,
+                    result=result,
+                    elapsed_ms=round((time.perf_counter() - item_started_at) * 1000, 1)
+                )
+        
+        try:
+            # バッチの Gemini 呼び出しは対話的なリクエストより後回しにする
+            with llm_priority(PRIORITY_BATCH):
+                items = [
+                    asyncio.ensure_future(run_item(index, request))
+                    for index, request in enumerate(requests)
+                ]
+            results = await asyncio.gather(*items)
+        finally:
+            for task in shared.values():
+                if not task.done():
+                    task.cancel()
+        
+        return BatchSearchResponse(
+            success=all(item.result.success for item in results),
+            results=results,
+            # 表記揺れは同じ企業として数える（解決できない企業名はそのまま）
+            unique_companies=len({
+                self.get_company_code(r.company_name) or r.company_name for r in requests
+            }),
+            elapsed_ms=round((time.perf_counter() - started_at) * 1000, 1)
+        )
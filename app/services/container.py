@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from typing import Optional
+
+from app.config import settings
+from app.services.company_directory import CompanyDirectory
+from app.services.company_service import CompanyService
+from app.services.gemini_service import GeminiService
+from app.services.job_runner import JobRunner
+from app.services.job_store import JobStore
+from app.services.llm_executor import llm_executor
+from app.services.pdf_renderer import PDFRenderer
+from app.services.prompt_registry import PromptRegistry
+from app.services.solution_service import SolutionService
+from app.services.summary_store import SummaryStore
+from app.utils.http_client import http_client
+from app.utils.pdf_cache import PDFCache
+from app.utils.pdf_text import PDFTextExtractor
+from app.utils.web_scraper import WebScraper
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """アプリケーション全体で共有するサービスの入れ物
+
+    起動時に一度だけ各サービスを生成・ウォームアップし、全リクエストで
+    使い回す。サービスはいずれもリクエスト間で状態を書き換えないため、
+    同時実行されるリクエストから共有しても安全。
+    """
+
+    def __init__(self):
+        self.started = False
+        self._lock = asyncio.Lock()
+
+        self.pdf_cache: Optional[PDFCache] = None
+        self.summary_store: Optional[SummaryStore] = None
+        self.text_extractor: Optional[PDFTextExtractor] = None
+        self.web_scraper: Optional[WebScraper] = None
+        self.company_directory: Optional[CompanyDirectory] = None
+        self.prompt_registry: Optional[PromptRegistry] = None
+        self.solution_service: Optional[SolutionService] = None
+        self.gemini_service: Optional[GeminiService] = None
+        self.company_service: Optional[CompanyService] = None
+        self.job_store: Optional[JobStore] = None
+        self.job_runner: Optional[JobRunner] = None
+        self.pdf_renderer: Optional[PDFRenderer] = None
+
+    async def startup(self):
+        """サービスを生成してウォームアップ（2回目以降は何もしない）"""
+        async with self._lock:
+            if self.started:
+                return
+
+            await http_client.start()
+            llm_executor.resume()
+
+            self.pdf_cache = PDFCache(http_client=http_client)
+            self.summary_store = SummaryStore()
+            self.text_extractor = PDFTextExtractor()
+            self.web_scraper = WebScraper(http_client)
+            self.solution_service = SolutionService()
+            self.company_directory = await asyncio.to_thread(CompanyDirectory.from_csv)
+            # テンプレートの不備は起動時に検出する（PromptTemplateError）
+            self.prompt_registry = PromptRegistry()
+            # PDF生成ワーカーはフォント登録・スタイル構築済みの状態で待機させる
+            self.pdf_renderer = PDFRenderer()
+            await self.pdf_renderer.start()
+
+            try:
+                self.gemini_service = GeminiService(
+                    llm_executor=llm_executor,
+                    pdf_cache=self.pdf_cache,
+                    summary_store=self.summary_store,
+                    text_extractor=self.text_extractor,
+                    prompt_registry=self.prompt_registry
+                )
+            except ValueError as e:
+                # APIキー未設定でも Gemini を使わないエンドポイントは動かす
+                logger.warning(f"GeminiService を初期化できません: {e}")
+            else:
+                self.company_service = CompanyService(
+                    gemini_service=self.gemini_service,
+                    solution_service=self.solution_service,
+                    web_scraper=self.web_scraper,
+                    company_directory=self.company_directory
+                )
+                # 前回の未完了ジョブもワーカー起動時に再開される
+                self.job_store = JobStore()
+                self.job_runner = JobRunner(self.job_store, self.company_service)
+                self.job_runner.start()
+
+            # ウォームアップ（ソリューション定義の読み込み確認）
+            solutions = self.solution_service.get_solutions()
+            logger.info(f"サービス起動完了 (ソリューション {len(solutions)}件)")
+            self.started = True
+
+    async def shutdown(self):
+        """共有リソースを解放"""
+        async with self._lock:
+            if not self.started:
+                return
+            # 実行中の Gemini 呼び出しは完了を待つ（待っているジョブは停止時に解放され、再起動後に再開する）
+            await llm_executor.drain(settings.LLM_DRAIN_SECONDS)
+            if self.job_runner is not None:
+                await self.job_runner.stop()
+            await http_client.close()
+            llm_executor.shutdown()
+            self.text_extractor.shutdown()
+            await asyncio.to_thread(self.pdf_renderer.shutdown)
+            self.started = False
+            logger.info("サービス終了")
+
+
+container = ServiceContainer()
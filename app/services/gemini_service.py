@@ -1,145 +1,254 @@
-import os
-import fitz  # PyMuPDF
-import requests
-from typing import List
+import asyncio
+import hashlib
+import logging
+import httpx
+from typing import List, Optional
 from google.generativeai import GenerativeModel
 import google.generativeai as genai
 from app.config import settings
 from app.models.schemas import Solution
+from app.services.llm_executor import LLMExecutor, TokenCallback, llm_executor as default_llm_executor
+from app.services.prompt_registry import PromptRegistry, PromptTemplate, RenderedPrompt
+from app.services.solution_service import format_solutions
+from app.services.summary_store import SummaryKey, SummaryStore
+from app.utils.pdf_cache import CachedPDF, PDFCache
+from app.utils.pdf_text import PDFTextExtractor
+from app.utils.report_sections import estimate_tokens
+from app.utils.metrics import LLM_PROMPT_TOKENS, LLM_RESPONSE_CHARS, record_cache, span
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
 
 class GeminiService:
     """Gemini API サービス"""
     
-    def __init__(self):
-        print(f"=== GeminiService初期化開始 ===")
-        print(f"GOOGLE_API_KEY存在: {bool(settings.GOOGLE_API_KEY)}")
-        print(f"GEMINI_MODEL_NAME: {settings.GEMINI_MODEL_NAME}")
+    def __init__(
+        self,
+        llm_executor: Optional[LLMExecutor] = None,
+        pdf_cache: Optional[PDFCache] = None,
+        summary_store: Optional[SummaryStore] = None,
+        text_extractor: Optional[PDFTextExtractor] = None,
+        prompt_registry: Optional[PromptRegistry] = None
+    ):
+        logger.info(
+            f"GeminiService初期化開始 (GOOGLE_API_KEY存在: {bool(settings.GOOGLE_API_KEY)}, "
+            f"モデル: {settings.GEMINI_MODEL_NAME})"
+        )
         
         if not settings.GOOGLE_API_KEY:
             raise ValueError("GOOGLE_API_KEY が設定されていません")
         
         try:
             genai.configure(api_key=settings.GOOGLE_API_KEY)
-            print("genai.configure 成功")
-            
             self.model = GenerativeModel(model_name=settings.GEMINI_MODEL_NAME)
-            print("GenerativeModel 作成成功")
-            
         except Exception as e:
-            print(f"GeminiService初期化エラー: {e}")
-            print(f"エラータイプ: {type(e)}")
+            logger.exception(f"GeminiService初期化エラー: {e}")
             raise
         
-        print("=== GeminiService初期化完了 ===")
+        self.llm_executor = llm_executor or default_llm_executor
+        self.pdf_cache = pdf_cache or PDFCache()
+        self.summary_store = summary_store or SummaryStore()
+        self.text_extractor = text_extractor or PDFTextExtractor()
+        self.prompt_registry = prompt_registry or PromptRegistry()
+        self._summary_flight = SingleFlight("summary")
+        
+        logger.info("GeminiService初期化完了")
+    
+    def _summary_prompt_hash(self, template: PromptTemplate) -> str:
+        """要約プロンプトのバージョン（テンプレートと抜粋設定が変われば変わる）"""
+        excerpt_config = "|".join([
+            str(settings.PDF_SECTION_SELECTION),
+            str(settings.PDF_TOKEN_BUDGET),
+            ",".join(settings.PDF_PRIORITY_SECTIONS),
+            ",".join(settings.PDF_EXCLUDED_SECTIONS),
+            str(settings.MAX_PDF_CHARS),
+        ])
+        return hashlib.sha256(f"{template.version}\n{excerpt_config}".encode("utf-8")).hexdigest()
     
-    def _load_prompt(self, filename: str) -> str:
-        """プロンプトファイルを読み込み"""
-        filepath = os.path.join(settings.PROMPTS_DIR, filename)
-        with open(filepath, "r", encoding="utf-8") as f:
-            return f.read()
+    async def _generate_text(self, prompt: RenderedPrompt, on_token: Optional[TokenCallback] = None) -> str:
+        """テキストを生成（on_token 指定時はストリーミングで断片を通知）"""
+        template = prompt.template.removesuffix(".txt")
+        LLM_PROMPT_TOKENS.labels(template).observe(prompt.estimated_tokens)
+        with span(f"gemini.{template}"):
+            if on_token is not None:
+                text = await self.llm_executor.generate_stream(
+                    self.model, prompt.text, on_token, estimated_tokens=prompt.estimated_tokens
+                )
+            else:
+                response = await self.llm_executor.generate(
+                    self.model, prompt.text, estimated_tokens=prompt.estimated_tokens
+                )
+                text = response.text
+        LLM_RESPONSE_CHARS.labels(template).observe(len(text or ""))
+        logger.info(
+            f"Gemini応答: {template} (推定入力 {prompt.estimated_tokens} トークン, 出力 {len(text or '')} 文字)",
+            extra={"template": template, "prompt_tokens": prompt.estimated_tokens,
+                   "response_chars": len(text or "")}
+        )
+        return text
    
-    async def summarize_securities_report(self, pdf_url: str, company_name: str) -> str:
+    async def summarize_securities_report(
+        self,
+        pdf_url: str,
+        company_name: str,
+        company_code: Optional[str] = None,
+        on_token: Optional[TokenCallback] = None
+    ) -> str:
         """有価証券報告書を要約"""
         try:
-            print(f"=== summarize_securities_report 開始 ===")
-            print(f"PDF URL: {pdf_url}")
-            print(f"企業名: {company_name}")
-            
-            # 1. PDFデータをダウンロード
-            print("PDFダウンロード開始...")
-            response = requests.get(pdf_url)
-            response.raise_for_status()
-            print(f"PDFダウンロード成功: {len(response.content)} bytes")
-            
-            # 2. fitz で PDF を読み込む
-            print("PDF読み込み開始...")
-            doc = fitz.open(stream=response.content, filetype="pdf")
-            print(f"PDF読み込み成功: {len(doc)} pages")
-            
-            # 3. テキスト抽出
-            print("テキスト抽出開始...")
-            text = ""
-            for page in doc:
-                text += page.get_text()
-            print(f"テキスト抽出成功: {len(text)} 文字")
+            logger.info(f"要約開始: {company_name} ({pdf_url})")
             
-            # 4. プロンプトファイルを読み込む
-            print("プロンプト読み込み開始...")
-            prompt_template = self._load_prompt("prompt.txt")
-            print(f"プロンプトテンプレート読み込み成功: {len(prompt_template)} 文字")
+            # 1. PDFデータを取得（ディスクキャッシュ経由）
+            with span("pdf_fetch"):
+                cached_pdf = await self.pdf_cache.get(pdf_url)
+            logger.debug(f"PDF取得成功: {cached_pdf.size} bytes (sha256={cached_pdf.content_hash})")
             
-            prompt_text = prompt_template.replace("[企業名を入力]", company_name) + "\n" + text[:settings.MAX_PDF_CHARS]
-            print(f"最終プロンプト準備完了: {len(prompt_text)} 文字")
-            print(f"MAX_PDF_CHARS設定: {settings.MAX_PDF_CHARS}")
+            prompt_template = self.prompt_registry.get("prompt.txt")
             
-            # 5. Gemini APIで要約を取得
-            print("Gemini API呼び出し開始...")
-            print(f"使用モデル: {settings.GEMINI_MODEL_NAME}")
+            prompt_hash = self._summary_prompt_hash(prompt_template)
             
-            response = self.model.generate_content(prompt_text)
-            print("Gemini API呼び出し成功")
-            print(f"レスポンス取得: {len(response.text) if response.text else 0} 文字")
+            # 保存済みの要約があればGeminiを呼ばずに返す
+            summary_key = None
+            if company_code:
+                summary_key = SummaryKey(
+                    company_code=company_code,
+                    pdf_hash=cached_pdf.content_hash,
+                    prompt_hash=prompt_hash,
+                    model_name=settings.GEMINI_MODEL_NAME,
+                )
+                stored_summary = await asyncio.to_thread(self.summary_store.get, summary_key)
+                record_cache("summary", "hit" if stored_summary is not None else "miss")
+                if stored_summary is not None:
+                    logger.info(f"保存済み要約を使用: {company_name}")
+                    return stored_summary
             
-            return response.text
+            # 同じ企業・PDF・プロンプトの要約が実行中なら、その結果を共有する
+            # （合流した呼び出しには途中の断片は通知されず、完成した要約のみ返る）
+            flight_key = (
+                company_code or company_name,
+                cached_pdf.content_hash,
+                prompt_hash,
+                settings.GEMINI_MODEL_NAME,
+            )
+            return await self._summary_flight.do(
+                flight_key,
+                lambda: self._summarize_pdf(
+                    cached_pdf, prompt_template, company_name, summary_key, on_token
+                ),
+            )
             
-        except requests.RequestException as e:
-            print(f"PDFダウンロードエラー: {e}")
+        except httpx.HTTPError as e:
+            logger.error(f"PDFダウンロードエラー: {e}")
             raise
         except Exception as e:
-            print(f"summarize_securities_report エラー: {e}")
-            print(f"エラータイプ: {type(e)}")
-            import traceback
-            print(f"スタックトレース: {traceback.format_exc()}")
+            logger.exception(f"summarize_securities_report エラー: {e}")
             raise
+    
+    async def _summarize_pdf(
+        self,
+        cached_pdf: CachedPDF,
+        prompt_template: PromptTemplate,
+        company_name: str,
+        summary_key: Optional[SummaryKey],
+        on_token: Optional[TokenCallback] = None
+    ) -> str:
+        """PDFからテキストを抽出して要約を生成し、保存する"""
+        # 2. テキスト抽出
+        excerpt = None
+        # 読み込みが終わるまでPDFをキャッシュから削除させない
+        async with self.pdf_cache.in_use(cached_pdf.content_hash):
+            with span("pdf_extract"):
+                if settings.PDF_SECTION_SELECTION:
+                    # 重要な章を優先してトークン予算内で抜粋
+                    excerpt = await self.text_extractor.extract_excerpt(cached_pdf.path)
+                    if excerpt is not None and not excerpt.text.strip():
+                        logger.info("選択した章に本文がないため先頭から抽出します")
+                        excerpt = None
+                if excerpt is not None:
+                    text = excerpt.text
+                    logger.info(f"章抜粋: {len(excerpt.sections)}/{excerpt.total_sections} 章, 推定 {excerpt.estimated_tokens} トークン")
+                    logger.debug(f"採用した章: {excerpt.sections}")
+                else:
+                    # 章が検出できない（本文が空の）場合は先頭から上限文字数まで
+                    extraction = await self.text_extractor.extract(cached_pdf.path, settings.MAX_PDF_CHARS)
+                    text = extraction.text
+                    logger.info(f"テキスト抽出: {len(text)} 文字 ({extraction.pages_read}/{extraction.total_pages} pages)")
+        
+        # 3. プロンプトを組み立てる
+        # 報告書本文はテンプレートの末尾に付ける
+        header = prompt_template.render(company_name=company_name)
+        prompt = RenderedPrompt(
+            text=f"{header.text}\n{text}",
+            template=header.template,
+            version=header.version,
+            estimated_tokens=header.estimated_tokens + estimate_tokens(text) + 1,
+        )
+        logger.debug(f"要約プロンプト: {len(prompt.text)} 文字 (推定 {prompt.estimated_tokens} トークン)")
+        
+        # 4. Gemini APIで要約を取得
+        summary = await self._generate_text(prompt, on_token)
+        
+        if summary_key is not None and summary:
+            await asyncio.to_thread(self.summary_store.put, summary_key, company_name, summary)
+        
+        return summary
         
     async def generate_hypothesis(
         self, 
         summary: str, 
         department_name: str, 
         position_name: str, 
-        job_scope: str
+        job_scope: str,
+        on_token: Optional[TokenCallback] = None
     ) -> str:
         """仮説を生成"""
-        prompt_template = self._load_prompt("hypothesis_prompt.txt")
-        prompt = prompt_template.replace("{securities_report_summary}", summary)
-        prompt = prompt.replace("{department_name}", department_name)
-        prompt = prompt.replace("{position_title}", position_name)
-        prompt = prompt.replace("{job_scope}", job_scope)
+        prompt = self.prompt_registry.render(
+            "hypothesis_prompt.txt",
+            securities_report_summary=summary,
+            department_name=department_name,
+            position_name=position_name,
+            position_title=position_name,
+            job_scope=job_scope,
+        )
         
-        response = self.model.generate_content(prompt)
-        return response.text
+        return await self._generate_text(prompt, on_token)
     
-    async def match_solutions(self, hypothesis: str, solutions: List[Solution]) -> str:
-        """ソリューションマッチング"""
-        prompt_template = self._load_prompt("solution_matching_prompt.txt")
-        
-        solutions_text = "\n".join([
-            f"・{s.name}：{s.features}（用途：{s.use_case}）"
-            for s in solutions
-        ])
+    async def match_solutions(
+        self,
+        hypothesis: str,
+        solutions: List[Solution],
+        on_token: Optional[TokenCallback] = None,
+        solutions_text: Optional[str] = None
+    ) -> str:
+        """ソリューションマッチング（solutions_text は整形済みの一覧があれば渡す）"""
+        if solutions_text is None:
+            solutions_text = format_solutions(solutions)
         
-        prompt = prompt_template.replace("{hypothesis}", hypothesis)
-        prompt = prompt.replace("{solutions}", solutions_text)
+        prompt = self.prompt_registry.render(
+            "solution_matching_prompt.txt",
+            hypothesis=hypothesis,
+            solutions=solutions_text,
+        )
         
-        response = self.model.generate_content(prompt)
-        return response.text
+        return await self._generate_text(prompt, on_token)
     
     async def generate_hearing_items(
         self,
         company_name: str,
         department_name: str,
         position_name: str,
-        hypothesis: str
+        hypothesis: str,
+        on_token: Optional[TokenCallback] = None
     ) -> str:
         """ヒアリング項目を生成"""
-        prompt_template = self._load_prompt("hearing_prompt.txt")
-        
-        prompt = prompt_template.replace("{company_name}", company_name)
-        prompt = prompt.replace("{department_name}", department_name)
-        prompt = prompt.replace("{position_name}", position_name)
-        prompt = prompt.replace("{company_size}", "")
-        prompt = prompt.replace("{industry}", "")
-        prompt = prompt.replace("{hypothesis}", hypothesis)
+        prompt = self.prompt_registry.render(
+            "hearing_prompt.txt",
+            company_name=company_name,
+            department_name=department_name,
+            position_name=position_name,
+            company_size="",
+            industry="",
+            hypothesis=hypothesis,
+        )
         
-        response = self.model.generate_content(prompt)
-        return response.text
+        return await self._generate_text(prompt, on_token)
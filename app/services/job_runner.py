@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.models.schemas import CompanySearchRequest, CompanySearchResponse
+from app.services.company_service import CompanyService
+from app.services.job_store import JobStore
+from app.services.quota_governor import PRIORITY_BATCH, llm_priority
+
+logger = logging.getLogger(__name__)
+
+JOB_KIND_ANALYSIS = "analysis"
+
+
+class JobRunner:
+    """分析ジョブをバックグラウンドで実行するワーカー
+
+    ジョブはストアから確保して処理し、ステージが完了するたびに結果を保存する。
+    再開時は保存済みのステージを飛ばして続きから実行する。
+    """
+
+    def __init__(
+        self,
+        job_store: JobStore,
+        company_service: CompanyService,
+        workers: int = settings.JOB_WORKERS,
+        lease_seconds: float = settings.JOB_LEASE_SECONDS,
+        poll_seconds: float = settings.JOB_POLL_SECONDS,
+        max_attempts: int = settings.JOB_MAX_ATTEMPTS,
+    ):
+        self.job_store = job_store
+        self.company_service = company_service
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        # プロセスごとのワーカーID（リースの所有者）
+        self.owner = uuid.uuid4().hex
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._running_jobs: Dict[str, asyncio.Task] = {}
+
+    def start(self):
+        """ワーカーを起動（保存済みの未完了ジョブもここで拾われる）"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker_loop(), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"ジョブワーカー起動: {self.workers}")
+
+    async def stop(self):
+        """ワーカーを停止し、処理中のジョブを待機状態に戻す"""
+        running_job_ids = list(self._running_jobs)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job_id in running_job_ids:
+            await asyncio.to_thread(self.job_store.release, job_id, self.owner)
+
+    async def submit(self, request: CompanySearchRequest) -> str:
+        """ジョブを登録してIDを返す"""
+        job_id = await asyncio.to_thread(
+            self.job_store.create, JOB_KIND_ANALYSIS, request.model_dump()
+        )
+        self._wakeup.set()
+        return job_id
+
+    async def _worker_loop(self):
+        # ジョブストアは SQLite のため、呼び出しはすべてスレッドで実行する
+        while True:
+            try:
+                job = await asyncio.to_thread(
+                    self.job_store.claim_next, self.owner, self.lease_seconds
+                )
+            except Exception as e:
+                # ロック待ちのタイムアウトなどで止まらないよう、少し待って続ける
+                logger.error(f"ジョブの取得に失敗しました（{self.poll_seconds}秒後に再試行）: {e!r}")
+                await asyncio.sleep(self.poll_seconds)
+                continue
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._process(job))
+            self._running_jobs[job["id"]] = task
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise
+            except Exception as e:
+                logger.error(f"ジョブ処理エラー: {job['id']}: {e}")
+            finally:
+                self._running_jobs.pop(job["id"], None)
+
+    async def _heartbeat(self, job_id: str, analysis: asyncio.Task, lease_lost: asyncio.Event):
+        """リースを延長し続ける（他のワーカーに引き継がれたら分析を中断する）"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await asyncio.to_thread(
+                    self.job_store.renew_lease, job_id, self.owner, self.lease_seconds
+                )
+            except Exception as e:
+                # 次の延長で取り戻せるので処理は続ける
+                logger.warning(f"ジョブのリース延長に失敗しました: {job_id}: {e!r}")
+                continue
+            if not renewed:
+                logger.warning(f"ジョブのリースを失ったため処理を中断します: {job_id}")
+                lease_lost.set()
+                analysis.cancel()
+                return
+
+    async def _process(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        if job["attempts"] > self.max_attempts:
+            await asyncio.to_thread(
+                self.job_store.finish,
+                job_id,
+                CompanySearchResponse(success=False, error_message="ジョブの再試行回数の上限に達しました").model_dump(),
+                success=False,
+                error_message="ジョブの再試行回数の上限に達しました",
+            )
+            return
+
+        request = CompanySearchRequest(**job["request"])
+        completed: Dict[str, Any] = job["stage_results"]
+        if completed:
+            logger.info(f"ジョブ再開: {job_id} (完了済み: {list(completed)})")
+        else:
+            logger.info(f"ジョブ開始: {job_id}")
+
+        async def on_event(event: Dict[str, Any]):
+            if event["event"] != "stage":
+                return
+            # 文字列の結果だけを保存する（ソリューション一覧は再開時に読み直す）
+            if "error" in event or "data" in event:
+                await asyncio.to_thread(
+                    self.job_store.save_stage, job_id, event["stage"], event["elapsed_ms"],
+                    value=event.get("data"), error=event.get("error")
+                )
+
+        # 非同期ジョブの Gemini 呼び出しは対話的なリクエストより後回しにする
+        with llm_priority(PRIORITY_BATCH):
+            analysis = asyncio.create_task(self.company_service.analyze_company(
+                request, on_event=on_event, completed_stages=completed,
+                budget_seconds=settings.JOB_BUDGET_SECONDS
+            ))
+        lease_lost = asyncio.Event()
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, analysis, lease_lost))
+        try:
+            try:
+                result = await analysis
+            except asyncio.CancelledError:
+                if lease_lost.is_set() and not asyncio.current_task().cancelling():
+                    # 引き継いだワーカーが結果を書くので、ここでは何も保存しない
+                    return
+                raise
+            await asyncio.to_thread(
+                self.job_store.finish,
+                job_id, result.model_dump(), result.success, result.error_message or None
+            )
+            logger.info(f"ジョブ完了: {job_id} (success={result.success})")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            message = f"APIサーバーエラー: {str(e)}"
+            await asyncio.to_thread(
+                self.job_store.finish,
+                job_id,
+                CompanySearchResponse(success=False, error_message=message).model_dump(),
+                success=False,
+                error_message=message,
+            )
+        finally:
+            heartbeat.cancel()
+            if not analysis.done():
+                analysis.cancel()
+                await asyncio.gather(analysis, return_exceptions=True)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.job_store.get, job_id)
@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+# ジョブの状態
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class JobStore:
+    """分析ジョブの永続ストア（SQLite）
+
+    ステージ結果は完了するたびに保存し、ワーカーが落ちても途中から再開できる。
+    処理中のジョブにはワーカーごとの占有期限（リース）を付け、期限切れの
+    ジョブは別のワーカー（再起動後の自分を含む）が引き継ぐ。
+    """
+
+    def __init__(self, db_path: str = settings.JOB_STORE_PATH):
+        self.db_path = db_path
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage_results TEXT NOT NULL DEFAULT '{}',
+                    stage_timings TEXT NOT NULL DEFAULT '{}',
+                    stage_errors TEXT NOT NULL DEFAULT '{}',
+                    result TEXT,
+                    error_message TEXT,
+                    owner TEXT,
+                    lease_until REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["request"] = json.loads(job["request"])
+        for column in ("stage_results", "stage_timings", "stage_errors"):
+            job[column] = json.loads(job[column])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def create(self, kind: str, request: Dict[str, Any]) -> str:
+        """ジョブを登録してIDを返す"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO jobs (id, kind, request, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (job_id, kind, json.dumps(request, ensure_ascii=False), JOB_QUEUED, now, now),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def claim_next(self, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """待機中、またはリース切れの処理中ジョブを1件確保"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                """
+                SELECT id FROM jobs
+                WHERE status = ? OR (status = ? AND lease_until < ?)
+                ORDER BY created_at ASC LIMIT 1
+                """,
+                (JOB_QUEUED, JOB_RUNNING, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                """
+                UPDATE jobs
+                SET status = ?, owner = ?, lease_until = ?, attempts = attempts + 1, updated_at = ?
+                WHERE id = ?
+                """,
+                (JOB_RUNNING, owner, now + lease_seconds, now, row["id"]),
+            )
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return self._to_dict(job)
+
+    def renew_lease(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """リースを延長（他のワーカーに引き継がれていたら False）"""
+        now = time.time()
+        with self._connect() as conn:
+            updated = conn.execute(
+                """
+                UPDATE jobs SET lease_until = ?, updated_at = ?
+                WHERE id = ? AND owner = ? AND status = ?
+                """,
+                (now + lease_seconds, now, job_id, owner, JOB_RUNNING),
+            ).rowcount
+        return updated == 1
+
+    def save_stage(self, job_id: str, stage: str, elapsed_ms: float,
+                   value: Optional[Any] = None, error: Optional[str] = None):
+        """ステージの結果（または失敗）を保存"""
+        job = self.get(job_id)
+        if job is None:
+            return
+        job["stage_timings"][stage] = elapsed_ms
+        if error is not None:
+            job["stage_errors"][stage] = error
+        else:
+            job["stage_results"][stage] = value
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE jobs SET stage_results = ?, stage_timings = ?, stage_errors = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (
+                    json.dumps(job["stage_results"], ensure_ascii=False),
+                    json.dumps(job["stage_timings"]),
+                    json.dumps(job["stage_errors"], ensure_ascii=False),
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def finish(self, job_id: str, result: Dict[str, Any], success: bool,
+               error_message: Optional[str] = None):
+        """ジョブを完了状態にする"""
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE jobs
+                SET status = ?, result = ?, error_message = ?, owner = NULL, lease_until = NULL, updated_at = ?
+                WHERE id = ?
+                """,
+                (
+                    JOB_SUCCEEDED if success else JOB_FAILED,
+                    json.dumps(result, ensure_ascii=False),
+                    error_message,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def release(self, job_id: str, owner: str):
+        """シャットダウン時に処理中のジョブを待機状態へ戻す（完了済みステージは保持）
+
+        中断は失敗ではないので、確保時に数えた試行回数を戻す。
+        """
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE jobs
+                SET status = ?, owner = NULL, lease_until = NULL, attempts = MAX(attempts - 1, 0), updated_at = ?
+                WHERE id = ? AND owner = ? AND status = ?
+                """,
+                (JOB_QUEUED, time.time(), job_id, owner, JOB_RUNNING),
+            )
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.services.quota_governor import QuotaGovernor, quota_governor as default_quota_governor
+from app.utils.metrics import LLM_IN_FLIGHT, LLM_QUEUE_DEPTH
+from app.utils.report_sections import estimate_tokens
+from app.utils.resilience import (
+    GEMINI_UPSTREAM,
+    call_with_retry,
+    circuit_breakers,
+    is_transient,
+    wait_with_timeout,
+)
+
+logger = logging.getLogger(__name__)
+
+# ストリーミング生成の断片を受け取るコールバック
+TokenCallback = Callable[[str], Awaitable[None]]
+
+
+class LLMExecutor:
+    """Gemini 呼び出しの実行器
+
+    SDK のネイティブ非同期API（generate_content_async）で呼び出し、
+    同時実行数をセマフォで制限する。呼び出し前にクォータ管理で見込み
+    トークン数を予約する。待ち行列の長さ・待ち時間を計測し、
+    呼び出し元のタスクがキャンセルされた場合はそのまま中断する。
+    一時的な失敗（429/5xx・タイムアウト）は予約からやり直して再試行する。
+    終了時は drain で新しい呼び出しの開始を止め、実行中の呼び出しの完了を待つ。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = settings.LLM_MAX_CONCURRENCY,
+        quota: Optional[QuotaGovernor] = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.quota = quota or default_quota_governor
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # クリアすると枠を待っている呼び出しは開始せずに待ち続ける（終了時）
+        self._accepting = asyncio.Event()
+        self._accepting.set()
+        # 非同期APIを持たないモデル用のワーカープール
+        self._thread_pool = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="llm"
+        )
+
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    async def _call(self, model, prompt: str, **kwargs):
+        if hasattr(model, "generate_content_async"):
+            return await model.generate_content_async(prompt, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._thread_pool, lambda: model.generate_content(prompt, **kwargs)
+        )
+
+    @asynccontextmanager
+    async def _slot(self):
+        """同時実行数の枠を確保（待ち時間・実行時間を計測）"""
+        enqueued_at = time.perf_counter()
+        self.queue_depth += 1
+        LLM_QUEUE_DEPTH.inc()
+        try:
+            while True:
+                await self._accepting.wait()
+                await self._semaphore.acquire()
+                if self._accepting.is_set():
+                    break
+                self._semaphore.release()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.queue_depth -= 1
+            LLM_QUEUE_DEPTH.dec()
+
+        wait_seconds = time.perf_counter() - enqueued_at
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+        if wait_seconds > 1:
+            logger.info(f"LLM実行待ち: {wait_seconds:.2f}秒")
+
+        self.in_flight += 1
+        LLM_IN_FLIGHT.inc()
+        started_at = time.perf_counter()
+        try:
+            yield
+            self.completed += 1
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            logger.info("LLM呼び出しをキャンセルしました")
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.total_run_seconds += time.perf_counter() - started_at
+            self.in_flight -= 1
+            LLM_IN_FLIGHT.dec()
+            self._semaphore.release()
+
+    async def _reserve_quota(self, input_tokens: int) -> List[float]:
+        """入力と出力の見込みトークン数でクォータを予約"""
+        return await self.quota.acquire(input_tokens + settings.GEMINI_EXPECTED_OUTPUT_TOKENS)
+
+    def _settle_quota(self, reservation: List[float], input_tokens: int, output: str):
+        self.quota.settle(reservation, input_tokens + estimate_tokens(output or ""))
+
+    async def generate(self, model, prompt: str, estimated_tokens: Optional[int] = None, **kwargs):
+        """クォータと同時実行数の枠を確保してからコンテンツを生成
+
+        estimated_tokens は入力の推定トークン数（省略時はプロンプトから推定）。
+        """
+        input_tokens = estimated_tokens if estimated_tokens is not None else estimate_tokens(prompt)
+        breaker = circuit_breakers.get(GEMINI_UPSTREAM)
+
+        async def attempt():
+            reservation = await self._reserve_quota(input_tokens)
+            try:
+                async with self._slot():
+                    with breaker.guard():
+                        response = await wait_with_timeout(
+                            lambda: self._call(model, prompt, **kwargs),
+                            settings.GEMINI_CALL_TIMEOUT,
+                        )
+            except BaseException:
+                self.quota.release(reservation)
+                raise
+            try:
+                output = response.text
+            except Exception:
+                output = ""
+            self._settle_quota(reservation, input_tokens, output)
+            return response
+
+        return await call_with_retry(attempt, GEMINI_UPSTREAM)
+
+    async def _stream(self, model, prompt: str, on_token: TokenCallback, **kwargs) -> str:
+        if not hasattr(model, "generate_content_async"):
+            response = await self._call(model, prompt, **kwargs)
+            await on_token(response.text)
+            return response.text
+        response = await model.generate_content_async(prompt, stream=True, **kwargs)
+        chunks = []
+        async for chunk in response:
+            text = chunk.text
+            if text:
+                chunks.append(text)
+                await on_token(text)
+        return "".join(chunks)
+
+    async def generate_stream(
+        self,
+        model,
+        prompt: str,
+        on_token: TokenCallback,
+        estimated_tokens: Optional[int] = None,
+        **kwargs
+    ) -> str:
+        """ストリーミングで生成し、断片ごとに on_token を呼ぶ（全文を返す）
+
+        ストリームを読み切るまで枠を保持する。非同期APIを持たないモデルは
+        一括生成した全文を1回で通知する。断片を通知した後の失敗は再試行しない。
+        """
+        input_tokens = estimated_tokens if estimated_tokens is not None else estimate_tokens(prompt)
+        breaker = circuit_breakers.get(GEMINI_UPSTREAM)
+        emitted = False
+
+        async def forward(text: str):
+            nonlocal emitted
+            emitted = True
+            await on_token(text)
+
+        async def attempt() -> str:
+            reservation = await self._reserve_quota(input_tokens)
+            try:
+                async with self._slot():
+                    with breaker.guard():
+                        output = await wait_with_timeout(
+                            lambda: self._stream(model, prompt, forward, **kwargs),
+                            settings.GEMINI_CALL_TIMEOUT,
+                        )
+            except BaseException:
+                self.quota.release(reservation)
+                raise
+            self._settle_quota(reservation, input_tokens, output)
+            return output
+
+        return await call_with_retry(
+            attempt, GEMINI_UPSTREAM, retryable=lambda e: not emitted and is_transient(e)
+        )
+
+    async def drain(self, timeout: float) -> bool:
+        """新しい呼び出しの開始を止め、実行中の呼び出しの完了を待つ（終了時）
+
+        止めた後に枠を待つ呼び出しは、呼び出し元がキャンセルされるまで待ち続ける。
+        timeout 秒以内に全て完了すれば True。
+        """
+        self._accepting.clear()
+        deadline = time.monotonic() + timeout
+        if self.in_flight:
+            logger.info(f"実行中の LLM 呼び出しの完了を待っています ({self.in_flight}件)")
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self.in_flight:
+            logger.warning(f"LLM 呼び出しが {timeout}秒以内に完了しませんでした ({self.in_flight}件)")
+            return False
+        return True
+
+    def resume(self):
+        """drain で止めた呼び出しの開始を再開（起動時）"""
+        self._accepting.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """実行状況の統計"""
+        finished = self.completed + self.failed + self.cancelled
+        return {
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "accepting": self._accepting.is_set(),
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+            "avg_wait_seconds": round(self.total_wait_seconds / finished, 3) if finished else 0.0,
+            "total_run_seconds": round(self.total_run_seconds, 3),
+            "quota": self.quota.stats(),
+        }
+
+    def shutdown(self):
+        """ワーカープールを停止"""
+        self._thread_pool.shutdown(wait=False, cancel_futures=True)
+
+
+llm_executor = LLMExecutor()
@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.services.pdf_service import PDFService
+from app.services.report_cache import CachedReport, ReportCache, report_key
+from app.utils.metrics import record_cache, span
+from app.utils.pdf_spool import SpooledPDF, spool_pdf
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# ワーカープロセス内で使い回す PDFService（フォント・スタイル登録済み）
+_worker_service: Optional[PDFService] = None
+
+
+def _init_worker():
+    global _worker_service
+    _worker_service = PDFService()
+
+
+def _warmup() -> bool:
+    # 全ワーカーが起動するよう少し待つ
+    time.sleep(0.1)
+    return _worker_service is not None
+
+
+def _render_analysis_report(
+    spool_dir: str,
+    spool_max_memory: int,
+    company_data: Dict[str, str],
+    results: Dict[str, str],
+    solutions: list,
+    generated_at: Optional[datetime] = None
+) -> SpooledPDF:
+    return spool_pdf(
+        lambda output: _worker_service.generate_analysis_report(
+            company_data=company_data, results=results, solutions=solutions,
+            generated_at=generated_at, output=output
+        ),
+        spool_dir,
+        spool_max_memory,
+    )
+
+
+def _render_simple_text_pdf(spool_dir: str, spool_max_memory: int, text: str, title: str) -> SpooledPDF:
+    return spool_pdf(
+        lambda output: _worker_service.generate_simple_text_pdf(text=text, title=title, output=output),
+        spool_dir,
+        spool_max_memory,
+    )
+
+
+class PDFRendererBusy(Exception):
+    """生成待ちが上限に達している"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("PDF生成が混み合っています")
+        self.retry_after = retry_after
+
+
+class PDFRenderer:
+    """reportlab によるPDF生成をプロセスプールで実行する
+
+    各ワーカーは起動時に日本語フォントとスタイルを登録済み。実行中と待機中の
+    合計が workers + max_queue を超えると PDFRendererBusy を送出する。
+    ワーカーが異常終了（OOM など）したらプロセスプールを作り直し、1回だけ再実行する。
+    生成したPDFは PDF_SPOOL_MAX_MEMORY を超えるとワーカーが一時ファイルに
+    書き出し、プロセス間ではパスだけを受け渡す。分析レポートは内容の
+    ハッシュをキーにキャッシュし、同じ内容なら再生成しない。
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.PDF_RENDER_WORKERS,
+        max_queue: int = settings.PDF_RENDER_MAX_QUEUE,
+        report_cache: Optional[ReportCache] = None,
+        spool_dir: str = settings.PDF_SPOOL_DIR,
+        spool_max_memory: int = settings.PDF_SPOOL_MAX_MEMORY,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.spool_dir = spool_dir
+        self.spool_max_memory = spool_max_memory
+        self.report_cache = report_cache or ReportCache()
+        self._report_flight = SingleFlight("report_render")
+        self.pending = 0
+        self.rejected = 0
+        self.restarts = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = asyncio.Lock()
+
+    async def start(self):
+        """ワーカーを起動してウォームアップ"""
+        async with self._pool_lock:
+            if self._pool is not None:
+                return
+            # grpc 等のスレッドを持つ親プロセスを fork しないよう spawn で起動
+            pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*[
+                loop.run_in_executor(pool, _warmup) for _ in range(self.workers)
+            ])
+            self._pool = pool
+            logger.info(f"PDF生成ワーカー起動: {self.workers}プロセス")
+
+    async def _replace_pool(self, broken: ProcessPoolExecutor):
+        """異常終了したプロセスプールを作り直す（他の呼び出しが作り直し済みなら何もしない）"""
+        async with self._pool_lock:
+            if self._pool is broken:
+                logger.warning("PDF生成ワーカーが異常終了したため、プロセスプールを作り直します")
+                self._pool = None
+                self.restarts += 1
+                broken.shutdown(wait=False, cancel_futures=True)
+        await self.start()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def _submit(self, func, *args) -> SpooledPDF:
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            # 1件あたり数秒として、待ち行列が捌けるまでの目安を返す
+            raise PDFRendererBusy(retry_after=max(1, self.pending // max(self.workers, 1)) * 2)
+
+        if self._pool is None:
+            await self.start()
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            # PDFService はワーカープロセスで動くため、投入から受け取りまでを計測する
+            with span(f"pdf_render{func.__name__.removeprefix('_render')}"):
+                for attempt in range(2):
+                    pool = self._pool
+                    try:
+                        return await loop.run_in_executor(
+                            pool, func, self.spool_dir, self.spool_max_memory, *args
+                        )
+                    except BrokenProcessPool:
+                        if attempt:
+                            raise
+                        await self._replace_pool(pool)
+        finally:
+            self.pending -= 1
+
+    async def get_analysis_report(
+        self,
+        company_data: Dict[str, str],
+        results: Dict[str, str],
+        solutions: List[Dict[str, str]]
+    ) -> CachedReport:
+        """分析レポートPDFを取得（同じ内容の生成済みPDFがあればそれを返す）"""
+        key = report_key(company_data, results, solutions)
+        report = await asyncio.to_thread(self.report_cache.get, key)
+        record_cache("report", "hit" if report is not None else "miss")
+        if report is not None:
+            return report
+        # 同じ内容の生成が実行中ならその結果を待つ
+        return await self._report_flight.do(
+            key, lambda: self._render_report(key, company_data, results, solutions)
+        )
+
+    async def _render_report(
+        self,
+        key: str,
+        company_data: Dict[str, str],
+        results: Dict[str, str],
+        solutions: List[Dict[str, str]]
+    ) -> CachedReport:
+        generated_at = time.time()
+        pdf = await self._submit(
+            _render_analysis_report, company_data, results, solutions,
+            datetime.fromtimestamp(generated_at)
+        )
+        return await asyncio.to_thread(self.report_cache.put, key, pdf, generated_at)
+
+    async def render_simple_text_pdf(self, text: str, title: str = "レポート") -> SpooledPDF:
+        """シンプルなテキストPDFを生成（一時ファイルの場合は送信後に remove_spooled で削除する）"""
+        return await self._submit(_render_simple_text_pdf, text, title)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "report_cache": self.report_cache.stats(),
+        }
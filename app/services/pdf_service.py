@@ -1,6 +1,7 @@
 import io
+import logging
 from datetime import datetime
-from typing import Dict, Any
+from typing import BinaryIO, Dict, Any, Optional
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, letter
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
@@ -11,6 +12,8 @@ from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 import os
 
+logger = logging.getLogger(__name__)
+
 class PDFService:
     """PDF生成サービス"""
     
@@ -40,9 +43,9 @@ class PDFService:
                     break
             else:
                 # フォントが見つからない場合はデフォルトを使用
-                print("Warning: Japanese font not found, using default font")
+                logger.warning("日本語フォントが見つからないため、既定のフォントを使用します")
         except Exception as e:
-            print(f"Font setup error: {e}")
+            logger.error(f"フォント設定エラー: {e}")
     
     def _setup_custom_styles(self):
         """カスタムスタイルの設定"""
@@ -87,11 +90,16 @@ class PDFService:
         self, 
         company_data: Dict[str, str], 
         results: Dict[str, str],
-        solutions: list
-    ) -> io.BytesIO:
-        """分析レポートPDFを生成"""
+        solutions: list,
+        generated_at: Optional[datetime] = None,
+        output: Optional[BinaryIO] = None
+    ) -> BinaryIO:
+        """分析レポートPDFを生成（generated_at 省略時は現在時刻を生成日時とする）
+
+        output を渡すとそこへ書き出す（省略時は BytesIO を返す）。
+        """
         
-        buffer = io.BytesIO()
+        buffer = output if output is not None else io.BytesIO()
         doc = SimpleDocTemplate(
             buffer,
             pagesize=A4,
@@ -109,7 +117,7 @@ class PDFService:
         story.append(Spacer(1, 20))
         
         # 生成日時
-        current_time = datetime.now().strftime("%Y年%m月%d日 %H:%M:%S")
+        current_time = (generated_at or datetime.now()).strftime("%Y年%m月%d日 %H:%M:%S")
         date_info = Paragraph(f"生成日時: {current_time}", self.styles['JapaneseSmall'])
         story.append(date_info)
         story.append(Spacer(1, 20))
@@ -201,9 +209,14 @@ class PDFService:
         
         return buffer
     
-    def generate_simple_text_pdf(self, text: str, title: str = "レポート") -> io.BytesIO:
-        """シンプルなテキストPDFを生成"""
-        buffer = io.BytesIO()
+    def generate_simple_text_pdf(
+        self,
+        text: str,
+        title: str = "レポート",
+        output: Optional[BinaryIO] = None
+    ) -> BinaryIO:
+        """シンプルなテキストPDFを生成（output を渡すとそこへ書き出す）"""
+        buffer = output if output is not None else io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4)
         
         story = []
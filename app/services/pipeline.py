@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.utils.metrics import span
+
+logger = logging.getLogger(__name__)
+
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class PipelineAbort(Exception):
+    """パイプラインを中断し、メッセージを利用者に返すための例外"""
+
+
+@dataclass
+class Stage:
+    """パイプラインの1ステージ
+
+    func は依存ステージの結果（ステージ名 → 結果）を受け取るコルーチン関数。
+    critical=False のステージが失敗しても、パイプラインは部分結果で続行する。
+    """
+    name: str
+    func: StageFunc
+    depends_on: Tuple[str, ...] = ()
+    critical: bool = True
+
+
+@dataclass
+class PipelineResult:
+    """パイプラインの実行結果"""
+    results: Dict[str, Any] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+
+
+@dataclass
+class StageEvent:
+    """ステージの完了・失敗通知"""
+    name: str
+    elapsed_ms: float
+    value: Any = None
+    error: Optional[str] = None
+
+
+StageCallback = Callable[[StageEvent], Awaitable[None]]
+
+
+class _StageSkipped(Exception):
+    """依存ステージの失敗により実行しなかったことを示す"""
+
+
+class Pipeline:
+    """依存関係に従ってステージを最大限並行に実行するDAG実行器"""
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = {stage.name: stage for stage in stages}
+        self._validate()
+
+    def _validate(self):
+        """未知の依存と循環を検出"""
+        for stage in self.stages.values():
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise ValueError(f"ステージ {stage.name} の依存 {dep} が存在しません")
+
+        visiting, visited = set(), set()
+
+        def visit(name: str):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"ステージの依存関係が循環しています: {name}")
+            visiting.add(name)
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    async def run(
+        self,
+        on_stage_event: Optional[StageCallback] = None,
+        completed: Optional[Dict[str, Any]] = None
+    ) -> PipelineResult:
+        """全ステージを実行（critical なステージの失敗は例外として送出）
+
+        on_stage_event を指定すると、各ステージの完了・失敗時に呼ばれる。
+        completed に渡したステージは実行せず、その結果を使う（中断からの再開用）。
+        """
+        result = PipelineResult()
+        tasks: Dict[str, asyncio.Task] = {}
+        completed = completed or {}
+
+        async def run_stage(stage: Stage):
+            if stage.name in completed:
+                result.results[stage.name] = completed[stage.name]
+                return completed[stage.name]
+
+            for dep in stage.depends_on:
+                try:
+                    await asyncio.shield(tasks[dep])
+                except Exception:
+                    result.skipped.append(stage.name)
+                    raise _StageSkipped(dep)
+
+            inputs = {dep: result.results[dep] for dep in stage.depends_on}
+            started_at = time.perf_counter()
+            try:
+                with span(f"stage.{stage.name}"):
+                    value = await stage.func(inputs)
+            except Exception as e:
+                result.timings[stage.name] = round((time.perf_counter() - started_at) * 1000, 1)
+                result.errors[stage.name] = str(e)
+                logger.error(f"ステージ失敗: {stage.name}: {e}")
+                if on_stage_event is not None:
+                    await on_stage_event(StageEvent(stage.name, result.timings[stage.name], error=str(e)))
+                raise
+
+            result.timings[stage.name] = round((time.perf_counter() - started_at) * 1000, 1)
+            result.results[stage.name] = value
+            logger.info(f"ステージ完了: {stage.name} ({result.timings[stage.name]}ms)")
+            if on_stage_event is not None:
+                await on_stage_event(StageEvent(stage.name, result.timings[stage.name], value=value))
+            return value
+
+        for stage in self.stages.values():
+            tasks[stage.name] = asyncio.create_task(run_stage(stage), name=stage.name)
+
+        try:
+            pending = set(tasks.values())
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stage = self.stages[task.get_name()]
+                    error = task.exception()
+                    if error is None or isinstance(error, _StageSkipped):
+                        continue
+                    if stage.critical:
+                        raise error
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        return result
@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from app.config import settings
+from app.utils.report_sections import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# {snake_case} 形式のプレースホルダー（{課題名} のような出力例の表記は対象外）
+PLACEHOLDER_PATTERN = re.compile(r"\{([a-z_][a-z0-9_]*)\}|(\[企業名を入力\])")
+# 旧形式のプレースホルダー → 名前
+LEGACY_PLACEHOLDERS = {"[企業名を入力]": "company_name"}
+
+# テンプレートごとの (必須プレースホルダー, 任意プレースホルダー)
+PROMPT_SPECS: Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]] = {
+    "prompt.txt": (frozenset({"company_name"}), frozenset()),
+    "hypothesis_prompt.txt": (
+        frozenset({"securities_report_summary", "department_name", "job_scope"}),
+        frozenset({"position_name", "position_title"}),
+    ),
+    "solution_matching_prompt.txt": (frozenset({"hypothesis", "solutions"}), frozenset()),
+    "hearing_prompt.txt": (
+        frozenset({"company_name", "department_name", "position_name", "hypothesis"}),
+        frozenset({"company_size", "industry"}),
+    ),
+}
+
+
+class PromptTemplateError(ValueError):
+    """テンプレートのプレースホルダーが仕様と合わない"""
+
+
+@dataclass(frozen=True)
+class RenderedPrompt:
+    """組み立て済みのプロンプト"""
+    text: str
+    template: str
+    version: str
+    estimated_tokens: int
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """コンパイル済みのテンプレート
+
+    本文を固定部分とプレースホルダーに分割して保持し、描画時は1回の join で
+    組み立てる（値に含まれる「{...}」を再置換することもない）。
+    """
+    name: str
+    # 固定部分とプレースホルダー名が交互に並ぶ（偶数番目が固定部分）
+    parts: Tuple[str, ...]
+    placeholders: FrozenSet[str]
+    # テンプレート本文の SHA-256（キャッシュキーに使う）
+    version: str
+    # 固定部分の推定トークン数
+    static_tokens: int
+    mtime_ns: int = 0
+
+    @classmethod
+    def compile(cls, name: str, source: str, mtime_ns: int = 0) -> "PromptTemplate":
+        parts: List[str] = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            parts.append(source[position:match.start()])
+            parts.append(match.group(1) or LEGACY_PLACEHOLDERS[match.group(2)])
+            position = match.end()
+        parts.append(source[position:])
+        return cls(
+            name=name,
+            parts=tuple(parts),
+            placeholders=frozenset(parts[1::2]),
+            version=hashlib.sha256(source.encode("utf-8")).hexdigest(),
+            static_tokens=sum(estimate_tokens(part) for part in parts[0::2]),
+            mtime_ns=mtime_ns,
+        )
+
+    def validate(self, required: FrozenSet[str], optional: FrozenSet[str]):
+        """必須プレースホルダーの欠落と未知のプレースホルダーを検出"""
+        missing = required - self.placeholders
+        unknown = self.placeholders - required - optional
+        if missing or unknown:
+            raise PromptTemplateError(
+                f"プロンプト {self.name} のプレースホルダーが不正です"
+                f"（不足: {sorted(missing)}, 未定義: {sorted(unknown)}）"
+            )
+
+    def render(self, **values: str) -> RenderedPrompt:
+        """プレースホルダーを値に置き換える（テンプレートにない値は無視）"""
+        missing = self.placeholders - values.keys()
+        if missing:
+            raise PromptTemplateError(f"プロンプト {self.name} の値が不足しています: {sorted(missing)}")
+
+        chunks = list(self.parts)
+        tokens = self.static_tokens
+        for i in range(1, len(chunks), 2):
+            value = values[chunks[i]] or ""
+            chunks[i] = value
+            tokens += estimate_tokens(value)
+        return RenderedPrompt(
+            text="".join(chunks),
+            template=self.name,
+            version=self.version,
+            estimated_tokens=tokens,
+        )
+
+
+class PromptRegistry:
+    """プロンプトテンプレートの登録簿
+
+    起動時に全テンプレートを読み込んでコンパイル・検証する。hot_reload を
+    有効にすると（開発用）、取得のたびにファイルの更新を確認して読み直す。
+    """
+
+    def __init__(
+        self,
+        prompts_dir: str = settings.PROMPTS_DIR,
+        specs: Optional[Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]]] = None,
+        hot_reload: bool = settings.PROMPT_HOT_RELOAD
+    ):
+        self.prompts_dir = prompts_dir
+        self.specs = specs or PROMPT_SPECS
+        self.hot_reload = hot_reload
+        self._lock = threading.Lock()
+        self._templates: Dict[str, PromptTemplate] = {
+            name: self._load(name) for name in self.specs
+        }
+        logger.info(f"プロンプト読み込み: {len(self._templates)}件")
+
+    def _load(self, name: str) -> PromptTemplate:
+        path = os.path.join(self.prompts_dir, name)
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+        template = PromptTemplate.compile(name, source, os.stat(path).st_mtime_ns)
+        template.validate(*self.specs[name])
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        template = self._templates[name]
+        if not self.hot_reload:
+            return template
+
+        mtime_ns = os.stat(os.path.join(self.prompts_dir, name)).st_mtime_ns
+        if mtime_ns == template.mtime_ns:
+            return template
+        with self._lock:
+            try:
+                reloaded = self._load(name)
+            except PromptTemplateError as e:
+                # 編集途中の不正なテンプレートでは落とさず、直前の版を使い続ける
+                logger.error(f"プロンプトの再読み込みに失敗: {e}")
+                return self._templates[name]
+            if reloaded.version != template.version:
+                logger.info(f"プロンプト再読み込み: {name} ({reloaded.version[:12]})")
+            self._templates[name] = reloaded
+            return reloaded
+
+    def render(self, name: str, **values: str) -> RenderedPrompt:
+        return self.get(name).render(**values)
+
+    def describe(self) -> List[Dict[str, object]]:
+        """テンプレートの一覧（名前・版・プレースホルダー・固定部分のトークン数）"""
+        return [
+            {
+                "name": template.name,
+                "version": template.version,
+                "placeholders": sorted(template.placeholders),
+                "static_tokens": template.static_tokens,
+            }
+            for template in (self.get(name) for name in self._templates)
+        ]
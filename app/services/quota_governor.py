@@ -0,0 +1,228 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 呼び出しの優先度（小さいほど優先）
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_PREFETCH = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BATCH: "batch",
+    PRIORITY_PREFETCH: "prefetch",
+}
+
+# 現在の処理の優先度（タスク生成時に引き継がれる）
+_current_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "llm_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+@contextmanager
+def llm_priority(priority: int) -> Iterator[None]:
+    """この中で行う（この中で生成したタスクを含む）Gemini 呼び出しの優先度を指定"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class QuotaExceeded(Exception):
+    """クォータの待ち時間が上限を超える見込みのため呼び出しを断った"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Gemini のクォータ上限に達しています（{retry_after}秒後に再試行してください）")
+        self.retry_after = retry_after
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: int = field(compare=False)
+
+
+class QuotaGovernor:
+    """Gemini 呼び出しの全体クォータ管理（直近1分間のスライディングウィンドウ）
+
+    呼び出し前に見込みトークン数を予約し、1分あたりのリクエスト数・トークン数が
+    上限内に収まるまで待たせる。待ち行列は優先度順（同じ優先度なら到着順）で、
+    対話的なリクエストはバッチ・先読みより先に枠を得る。待ち時間の見込みが
+    優先度ごとの上限を超える場合は待たずに QuotaExceeded を送出する。
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(
+        self,
+        requests_per_minute: int = settings.GEMINI_RPM_LIMIT,
+        tokens_per_minute: int = settings.GEMINI_TPM_LIMIT,
+        max_wait_seconds: Optional[Dict[int, float]] = None,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_wait_seconds = max_wait_seconds or {
+            PRIORITY_INTERACTIVE: settings.LLM_QUOTA_MAX_WAIT_INTERACTIVE,
+            PRIORITY_BATCH: settings.LLM_QUOTA_MAX_WAIT_BATCH,
+            PRIORITY_PREFETCH: settings.LLM_QUOTA_MAX_WAIT_PREFETCH,
+        }
+        # [予約時刻, トークン数]（完了後に実際のトークン数へ更新する）
+        self._usage: Deque[List[float]] = deque()
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._changed: Optional[asyncio.Event] = None
+
+        self.granted = 0
+        self.shed = 0
+        self.total_wait_seconds = 0.0
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    def _prune(self, now: float):
+        while self._usage and self._usage[0][0] <= now - self.WINDOW_SECONDS:
+            self._usage.popleft()
+
+    def _time_until_room(self, tokens: int, requests: int = 1) -> float:
+        """tokens・requests 分の枠が空くまでの秒数の見込み"""
+        now = time.monotonic()
+        self._prune(now)
+        rpm, tpm = self.requests_per_minute, self.tokens_per_minute
+        if (rpm and requests > rpm) or (tpm and tokens > tpm):
+            # 1分の枠に収まらない量は、必要なウィンドウ数で概算する
+            windows = max(requests / rpm if rpm else 0, tokens / tpm if tpm else 0)
+            return self.WINDOW_SECONDS * windows
+
+        used_tokens = sum(t for _, t in self._usage)
+        used_requests = len(self._usage)
+
+        def fits() -> bool:
+            return ((not rpm or used_requests + requests <= rpm)
+                    and (not tpm or used_tokens + tokens <= tpm))
+
+        if fits():
+            return 0.0
+        for reserved_at, reserved_tokens in self._usage:
+            used_tokens -= reserved_tokens
+            used_requests -= 1
+            if fits():
+                return max(reserved_at + self.WINDOW_SECONDS - now, 0.0)
+        return self.WINDOW_SECONDS
+
+    def _estimate_wait(self, tokens: int, priority: int) -> float:
+        """同じか高い優先度の待ち行列を含めた待ち時間の見込み"""
+        ahead = [w for w in self._waiters if w.priority <= priority]
+        return self._time_until_room(
+            tokens + sum(w.tokens for w in ahead), len(ahead) + 1
+        )
+
+    async def acquire(self, tokens: int, priority: Optional[int] = None) -> List[float]:
+        """枠を予約して返す（settle で実際のトークン数に更新できる）"""
+        if priority is None:
+            priority = _current_priority.get()
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+
+        wait = self._estimate_wait(tokens, priority)
+        max_wait = self.max_wait_seconds.get(priority, 0.0)
+        if wait > max_wait:
+            self.shed += 1
+            logger.warning(
+                f"Geminiクォータ超過のため拒否: {PRIORITY_NAMES.get(priority, priority)} "
+                f"(見込み待ち時間 {wait:.1f}秒)"
+            )
+            raise QuotaExceeded(max(1, math.ceil(wait)))
+
+        waiter = _Waiter(priority, next(self._seq), tokens)
+        heapq.heappush(self._waiters, waiter)
+        enqueued_at = time.monotonic()
+        try:
+            while True:
+                delay = self._time_until_room(tokens)
+                if self._waiters[0] is waiter and delay == 0:
+                    heapq.heappop(self._waiters)
+                    break
+                if self._changed is None:
+                    self._changed = asyncio.Event()
+                changed = self._changed
+                try:
+                    # 先頭でなければ状態の変化まで、先頭なら枠が空くまで待つ
+                    timeout = delay if self._waiters[0] is waiter else None
+                    await asyncio.wait_for(changed.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+            self._notify()
+            raise
+
+        reservation = [time.monotonic(), tokens]
+        self._usage.append(reservation)
+        self.granted += 1
+        self.total_wait_seconds += reservation[0] - enqueued_at
+        # 次の待ち手が先頭になったことを知らせる
+        self._notify()
+        return reservation
+
+    def settle(self, reservation: List[float], tokens: int):
+        """予約したトークン数を実際の値に更新"""
+        reservation[1] = tokens
+        self._notify()
+
+    def release(self, reservation: List[float]):
+        """失敗した呼び出しの予約を取り消す（再試行で二重に枠を使わないため）"""
+        try:
+            self._usage.remove(reservation)
+        except ValueError:
+            # ウィンドウから外れて削除済み
+            pass
+        self._notify()
+
+    def stats(self) -> Dict[str, Any]:
+        """クォータの使用状況"""
+        self._prune(time.monotonic())
+        waiting: Dict[str, int] = {name: 0 for name in PRIORITY_NAMES.values()}
+        for waiter in self._waiters:
+            waiting[PRIORITY_NAMES.get(waiter.priority, str(waiter.priority))] += 1
+        return {
+            "requests_per_minute_limit": self.requests_per_minute,
+            "tokens_per_minute_limit": self.tokens_per_minute,
+            "requests_last_minute": len(self._usage),
+            "tokens_last_minute": int(sum(t for _, t in self._usage)),
+            "waiting": waiting,
+            "granted": self.granted,
+            "shed": self.shed,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+        }
+
+
+def per_worker_limit(limit: int, workers: int = settings.WEB_CONCURRENCY) -> int:
+    """ワーカープロセス間で等分した上限（0 以下は無制限のまま）"""
+    if limit <= 0:
+        return limit
+    return max(1, limit // max(1, workers))
+
+
+# クォータはプロセスごとに管理するため、ワーカー数で割った分をそれぞれが使う
+quota_governor = QuotaGovernor(
+    requests_per_minute=per_worker_limit(settings.GEMINI_RPM_LIMIT),
+    tokens_per_minute=per_worker_limit(settings.GEMINI_TPM_LIMIT),
+)
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.utils.pdf_spool import SpooledPDF
+
+logger = logging.getLogger(__name__)
+
+# レポートのレイアウトを変えたら上げる（キャッシュ済みのPDFを使わなくなる）
+REPORT_LAYOUT_VERSION = 1
+
+
+def report_key(
+    company_data: Dict[str, str],
+    results: Dict[str, str],
+    solutions: List[Dict[str, str]]
+) -> str:
+    """レポートの内容を表す正規化ハッシュ（キーの順序・空白の違いは同一とみなす）"""
+    canonical = json.dumps(
+        {
+            "version": REPORT_LAYOUT_VERSION,
+            "company_data": company_data,
+            "results": results,
+            "solutions": solutions,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedReport:
+    """生成済みの分析レポートPDF（大きいものはキャッシュのファイルを指す）"""
+    key: str
+    pdf: SpooledPDF
+    generated_at: float
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.key}"'
+
+
+class ReportCache:
+    """生成済み分析レポートPDFのキャッシュ（メモリLRU + ディスク）
+
+    同じ内容のリクエストには保存済みのPDFをそのまま返すため、生成日時は
+    最初に生成した時刻のまま変わらない。メモリには memory_item_max_bytes 以下の
+    PDFを合計 memory_max_bytes まで、ディスクには max_bytes まで保持し、超えた分は
+    最終アクセスの古い順に削除する。大きいPDFはファイルから直接送信する。
+    ディスクの索引は SQLite で、同じホスト上のワーカープロセス間で共有する。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = settings.REPORT_CACHE_DIR,
+        max_bytes: int = settings.REPORT_CACHE_MAX_BYTES,
+        memory_max_bytes: int = settings.REPORT_CACHE_MEMORY_BYTES,
+        memory_item_max_bytes: int = settings.PDF_SPOOL_MAX_MEMORY,
+    ):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, "index.sqlite3")
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self.memory_item_max_bytes = memory_item_max_bytes
+        self._memory: "OrderedDict[str, CachedReport]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS reports (
+                    key TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    generated_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reports_last_access ON reports (last_access)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def _remember(self, report: CachedReport):
+        """メモリ上のPDFを保持（上限を超えた分は古い順に捨てる）"""
+        size = report.pdf.size
+        if report.pdf.content is None or size > min(self.memory_item_max_bytes, self.memory_max_bytes):
+            return
+        with self._lock:
+            previous = self._memory.pop(report.key, None)
+            if previous is not None:
+                self._memory_bytes -= previous.pdf.size
+            self._memory[report.key] = report
+            self._memory_bytes += size
+            while self._memory_bytes > self.memory_max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted.pdf.size
+
+    def get(self, key: str) -> Optional[CachedReport]:
+        """保存済みのレポートを取得（なければ None）"""
+        with self._lock:
+            report = self._memory.get(key)
+            if report is not None:
+                self._memory.move_to_end(key)
+                return report
+
+        path = self._path(key)
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM reports WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if not os.path.exists(path):
+                conn.execute("DELETE FROM reports WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE reports SET last_access = ? WHERE key = ?", (time.time(), key))
+
+        if row["size"] > self.memory_item_max_bytes:
+            return CachedReport(key, SpooledPDF(size=row["size"], path=path), row["generated_at"])
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        report = CachedReport(key, SpooledPDF(size=len(content), content=content), row["generated_at"])
+        self._remember(report)
+        return report
+
+    def put(self, key: str, pdf: SpooledPDF, generated_at: float) -> CachedReport:
+        """生成したPDFを保存（一時ファイルはキャッシュへ移動する）"""
+        path = self._path(key)
+        if pdf.path is not None:
+            shutil.move(pdf.path, path)
+            report = CachedReport(key, SpooledPDF(size=pdf.size, path=path), generated_at)
+        else:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(pdf.content)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            report = CachedReport(key, pdf, generated_at)
+        self._remember(report)
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO reports (key, size, generated_at, last_access)
+                VALUES (?, ?, ?, ?)
+                """,
+                (key, pdf.size, generated_at, time.time()),
+            )
+        self._evict()
+        return report
+
+    def _evict(self):
+        """ディスクの合計サイズが上限を超えた分を最終アクセスの古い順に削除"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT key, size FROM reports ORDER BY last_access ASC"
+            ).fetchall()
+            total = sum(row["size"] for row in rows)
+            for row in rows:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM reports WHERE key = ?", (row["key"],))
+                path = self._path(row["key"])
+                if os.path.exists(path):
+                    os.remove(path)
+                total -= row["size"]
+                logger.info(f"レポートキャッシュ削除: {row['key']} ({row['size']} bytes)")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes FROM reports").fetchone()
+        with self._lock:
+            memory_entries = len(self._memory)
+            memory_bytes = self._memory_bytes
+        return {
+            "entries": row["entries"],
+            "bytes": row["bytes"],
+            "max_bytes": self.max_bytes,
+            "memory_entries": memory_entries,
+            "memory_bytes": memory_bytes,
+            "memory_max_bytes": self.memory_max_bytes,
+        }
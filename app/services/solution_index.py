@@ -0,0 +1,79 @@
+import math
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from app.models.schemas import Solution
+
+# 文字 n-gram の長さ（日本語は分かち書きせず文字列のまま扱う）
+NGRAM_RANGE = (2, 3)
+
+
+def _char_ngrams(text: str) -> Counter:
+    text = "".join(unicodedata.normalize("NFKC", text).lower().split())
+    grams: Counter = Counter()
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for i in range(len(text) - n + 1):
+            grams[text[i:i + n]] += 1
+    return grams
+
+
+def _document_ngrams(solution: Solution) -> Counter:
+    # 項目をまたぐ n-gram を作らないよう項目ごとに数える
+    grams: Counter = Counter()
+    for field in (solution.name, solution.features, solution.use_case):
+        grams.update(_char_ngrams(field))
+    return grams
+
+
+class SolutionIndex:
+    """ソリューションの TF-IDF ベクトル索引（文字 n-gram）
+
+    name・features・use_case の文字 n-gram から L2 正規化した TF-IDF 行列を作り、
+    問い合わせ文（仮説）とのコサイン類似度で上位のソリューションを返す。
+    """
+
+    def __init__(self, solutions: Iterable[Solution]):
+        documents = [_document_ngrams(s) for s in solutions]
+        self.size = len(documents)
+
+        document_frequency: Counter = Counter()
+        for grams in documents:
+            document_frequency.update(grams.keys())
+        self.vocabulary: Dict[str, int] = {
+            gram: column for column, gram in enumerate(sorted(document_frequency))
+        }
+        # 平滑化した IDF
+        self.idf = np.ones(len(self.vocabulary), dtype=np.float32)
+        for gram, column in self.vocabulary.items():
+            self.idf[column] = math.log((1 + self.size) / (1 + document_frequency[gram])) + 1
+
+        self.matrix = np.zeros((self.size, len(self.vocabulary)), dtype=np.float32)
+        for row, grams in enumerate(documents):
+            for gram, count in grams.items():
+                self.matrix[row, self.vocabulary[gram]] = 1 + math.log(count)
+        self.matrix *= self.idf
+        norms = np.linalg.norm(self.matrix, axis=1, keepdims=True)
+        self.matrix /= np.where(norms == 0, 1, norms)
+
+    def _vectorize(self, text: str) -> np.ndarray:
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for gram, count in _char_ngrams(text).items():
+            column = self.vocabulary.get(gram)
+            if column is not None:
+                vector[column] = 1 + math.log(count)
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """類似度の高い順に (ソリューションの位置, 類似度) を最大 k 件返す"""
+        if self.size == 0 or k <= 0:
+            return []
+        scores = self.matrix @ self._vectorize(query)
+        k = min(k, self.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top]
@@ -1,14 +1,103 @@
+import hashlib
 import json
-from typing import List
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
 from app.config import settings
 from app.models.schemas import Solution
+from app.services.solution_index import SolutionIndex
+
+logger = logging.getLogger(__name__)
+
+
+def format_solution(solution: Solution) -> str:
+    """マッチング用プロンプトに埋め込む1行"""
+    return f"・{solution.name}：{solution.features}（用途：{solution.use_case}）"
+
+
+def format_solutions(solutions: List[Solution]) -> str:
+    """マッチング用プロンプトに埋め込むソリューション一覧"""
+    return "\n".join(format_solution(s) for s in solutions)
+
+
+@dataclass
+class SolutionSelection:
+    """マッチングに渡すソリューション"""
+    solutions: List[Solution]
+    solutions_text: str
+    # 絞り込み時の類似度（絞り込まなかった場合は空）
+    scores: List[float] = field(default_factory=list)
+    retrieval_ms: float = 0.0
+
+
+@dataclass(frozen=True)
+class SolutionCatalog:
+    """読み込み済みのソリューション定義"""
+    solutions: List[Solution]
+    # match_solutions に渡す一覧テキスト（読み込み時に一度だけ作る）
+    solutions_text: str
+    # ファイル内容の SHA-256（ETag に使う）
+    version: str
+    index: SolutionIndex = field(repr=False)
+    
+    def select(self, query: str, top_k: int = settings.SOLUTION_TOP_K) -> SolutionSelection:
+        """query（仮説）に近い上位 top_k 件に絞る（top_k が 0 か件数以上なら全件）"""
+        if top_k <= 0 or top_k >= len(self.solutions):
+            return SolutionSelection(self.solutions, self.solutions_text)
+        
+        started_at = time.perf_counter()
+        hits = self.index.search(query, top_k)
+        solutions = [self.solutions[i] for i, _ in hits]
+        return SolutionSelection(
+            solutions=solutions,
+            solutions_text=format_solutions(solutions),
+            scores=[round(score, 4) for _, score in hits],
+            retrieval_ms=round((time.perf_counter() - started_at) * 1000, 3),
+        )
+
 
 class SolutionService:
-    """ソリューション管理サービス"""
+    """ソリューション管理サービス
+
+    solutions.json は一度だけ読み込んでメモリに保持し、ファイルの更新時刻・
+    サイズが変わった場合だけ読み直す（内容のハッシュが同じなら再構築しない）。
+    """
+    
+    def __init__(self, solutions_file: str = settings.SOLUTIONS_FILE):
+        self.solutions_file = solutions_file
+        self._lock = threading.Lock()
+        self._catalog: Optional[SolutionCatalog] = None
+        self._stat: Optional[Tuple[int, int]] = None
+    
+    def get_catalog(self) -> SolutionCatalog:
+        """ソリューション定義を取得（ファイルが変わっていれば読み直す）"""
+        stat = os.stat(self.solutions_file)
+        current = (stat.st_mtime_ns, stat.st_size)
+        if self._catalog is not None and self._stat == current:
+            return self._catalog
+        
+        with self._lock:
+            if self._catalog is not None and self._stat == current:
+                return self._catalog
+            
+            with open(self.solutions_file, "rb") as f:
+                raw = f.read()
+            version = hashlib.sha256(raw).hexdigest()
+            if self._catalog is None or self._catalog.version != version:
+                solutions = [Solution(**item) for item in json.loads(raw.decode("utf-8"))]
+                self._catalog = SolutionCatalog(
+                    solutions=solutions,
+                    solutions_text=format_solutions(solutions),
+                    version=version,
+                    index=SolutionIndex(solutions),
+                )
+                logger.info(f"ソリューション定義を読み込み: {len(solutions)}件 ({version[:12]})")
+            self._stat = current
+            return self._catalog
     
     def get_solutions(self) -> List[Solution]:
         """ソリューション一覧を取得"""
-        with open(settings.SOLUTIONS_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        return [Solution(**item) for item in data]
\ No newline at end of file
+        return self.get_catalog().solutions
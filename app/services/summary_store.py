@@ -0,0 +1,152 @@
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Any
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SummaryKey:
+    """要約のキャッシュキー（いずれかが変われば別エントリ）"""
+    company_code: str
+    pdf_hash: str
+    prompt_hash: str
+    model_name: str
+
+
+class SummaryStore:
+    """有価証券報告書要約の永続ストア（SQLite）"""
+
+    def __init__(
+        self,
+        db_path: str = settings.SUMMARY_STORE_PATH,
+        ttl_seconds: int = settings.SUMMARY_TTL_SECONDS,
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS summaries (
+                    company_code TEXT NOT NULL,
+                    pdf_hash TEXT NOT NULL,
+                    prompt_hash TEXT NOT NULL,
+                    model_name TEXT NOT NULL,
+                    company_name TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    hit_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (company_code, pdf_hash, prompt_hash, model_name)
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _key_params(self, key: SummaryKey) -> tuple:
+        return (key.company_code, key.pdf_hash, key.prompt_hash, key.model_name)
+
+    def get(self, key: SummaryKey) -> Optional[str]:
+        """有効期限内の要約を取得"""
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT summary, created_at FROM summaries
+                WHERE company_code = ? AND pdf_hash = ? AND prompt_hash = ? AND model_name = ?
+                """,
+                self._key_params(key),
+            ).fetchone()
+            if row is None:
+                return None
+            if time.time() - row["created_at"] >= self.ttl_seconds:
+                conn.execute(
+                    """
+                    DELETE FROM summaries
+                    WHERE company_code = ? AND pdf_hash = ? AND prompt_hash = ? AND model_name = ?
+                    """,
+                    self._key_params(key),
+                )
+                return None
+            conn.execute(
+                """
+                UPDATE summaries SET hit_count = hit_count + 1
+                WHERE company_code = ? AND pdf_hash = ? AND prompt_hash = ? AND model_name = ?
+                """,
+                self._key_params(key),
+            )
+        return row["summary"]
+
+    def put(self, key: SummaryKey, company_name: str, summary: str):
+        """要約を保存し、同じ企業の古いキー（報告書・プロンプト・モデル違い）を無効化"""
+        with self._connect() as conn:
+            conn.execute(
+                """
+                DELETE FROM summaries
+                WHERE company_code = ?
+                  AND NOT (pdf_hash = ? AND prompt_hash = ? AND model_name = ?)
+                """,
+                self._key_params(key),
+            )
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO summaries
+                    (company_code, pdf_hash, prompt_hash, model_name, company_name, summary, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                self._key_params(key) + (company_name, summary, time.time()),
+            )
+        logger.info(f"要約を保存: {key.company_code} ({company_name})")
+
+    def list_entries(self, company_code: Optional[str] = None) -> List[Dict[str, Any]]:
+        """保存済み要約の一覧（本文は除く）"""
+        query = """
+            SELECT company_code, company_name, pdf_hash, prompt_hash, model_name,
+                   created_at, hit_count, LENGTH(summary) AS summary_chars
+            FROM summaries
+        """
+        params: tuple = ()
+        if company_code:
+            query += " WHERE company_code = ?"
+            params = (company_code,)
+        query += " ORDER BY created_at DESC"
+
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [
+            {
+                **dict(row),
+                "expired": now - row["created_at"] >= self.ttl_seconds,
+            }
+            for row in rows
+        ]
+
+    def purge(self, company_code: Optional[str] = None, expired_only: bool = False) -> int:
+        """要約を削除し、削除件数を返す"""
+        conditions = []
+        params: list = []
+        if company_code:
+            conditions.append("company_code = ?")
+            params.append(company_code)
+        if expired_only:
+            conditions.append("created_at <= ?")
+            params.append(time.time() - self.ttl_seconds)
+
+        query = "DELETE FROM summaries"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        with self._connect() as conn:
+            deleted = conn.execute(query, params).rowcount
+        logger.info(f"要約を削除: {deleted}件")
+        return deleted
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config import settings
+from app.utils.resilience import RETRYABLE_STATUS, call_with_retry, circuit_breakers, wait_with_timeout
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    """h2 がインストールされていれば HTTP/2 を使う"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HttpClient:
+    """アプリ全体で共有する非同期HTTPクライアント
+
+    起動時に `start()`、終了時に `close()` を呼ぶ。接続はキープアライブで
+    プールされ、ホストごとの同時接続数はセマフォで制限する。GETの一時的な
+    失敗は再試行し、障害が続くホストへはサーキットブレーカーで通信を止める。
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = settings.HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = settings.HTTP_READ_TIMEOUT,
+        max_connections: int = settings.HTTP_MAX_CONNECTIONS,
+        max_connections_per_host: int = settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+        keepalive_expiry: float = settings.HTTP_KEEPALIVE_EXPIRY,
+        request_timeout: float = settings.HTTP_REQUEST_TIMEOUT,
+    ):
+        self.request_timeout = request_timeout
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_connections_per_host = max_connections_per_host
+        self.headers = {"User-Agent": "Mozilla/5.0"}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def start(self):
+        """クライアントを生成（起動時）"""
+        if self._client is not None:
+            return
+        http2 = _http2_available()
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            timeout=self.timeout,
+            limits=self.limits,
+            headers=self.headers,
+            follow_redirects=True,
+        )
+        self._host_semaphores = {}
+        logger.info(f"HTTPクライアント起動 (HTTP/2: {http2})")
+
+    async def close(self):
+        """クライアントを破棄（終了時）"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("HTTPクライアント終了")
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        # ライフスパン外（スクリプト等）から使われた場合は遅延生成
+        if self._client is None:
+            await self.start()
+        return self._client
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GETリクエスト（レスポンス本文は読み込み済み）
+
+        接続エラー・タイムアウト・429/5xx は再試行し、最後まで失敗した場合は
+        例外を送出する。タイムアウトは時間予算の残りで打ち切る。
+        """
+        client = await self._get_client()
+        breaker = circuit_breakers.for_url(url)
+
+        async def attempt() -> httpx.Response:
+            with breaker.guard():
+                async with self._host_semaphore(url):
+                    response = await wait_with_timeout(
+                        lambda: client.get(url, headers=headers), self.request_timeout
+                    )
+                if response.status_code in RETRYABLE_STATUS:
+                    response.raise_for_status()
+            return response
+
+        return await call_with_retry(attempt, breaker.name)
+
+    @asynccontextmanager
+    async def stream(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[httpx.Response]:
+        """ストリーミングGET（大きなファイルのダウンロード用、再試行は呼び出し側で行う）"""
+        client = await self._get_client()
+        async with self._host_semaphore(url):
+            async with client.stream("GET", url, headers=headers) as response:
+                yield response
+
+
+http_client = HttpClient()
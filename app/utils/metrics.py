@@ -0,0 +1,106 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+logger = logging.getLogger(__name__)
+
+# 外部呼び出し（数十ミリ秒）から Gemini の生成（数十秒）までを含むバケット
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+SPAN_DURATION = Histogram(
+    "span_duration_seconds",
+    "処理区間ごとの所要時間",
+    ["span", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "APIリクエストの所要時間",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+# ゲージはマルチプロセス時に稼働中のワーカーの値を合計（状態は最大値）して出力する
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "処理中のAPIリクエスト数", multiprocess_mode="livesum"
+)
+LLM_IN_FLIGHT = Gauge(
+    "llm_requests_in_flight", "実行中の Gemini 呼び出し数", multiprocess_mode="livesum"
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "llm_queue_depth", "同時実行数の枠を待っている Gemini 呼び出し数", multiprocess_mode="livesum"
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "キャッシュの参照回数（result: hit / miss / revalidated）",
+    ["cache", "result"],
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "llm_prompt_tokens",
+    "Gemini に送ったプロンプトの推定トークン数",
+    ["template"],
+    buckets=(100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 200000),
+)
+LLM_RESPONSE_CHARS = Histogram(
+    "llm_response_chars",
+    "Gemini の応答の文字数",
+    ["template"],
+    buckets=(100, 500, 1000, 2500, 5000, 10000, 25000, 50000),
+)
+PDF_DOWNLOAD_BYTES = Histogram(
+    "pdf_download_bytes",
+    "ダウンロードした有価証券報告書PDFのサイズ",
+    buckets=(1e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7, 5e7),
+)
+CIRCUIT_STATE = Gauge(
+    "circuit_breaker_state",
+    "上流ホストごとのサーキットブレーカーの状態（0: closed, 1: half_open, 2: open）",
+    ["upstream"],
+    multiprocess_mode="livemax",
+)
+UPSTREAM_RETRIES = Counter("upstream_retries_total", "外部呼び出しの再試行回数", ["upstream"])
+HEDGED_REQUESTS = Counter(
+    "hedged_requests_total",
+    "並行して開始した追加の取得（result: started / won）",
+    ["name", "result"],
+)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """処理区間の所要時間をヒストグラムに記録し、DEBUG ログに出力"""
+    started_at = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException as e:
+        outcome = "cancelled" if type(e).__name__ == "CancelledError" else "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started_at
+        SPAN_DURATION.labels(name, outcome).observe(elapsed)
+        logger.debug(
+            f"span {name}: {elapsed * 1000:.1f}ms ({outcome})",
+            extra={"span": name, "elapsed_ms": round(elapsed * 1000, 1), "outcome": outcome},
+        )
+
+
+def record_cache(cache: str, result: str):
+    """キャッシュの参照結果を記録"""
+    CACHE_REQUESTS.labels(cache, result).inc()
+
+
+def render_metrics() -> bytes:
+    """Prometheus 形式のメトリクス
+
+    PROMETHEUS_MULTIPROC_DIR が設定されていれば（複数ワーカー起動時）、
+    全ワーカーが書き出した値を集計する。
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
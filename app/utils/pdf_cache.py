@@ -0,0 +1,314 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional
+
+from app.config import settings
+from app.utils.http_client import HttpClient, http_client as default_http_client
+from app.utils.metrics import PDF_DOWNLOAD_BYTES, record_cache, span
+from app.utils.resilience import call_with_retry, circuit_breakers, hedged, wait_with_timeout
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class CachedPDF:
+    """キャッシュ済みPDF"""
+    url: str
+    path: str
+    content_hash: str
+    size: int
+
+
+@dataclass
+class _Download:
+    """1回のダウンロード結果（未更新なら tmp_path は None）"""
+    tmp_path: Optional[str]
+    content_hash: str = ""
+    size: int = 0
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class PDFCache:
+    """有価証券報告書PDFのディスクキャッシュ
+
+    PDF本体は内容のSHA-256をファイル名として保存し、URLとの対応・
+    ETag/Last-Modified・最終アクセス時刻をSQLiteの索引で管理する。
+    合計サイズが上限を超えると最終アクセスの古い順に削除する（LRU）。
+    ダウンロードは一時的な失敗を再試行し、hedge_delay 秒で終わらなければ
+    同じURLを並行にもう1本取得して先に終わった方を使う。
+    in_use で囲んだ間はそのPDFを削除せず、読み込み後の削除に回す。この印は
+    索引に保存するので、同じキャッシュを共有する他のワーカープロセスも守る。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = settings.PDF_CACHE_DIR,
+        max_bytes: int = settings.PDF_CACHE_MAX_BYTES,
+        fresh_seconds: int = settings.PDF_CACHE_FRESH_SECONDS,
+        http_client: Optional[HttpClient] = None,
+        hedge_delay: float = settings.PDF_HEDGE_DELAY_SECONDS,
+        pin_seconds: float = settings.PDF_CACHE_PIN_SECONDS,
+    ):
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.index_path = os.path.join(cache_dir, "index.sqlite3")
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self.http_client = http_client or default_http_client
+        self.hedge_delay = hedge_delay
+        self.pin_seconds = pin_seconds
+        self._inflight = SingleFlight("pdf_download")
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    url TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    validated_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)"
+            )
+            # 読み込み中のPDF（全ワーカープロセス共通、期限切れは無視する）
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pins (
+                    id TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pins_content_hash ON pins (content_hash)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.blob_dir, content_hash[:2], f"{content_hash}.pdf")
+
+    def _lookup(self, url: str) -> Optional[sqlite3.Row]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM entries WHERE url = ?", (url,)).fetchone()
+        if row is None or not os.path.exists(self._blob_path(row["content_hash"])):
+            return None
+        return row
+
+    def _to_cached(self, url: str, content_hash: str, size: int) -> CachedPDF:
+        return CachedPDF(
+            url=url,
+            path=self._blob_path(content_hash),
+            content_hash=content_hash,
+            size=size,
+        )
+
+    def _pin(self, content_hash: str) -> str:
+        pin_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO pins (id, content_hash, expires_at) VALUES (?, ?, ?)",
+                (pin_id, content_hash, time.time() + self.pin_seconds),
+            )
+        # 印を付ける前に他のワーカーが削除していた場合
+        if not os.path.exists(self._blob_path(content_hash)):
+            self._unpin(pin_id)
+            raise FileNotFoundError(f"PDFがキャッシュから削除されました: {content_hash}")
+        return pin_id
+
+    def _unpin(self, pin_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pins WHERE id = ?", (pin_id,))
+
+    @asynccontextmanager
+    async def in_use(self, content_hash: str) -> AsyncIterator[None]:
+        """この中ではPDFを削除しない（テキスト抽出などで読み込む間、他のプロセスからも）"""
+        pin_id = await asyncio.to_thread(self._pin, content_hash)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(self._unpin, pin_id)
+            # 延期していた削除を行う
+            await asyncio.to_thread(self._evict)
+
+    def _touch(self, url: str, validated: bool = False):
+        now = time.time()
+        with self._connect() as conn:
+            if validated:
+                conn.execute(
+                    "UPDATE entries SET last_access = ?, validated_at = ? WHERE url = ?",
+                    (now, now, url),
+                )
+            else:
+                conn.execute("UPDATE entries SET last_access = ? WHERE url = ?", (now, url))
+
+    def _commit_blob(self, tmp_path: str, content_hash: str):
+        """一時ファイルをハッシュ名のファイルに確定（同一内容は1ファイルのみ）"""
+        path = self._blob_path(content_hash)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    def _store(
+        self,
+        url: str,
+        tmp_path: str,
+        content_hash: str,
+        size: int,
+        etag: Optional[str],
+        last_modified: Optional[str]
+    ) -> CachedPDF:
+        self._commit_blob(tmp_path, content_hash)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO entries
+                    (url, content_hash, size, etag, last_modified, validated_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (url, content_hash, size, etag, last_modified, now, now),
+            )
+        self._evict()
+        return self._to_cached(url, content_hash, size)
+
+    def _evict(self):
+        """合計サイズが上限を超えた分を最終アクセスの古い順に削除（読み込み中のものは残す）"""
+        with self._connect() as conn:
+            # 印の確認から削除までを、他のプロセスの in_use と直列化する
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            conn.execute("DELETE FROM pins WHERE expires_at <= ?", (now,))
+            pinned = {
+                row["content_hash"]
+                for row in conn.execute("SELECT DISTINCT content_hash FROM pins")
+            }
+            rows = conn.execute(
+                """
+                SELECT content_hash, MAX(size) AS size, MAX(last_access) AS last_access
+                FROM entries GROUP BY content_hash ORDER BY last_access ASC
+                """
+            ).fetchall()
+            total = sum(row["size"] for row in rows)
+            for row in rows:
+                if total <= self.max_bytes:
+                    break
+                if row["content_hash"] in pinned:
+                    # 新しいPDFから消さないよう、読み込みが終わった後の削除に回す
+                    logger.info(f"PDFキャッシュ削除を延期（読み込み中）: {row['content_hash']}")
+                    break
+                conn.execute("DELETE FROM entries WHERE content_hash = ?", (row["content_hash"],))
+                path = self._blob_path(row["content_hash"])
+                if os.path.exists(path):
+                    os.remove(path)
+                total -= row["size"]
+                logger.info(f"PDFキャッシュ削除: {row['content_hash']} ({row['size']} bytes)")
+
+    async def get(self, url: str) -> CachedPDF:
+        """URLのPDFを取得（キャッシュ優先、期限切れならETag/Last-Modifiedで再検証）"""
+        entry = await asyncio.to_thread(self._lookup, url)
+
+        if entry is not None and time.time() - entry["validated_at"] < self.fresh_seconds:
+            await asyncio.to_thread(self._touch, url)
+            record_cache("pdf", "hit")
+            logger.info(f"PDFキャッシュヒット: {url}")
+            return self._to_cached(url, entry["content_hash"], entry["size"])
+
+        # 同じURLのダウンロード・再検証が実行中ならその結果を待つ
+        return await self._inflight.do(url, lambda: self._fetch(url, entry))
+
+    async def _fetch(self, url: str, entry: Optional[sqlite3.Row]) -> CachedPDF:
+        """ダウンロード（キャッシュ済みなら条件付きリクエストで再検証）"""
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        breaker = circuit_breakers.for_url(url)
+
+        async def attempt() -> _Download:
+            with breaker.guard():
+                return await wait_with_timeout(
+                    lambda: hedged(
+                        lambda: self._download(url, headers, revalidate=entry is not None),
+                        self.hedge_delay,
+                        name="pdf_download",
+                        discard=self._discard,
+                    ),
+                    settings.PDF_DOWNLOAD_TIMEOUT,
+                )
+
+        download = await call_with_retry(attempt, breaker.name)
+
+        if download.tmp_path is None:
+            await asyncio.to_thread(self._touch, url, True)
+            record_cache("pdf", "revalidated")
+            logger.info(f"PDFキャッシュ再検証（未更新）: {url}")
+            return self._to_cached(url, entry["content_hash"], entry["size"])
+
+        record_cache("pdf", "miss")
+        PDF_DOWNLOAD_BYTES.observe(download.size)
+        logger.info(f"PDFダウンロード: {url} ({download.size} bytes)")
+        return await asyncio.to_thread(
+            self._store, url, download.tmp_path, download.content_hash, download.size,
+            download.etag, download.last_modified
+        )
+
+    async def _download(self, url: str, headers: Dict[str, str], revalidate: bool) -> _Download:
+        """本文はメモリに溜めず、ハッシュを計算しながら一時ファイルへ書き出す"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.blob_dir, suffix=".tmp")
+        not_modified = False
+        try:
+            with os.fdopen(fd, "wb") as f, span("pdf_download"):
+                async with self.http_client.stream(url, headers=headers) as response:
+                    if revalidate and response.status_code == 304:
+                        not_modified = True
+                    else:
+                        response.raise_for_status()
+                        hasher = hashlib.sha256()
+                        size = 0
+                        async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                            hasher.update(chunk)
+                            f.write(chunk)
+                            size += len(chunk)
+                        etag = response.headers.get("ETag")
+                        last_modified = response.headers.get("Last-Modified")
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        if not_modified:
+            os.remove(tmp_path)
+            return _Download(tmp_path=None)
+        return _Download(tmp_path, hasher.hexdigest(), size, etag, last_modified)
+
+    @staticmethod
+    def _discard(download: _Download):
+        """並行取得で使わなかったダウンロードの一時ファイルを削除"""
+        if download.tmp_path is not None and os.path.exists(download.tmp_path):
+            os.remove(download.tmp_path)
@@ -0,0 +1,81 @@
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import AsyncIterator, BinaryIO, Callable, Optional
+
+# 一時ファイルへ写すときの読み書きの単位
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class SpooledPDF:
+    """生成したPDF（小さいものはバイト列、大きいものは一時ファイル）"""
+    size: int
+    content: Optional[bytes] = None
+    path: Optional[str] = None
+
+
+def spool_pdf(write: Callable[[BinaryIO], object], spool_dir: str, max_memory: int) -> SpooledPDF:
+    """write でPDFを書き出し、max_memory を超えたら一時ファイルに移す
+
+    ワーカープロセスで実行する。書き込み中に max_memory を超えた時点で
+    ディスクに切り替えるため、大きなPDFでも全体をメモリに載せない。
+    大きなPDFはパスだけを返すため、プロセス間でPDF本体を受け渡さない。
+    """
+    os.makedirs(spool_dir, exist_ok=True)
+    with tempfile.SpooledTemporaryFile(max_size=max_memory, dir=spool_dir) as spooled:
+        write(spooled)
+        size = spooled.seek(0, io.SEEK_END)
+        spooled.seek(0)
+        if size <= max_memory:
+            return SpooledPDF(size=size, content=spooled.read())
+
+        # 切り替え後のファイルは名前を持たないため、名前付きの一時ファイルへ断片ごとに写す
+        fd, path = tempfile.mkstemp(dir=spool_dir, suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(spooled, f, COPY_CHUNK_SIZE)
+        except BaseException:
+            os.remove(path)
+            raise
+    return SpooledPDF(size=size, path=path)
+
+
+def remove_spooled(pdf: SpooledPDF):
+    """一時ファイルを削除（メモリ上のPDFなら何もしない）"""
+    if pdf.path is not None and os.path.exists(pdf.path):
+        os.remove(pdf.path)
+
+
+def iter_chunks(pdf: SpooledPDF, chunk_size: int) -> AsyncIterator[bytes]:
+    """PDFを固定サイズの断片で読み出す
+
+    ファイルはこの関数の呼び出し時点で開くため、送信中にキャッシュから
+    削除・置換されても最後まで読める（開けなければ FileNotFoundError）。
+    """
+    if pdf.content is not None:
+        content = pdf.content
+
+        async def from_memory() -> AsyncIterator[bytes]:
+            view = memoryview(content)
+            for start in range(0, len(view), chunk_size):
+                yield view[start:start + chunk_size].tobytes()
+
+        return from_memory()
+
+    f = open(pdf.path, "rb")
+
+    async def from_file() -> AsyncIterator[bytes]:
+        try:
+            while True:
+                chunk = await asyncio.to_thread(f.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            f.close()
+
+    return from_file()
@@ -0,0 +1,139 @@
+import asyncio
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Deque, List, Optional, Sequence, Tuple
+
+import fitz  # PyMuPDF
+
+from app.config import settings
+from app.utils.report_sections import Excerpt, build_excerpt
+
+
+@dataclass
+class ExtractionResult:
+    """テキスト抽出結果"""
+    text: str
+    pages_read: int
+    total_pages: int
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """ページ範囲のテキストを抽出（ワーカープロセスでも実行される）"""
+    with fitz.open(path, filetype="pdf") as doc:
+        return [doc[i].get_text() for i in range(start, min(stop, len(doc)))]
+
+
+def _count_pages(path: str) -> int:
+    with fitz.open(path, filetype="pdf") as doc:
+        return len(doc)
+
+
+def extract_text(path: str, max_chars: int) -> ExtractionResult:
+    """先頭ページから順に抽出し、文字数の上限に達した時点で打ち切る"""
+    parts: List[str] = []
+    chars = 0
+    with fitz.open(path, filetype="pdf") as doc:
+        total_pages = len(doc)
+        for page in doc:
+            text = page.get_text()
+            parts.append(text)
+            chars += len(text)
+            if chars >= max_chars:
+                break
+    return ExtractionResult(
+        text="".join(parts)[:max_chars],
+        pages_read=len(parts),
+        total_pages=total_pages,
+    )
+
+
+class PDFTextExtractor:
+    """有価証券報告書PDFのテキスト抽出
+
+    PDFはディスク上のファイルから開き（全体をメモリに読み込まない）、
+    ページ単位で遅延抽出して文字数の上限に達したら止める。workers > 1 の
+    場合はページ範囲ごとにプロセスへ分散し、先頭から順に結果を連結する。
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.PDF_EXTRACT_WORKERS,
+        pages_per_task: int = settings.PDF_EXTRACT_PAGES_PER_TASK,
+    ):
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def extract(self, path: str, max_chars: int) -> ExtractionResult:
+        """最大 max_chars 文字のテキストを抽出"""
+        if self.workers <= 1:
+            return await asyncio.to_thread(extract_text, path, max_chars)
+        return await self._extract_parallel(path, max_chars)
+
+    async def extract_excerpt(
+        self,
+        path: str,
+        token_budget: int = settings.PDF_TOKEN_BUDGET,
+        priority: Sequence[str] = settings.PDF_PRIORITY_SECTIONS,
+        excluded: Sequence[str] = settings.PDF_EXCLUDED_SECTIONS,
+    ) -> Optional[Excerpt]:
+        """章を検出し、優先章からトークン予算内で抜粋（章が検出できなければ None）"""
+        return await asyncio.to_thread(build_excerpt, path, token_budget, priority, excluded)
+
+    async def _extract_parallel(self, path: str, max_chars: int) -> ExtractionResult:
+        pool = self._get_pool()
+        total_pages = await asyncio.to_thread(_count_pages, path)
+        ranges = deque(
+            (start, start + self.pages_per_task)
+            for start in range(0, total_pages, self.pages_per_task)
+        )
+
+        # 同時に投入するのはワーカー数分だけ。上限に達したら残りは投入しない
+        in_flight: Deque[Tuple[Future, asyncio.Future]] = deque()
+
+        def submit_next():
+            start, stop = ranges.popleft()
+            future = pool.submit(_extract_page_range, path, start, stop)
+            in_flight.append((future, asyncio.wrap_future(future)))
+
+        while ranges and len(in_flight) < self.workers:
+            submit_next()
+
+        parts: List[str] = []
+        chars = 0
+        try:
+            while in_flight:
+                _, waiter = in_flight.popleft()
+                for text in await waiter:
+                    parts.append(text)
+                    chars += len(text)
+                    if chars >= max_chars:
+                        break
+                if chars >= max_chars:
+                    break
+                if ranges:
+                    submit_next()
+        finally:
+            for future, _ in in_flight:
+                future.cancel()
+
+        return ExtractionResult(
+            text="".join(parts)[:max_chars],
+            pages_read=len(parts),
+            total_pages=total_pages,
+        )
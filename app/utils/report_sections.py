@@ -0,0 +1,212 @@
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence
+
+import fitz  # PyMuPDF
+
+# 有価証券報告書の見出し（例: 第一部【企業情報】, ２【事業等のリスク】, 【表紙】）
+HEADING_PATTERN = re.compile(
+    r"^[ \t　]*(?:第[一二三四五六七八九十\d０-９]+部?)?[ \t　]*[\d０-９]*[ \t　]*【([^】\n]{2,40})】",
+    re.MULTILINE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の概算（ローカル推定、API呼び出しなし）
+
+    日本語などの非ASCII文字は1文字≒1トークン、ASCIIは4文字≒1トークンとして数える。
+    """
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return math.ceil((len(text) - ascii_chars) + ascii_chars / 4)
+
+
+@dataclass
+class Section:
+    """報告書の章"""
+    title: str
+    start_page: int
+    end_page: int  # この値を含まない
+    # ページ単位で遅延取得する場合のテキスト取得関数
+    loader: Optional[Callable[[], str]] = field(default=None, repr=False)
+    _text: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.loader() if self.loader else ""
+        return self._text
+
+
+@dataclass
+class Excerpt:
+    """選択した章を連結した抜粋"""
+    text: str
+    sections: List[str]
+    estimated_tokens: int
+    total_sections: int
+
+
+def _match_any(title: str, keywords: Sequence[str]) -> Optional[int]:
+    for index, keyword in enumerate(keywords):
+        if keyword in title:
+            return index
+    return None
+
+
+def _sections_from_toc(doc: fitz.Document) -> List[Section]:
+    """PDFのしおり（アウトライン）から章を構成"""
+    toc = doc.get_toc(simple=True)
+    page_count = len(doc)
+    entries = [(title.strip(), page - 1) for _, title, page in toc if 1 <= page <= page_count]
+    sections = []
+    for i, (title, start_page) in enumerate(entries):
+        next_page = entries[i + 1][1] if i + 1 < len(entries) else page_count
+        end_page = max(start_page + 1, next_page)
+
+        def loader(start=start_page, end=end_page) -> str:
+            return "".join(doc[p].get_text() for p in range(start, end))
+
+        sections.append(Section(title, start_page, end_page, loader=loader))
+    return sections
+
+
+def _sections_from_headings(
+    doc: fitz.Document,
+    is_enough: Optional[Callable[[Section], bool]] = None,
+) -> List[Section]:
+    """本文中の【…】見出しから章を構成（しおりがないPDF用）
+
+    ページを先頭から順に読み、章が確定するたびに is_enough を呼ぶ。
+    True が返ったら残りのページは読まない（途中の章は含めない）。
+    """
+    sections: List[Section] = []
+    title: Optional[str] = None
+    start_page = 0
+    parts: List[str] = []
+
+    for page_number, page in enumerate(doc):
+        text = page.get_text()
+        position = 0
+        for match in HEADING_PATTERN.finditer(text):
+            if title is not None:
+                parts.append(text[position:match.start()])
+                # 見出しがページの先頭にあれば前の章はその前のページで終わる
+                end_page = page_number + 1 if text[:match.start()].strip() else page_number
+                section = Section(title, start_page, max(end_page, start_page + 1))
+                section._text = "".join(parts)
+                sections.append(section)
+                if is_enough is not None and is_enough(section):
+                    return sections
+            title = match.group(1).strip()
+            start_page = page_number
+            parts = []
+            position = match.end()
+        if title is not None:
+            parts.append(text[position:])
+
+    if title is not None:
+        section = Section(title, start_page, len(doc))
+        section._text = "".join(parts)
+        sections.append(section)
+    return sections
+
+
+def _budget_filled(
+    token_budget: int,
+    priority: Sequence[str],
+    excluded: Sequence[str],
+) -> Callable[[Section], bool]:
+    """優先章が全て見つかり、選択対象の章だけで予算を超えたら True を返す関数
+
+    以降の章は文書順で後ろにあるため、選択されることはない。
+    """
+    found = set()
+    tokens = 0
+
+    def is_enough(section: Section) -> bool:
+        nonlocal tokens
+        if _match_any(section.title, excluded) is not None:
+            return False
+        text = section.text.strip()
+        if not text:
+            return False
+        index = _match_any(section.title, priority)
+        if index is not None:
+            found.add(index)
+        tokens += estimate_tokens(text)
+        return len(found) == len(priority) and tokens >= token_budget
+
+    return is_enough
+
+
+def detect_sections(
+    doc: fitz.Document,
+    is_enough: Optional[Callable[[Section], bool]] = None,
+) -> List[Section]:
+    """しおり、なければ見出しパターンで章を検出"""
+    return _sections_from_toc(doc) or _sections_from_headings(doc, is_enough)
+
+
+def select_sections(
+    sections: List[Section],
+    token_budget: int,
+    priority: Sequence[str],
+    excluded: Sequence[str],
+) -> Excerpt:
+    """優先章から順に予算内で選び、残りの予算を文書順の他の章で埋める"""
+    candidates = [s for s in sections if _match_any(s.title, excluded) is None]
+    prioritized = sorted(
+        (s for s in candidates if _match_any(s.title, priority) is not None),
+        key=lambda s: _match_any(s.title, priority),
+    )
+    others = [s for s in candidates if _match_any(s.title, priority) is None]
+
+    chosen = {}
+    remaining = token_budget
+    used_pages = set()
+    for section in prioritized + others:
+        if remaining <= 0:
+            break
+        # しおり由来の章はページ単位なので、同じページを二重に含めない
+        pages = set(range(section.start_page, section.end_page))
+        if section.loader is not None and pages <= used_pages:
+            continue
+        text = section.text.strip()
+        if not text:
+            continue
+        tokens = estimate_tokens(text) + estimate_tokens(f"【{section.title}】\n\n\n")
+        if tokens > remaining:
+            # 予算に収まるよう章の先頭部分だけを含める
+            text = text[:int(len(text) * remaining / tokens)]
+            tokens = remaining
+        chosen[id(section)] = text
+        remaining -= tokens
+        used_pages |= pages
+
+    selected = [s for s in sections if id(s) in chosen]
+    parts = [f"【{s.title}】\n{chosen[id(s)]}" for s in selected]
+    text = "\n\n".join(parts)
+    return Excerpt(
+        text=text,
+        sections=[s.title for s in selected],
+        estimated_tokens=estimate_tokens(text),
+        total_sections=len(sections),
+    )
+
+
+def build_excerpt(
+    path: str,
+    token_budget: int,
+    priority: Sequence[str],
+    excluded: Sequence[str],
+) -> Optional[Excerpt]:
+    """PDFから章を選んで抜粋を作る（章が検出できなければ None）
+
+    見出しから章を検出する場合は、選択に必要なページまでしか読まない。
+    """
+    with fitz.open(path, filetype="pdf") as doc:
+        sections = detect_sections(doc, _budget_filled(token_budget, priority, excluded))
+        if not sections:
+            return None
+        return select_sections(sections, token_budget, priority, excluded)
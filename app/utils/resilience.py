@@ -0,0 +1,348 @@
+import asyncio
+import contextvars
+import logging
+import math
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import httpx
+from google.api_core import exceptions as google_exceptions
+
+from app.config import settings
+from app.utils.metrics import CIRCUIT_STATE, HEDGED_REQUESTS, UPSTREAM_RETRIES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Gemini API の上流名（サーキットブレーカーのキー）
+GEMINI_UPSTREAM = "generativelanguage.googleapis.com"
+
+# 再試行する HTTP ステータス（一時的な失敗）
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# 再試行する Gemini SDK の例外（一時的な失敗）
+_RETRYABLE_GOOGLE_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.GatewayTimeout,
+)
+
+# サーキットブレーカーの状態
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_HALF_OPEN = "half_open"
+CIRCUIT_OPEN = "open"
+
+_CIRCUIT_STATE_VALUES = {CIRCUIT_CLOSED: 0, CIRCUIT_HALF_OPEN: 1, CIRCUIT_OPEN: 2}
+
+
+class DeadlineExceeded(Exception):
+    """リクエスト全体の時間予算を使い切った"""
+
+    def __init__(self, message: str = "処理の制限時間を超過しました"):
+        super().__init__(message)
+
+
+class CircuitOpenError(Exception):
+    """上流の障害が続いているため呼び出さずに失敗させた"""
+
+    def __init__(self, upstream: str, retry_after: int):
+        super().__init__(f"{upstream} への接続を一時停止しています（{retry_after}秒後に再試行してください）")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+# 現在の処理の期限（time.monotonic() の値、タスク生成時に引き継がれる）
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[None]:
+    """この中で行う外部呼び出しの時間予算を設定（0 以下なら無制限）
+
+    外側により短い期限があればそちらを優先する。
+    """
+    deadline = time.monotonic() + seconds if seconds > 0 else None
+    outer = _deadline.get()
+    if outer is not None and (deadline is None or outer < deadline):
+        deadline = outer
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """時間予算の残り秒数（予算が設定されていなければ None）"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_timeout(default: float) -> float:
+    """1回の呼び出しのタイムアウト（既定値と予算の残りの短い方）"""
+    remaining = remaining_budget()
+    if remaining is None:
+        return default
+    if remaining <= 0:
+        raise DeadlineExceeded()
+    return min(default, remaining)
+
+
+async def wait_with_timeout(func: Callable[[], Awaitable[T]], default: float) -> T:
+    """func() の完了を call_timeout(default) 秒まで待つ
+
+    予算の残りで短くしたタイムアウトで打ち切った場合は、上流の遅延ではなく
+    予算切れなので asyncio.TimeoutError ではなく DeadlineExceeded を送出する。
+    """
+    timeout = call_timeout(default)
+    try:
+        return await asyncio.wait_for(func(), timeout)
+    except asyncio.TimeoutError as e:
+        if timeout < default:
+            raise DeadlineExceeded() from e
+        raise
+
+
+def is_transient(error: BaseException) -> bool:
+    """再試行で回復し得る失敗か（接続エラー・タイムアウト・429/5xx）"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(
+        error, (httpx.TransportError, asyncio.TimeoutError) + _RETRYABLE_GOOGLE_ERRORS
+    )
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """429/503 の Retry-After（秒数指定のみ対応）"""
+    if isinstance(error, httpx.HTTPStatusError):
+        try:
+            return float(error.response.headers.get("Retry-After", ""))
+        except ValueError:
+            return None
+    return None
+
+
+class CircuitBreaker:
+    """上流ホストごとのサーキットブレーカー
+
+    一時的な失敗が failure_threshold 回続くと開き、reset_seconds 秒間は
+    呼び出さずに CircuitOpenError を送出する。経過後は試しに1件だけ通し
+    （半開）、成功すれば閉じ、失敗すれば再び開く。上流が応答した失敗
+    （404 など）は正常とみなす。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = settings.CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = settings.CIRCUIT_RESET_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self._probing = False
+        CIRCUIT_STATE.labels(name).set(_CIRCUIT_STATE_VALUES[self.state])
+
+    def _set_state(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"サーキットブレーカー {self.name}: {self.state} → {state}")
+        self.state = state
+        CIRCUIT_STATE.labels(self.name).set(_CIRCUIT_STATE_VALUES[state])
+
+    def _before_call(self):
+        if self.state == CIRCUIT_OPEN:
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.reset_seconds:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, max(1, math.ceil(self.reset_seconds - elapsed)))
+            self._set_state(CIRCUIT_HALF_OPEN)
+        if self.state == CIRCUIT_HALF_OPEN:
+            if self._probing:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, 1)
+            self._probing = True
+
+    def _on_success(self):
+        self._probing = False
+        self.consecutive_failures = 0
+        self._set_state(CIRCUIT_CLOSED)
+
+    def _on_failure(self):
+        self._probing = False
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.state == CIRCUIT_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self.state != CIRCUIT_OPEN:
+                self.times_opened += 1
+            self._set_state(CIRCUIT_OPEN)
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """上流への1回の呼び出しを囲み、結果をブレーカーに反映"""
+        self._before_call()
+        try:
+            yield
+        except DeadlineExceeded:
+            # 予算切れは上流の成否に数えない
+            self._probing = False
+            raise
+        except Exception as e:
+            if is_transient(e):
+                self._on_failure()
+            else:
+                self._on_success()
+            raise
+        except BaseException:
+            # キャンセルは上流の成否に数えない
+            self._probing = False
+            raise
+        else:
+            self._on_success()
+
+    def stats(self) -> Dict[str, Any]:
+        retry_after = 0
+        if self.state == CIRCUIT_OPEN:
+            retry_after = max(0, math.ceil(self.reset_seconds - (time.monotonic() - self.opened_at)))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+            "retry_after": retry_after,
+        }
+
+
+class CircuitBreakerRegistry:
+    """上流ホスト名 → サーキットブレーカー"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, upstream: str) -> CircuitBreaker:
+        breaker = self._breakers.get(upstream)
+        if breaker is None:
+            breaker = CircuitBreaker(upstream)
+            self._breakers[upstream] = breaker
+        return breaker
+
+    def for_url(self, url: str) -> CircuitBreaker:
+        return self.get(urlsplit(url).netloc)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.stats() for name, breaker in self._breakers.items()}
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """再試行の方針（指数バックオフ + フルジッター）"""
+    attempts: int = settings.RETRY_MAX_ATTEMPTS
+    base_delay: float = settings.RETRY_BASE_DELAY
+    max_delay: float = settings.RETRY_MAX_DELAY
+
+    def backoff(self, attempt: int) -> float:
+        """attempt 回目（0 始まり）の失敗後に待つ秒数"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+async def call_with_retry(
+    func: Callable[[], Awaitable[T]],
+    upstream: str,
+    policy: Optional[RetryPolicy] = None,
+    retryable: Callable[[BaseException], bool] = is_transient,
+) -> T:
+    """一時的な失敗を再試行（待ち時間が時間予算を超える場合は DeadlineExceeded）
+
+    func は1回分の呼び出し。サーキットブレーカーは func の中で上流への
+    呼び出しだけを囲む（クォータ待ちなどを上流の成否に数えないため）。
+    """
+    policy = policy or RetryPolicy()
+    attempts = max(1, policy.attempts)
+    for attempt in range(attempts):
+        try:
+            return await func()
+        except Exception as e:
+            if attempt + 1 >= attempts or not retryable(e):
+                raise
+            delay = policy.backoff(attempt)
+            retry_after = _retry_after(e)
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, policy.max_delay))
+            remaining = remaining_budget()
+            if remaining is not None and delay >= remaining:
+                raise DeadlineExceeded(f"{upstream} の再試行が制限時間内に収まりません: {e}") from e
+            UPSTREAM_RETRIES.labels(upstream).inc()
+            logger.warning(
+                f"{upstream} 呼び出し失敗、{delay:.2f}秒後に再試行 ({attempt + 1}/{attempts}): {e!r}"
+            )
+            await asyncio.sleep(delay)
+
+
+async def hedged(
+    factory: Callable[[], Awaitable[T]],
+    delay: float,
+    name: str,
+    max_attempts: int = 2,
+    discard: Optional[Callable[[T], None]] = None,
+) -> T:
+    """delay 秒で終わらなければ同じ処理を並行にもう1本始め、先に成功した結果を返す
+
+    残りの処理はキャンセルする。キャンセルが間に合わず成功した結果は
+    discard に渡す（一時ファイルの削除など）。全て失敗したら最後の例外を送出する。
+    """
+    if delay <= 0 or max_attempts <= 1:
+        return await factory()
+
+    tasks = [asyncio.ensure_future(factory())]
+    pending = set(tasks)
+    winner: Optional[asyncio.Future] = None
+    last_error: Optional[BaseException] = None
+    try:
+        while pending:
+            timeout = delay if len(tasks) < max_attempts else None
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    winner = task
+                    if task is not tasks[0]:
+                        HEDGED_REQUESTS.labels(name, "won").inc()
+                    return task.result()
+                last_error = task.exception()
+            if not done and len(tasks) < max_attempts:
+                logger.info(f"{name}: {delay}秒以内に完了しないため並行して再取得します")
+                HEDGED_REQUESTS.labels(name, "started").inc()
+                task = asyncio.ensure_future(factory())
+                tasks.append(task)
+                pending.add(task)
+        raise last_error
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if discard is not None:
+            for task in tasks:
+                if task is not winner and not task.cancelled() and task.exception() is None:
+                    discard(task.result())
+
+
+circuit_breakers = CircuitBreakerRegistry()
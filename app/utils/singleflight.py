@@ -0,0 +1,69 @@
+import asyncio
+import weakref
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# 統計の集計用（サービス破棄時に自動で外れるよう弱参照で保持）
+_registry: "weakref.WeakSet[SingleFlight]" = weakref.WeakSet()
+
+
+@dataclass
+class _Flight:
+    """実行中の処理と、その結果を待っている呼び出し元の数"""
+    task: "asyncio.Future[Any]"
+    waiters: int = 0
+
+
+class SingleFlight:
+    """同じキーの同時実行をまとめる（in-flight の重複排除）
+
+    実行中のキーに対する呼び出しは新たに実行せず、先行する呼び出しの結果を
+    待って共有する。完了したキーは忘れる（結果のキャッシュは各ストアの役割）。
+    待っている呼び出し元が全てキャンセルされたら処理もキャンセルする。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.leaders = 0
+        self.coalesced = 0
+        self._inflight: Dict[Hashable, _Flight] = {}
+        _registry.add(self)
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _, key=key, flight=flight: self._forget(key, flight))
+        flight.waiters += 1
+        try:
+            # 呼び出し元の1つがキャンセルされても、他の待ち手のために処理は続ける
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # 結果を待つ呼び出し元がいなくなった（切断など）ので処理も中断する
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key: Hashable, flight: _Flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+
+def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    """名前ごとの集計（実行数・合流数・実行中の数）"""
+    stats: Dict[str, Dict[str, int]] = {}
+    for group in list(_registry):
+        entry = stats.setdefault(group.name, {"leaders": 0, "coalesced": 0, "in_flight": 0})
+        entry["leaders"] += group.leaders
+        entry["coalesced"] += group.coalesced
+        entry["in_flight"] += group.in_flight
+    return stats
@@ -0,0 +1,317 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 現在の値（なければ None）から (新しい値, 呼び出し元に返す値) を計算する関数
+UpdateFunc = Callable[[Optional[Any]], Tuple[Any, T]]
+
+CACHE_BACKENDS = ("memory", "sqlite", "redis")
+
+
+class TTLCache(ABC):
+    """有効期限付きのキー・バリューキャッシュ
+
+    値は JSON で保存するため、取り出すたびに新しいオブジェクトになる。
+    キーは namespace ごとに独立している。
+    """
+
+    namespace: str
+
+    @abstractmethod
+    def get(self, key: str) -> Tuple[bool, Optional[Any]]:
+        """(見つかったか, 値) を返す。値が None のエントリもヒットとして扱う"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        """値を保存（ttl_seconds 秒後に期限切れ）"""
+
+    @abstractmethod
+    def update(self, key: str, func: UpdateFunc, ttl_seconds: float) -> T:
+        """読み出し・計算・書き戻しを他のワーカーと競合しないように行う"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """エントリを削除"""
+
+    @abstractmethod
+    def clear(self) -> int:
+        """namespace の全エントリを削除し、削除した件数を返す"""
+
+
+class MemoryTTLCache(TTLCache):
+    """有効期限付きのキー・バリューキャッシュ（プロセス内 LRU）
+
+    ワーカー間では共有しない。max_entries を超えたら最終アクセスの古い順に捨てる。
+    """
+
+    def __init__(self, namespace: str, max_entries: int = settings.MEMORY_CACHE_MAX_ENTRIES):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        # キー → (期限, JSON)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _store(self, key: str, value: Any, ttl_seconds: float):
+        self._entries[key] = (time.time() + ttl_seconds, json.dumps(value, ensure_ascii=False))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Tuple[bool, Optional[Any]]:
+        with self._lock:
+            raw = self._lookup(key)
+        if raw is None:
+            return False, None
+        return True, json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        with self._lock:
+            self._store(key, value, ttl_seconds)
+
+    def update(self, key: str, func: UpdateFunc, ttl_seconds: float) -> T:
+        with self._lock:
+            raw = self._lookup(key)
+            value, result = func(None if raw is None else json.loads(raw))
+            self._store(key, value, ttl_seconds)
+        return result
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        return count
+
+
+class SQLiteTTLCache(TTLCache):
+    """有効期限付きのキー・バリューキャッシュ（SQLite）
+
+    ファイルを共有するので、同じホスト上の複数ワーカープロセスから
+    同じ内容が見える。期限切れのエントリは参照時と、一定回数の書き込みごとに削除する。
+    接続はスレッドごとに使い回し、WAL・synchronous=NORMAL で書き込みの待ちを減らす。
+    """
+    # この回数の書き込みごとに期限切れのエントリをまとめて削除する
+    PURGE_INTERVAL = 1000
+
+    def __init__(self, db_path: str, namespace: str):
+        self.db_path = db_path
+        self.namespace = namespace
+        self._writes = 0
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # 初期化用の接続は閉じる（fork 前に開いた接続を子プロセスに持ち越さない）
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """このスレッドの接続（自動コミット、プロセスが変わったら開き直す）"""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            local.conn = conn
+            local.pid = os.getpid()
+        return local.conn
+
+    def _after_write(self, conn: sqlite3.Connection):
+        self._writes += 1
+        if self._writes % self.PURGE_INTERVAL == 0:
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND expires_at <= ?",
+                (self.namespace, time.time()),
+            )
+
+    def get(self, key: str) -> Tuple[bool, Optional[Any]]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None:
+            return False, None
+        if row[1] <= time.time():
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+            return False, None
+        return True, json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, json.dumps(value, ensure_ascii=False), time.time() + ttl_seconds),
+        )
+        self._after_write(conn)
+
+    def update(self, key: str, func: UpdateFunc, ttl_seconds: float) -> T:
+        # BEGIN IMMEDIATE で書き込みロックを先に取り、他プロセスの読み書きと直列化する
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            current = json.loads(row[0]) if row is not None and row[1] > now else None
+            value, result = func(current)
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value, ensure_ascii=False), now + ttl_seconds),
+            )
+            self._after_write(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def delete(self, key: str):
+        self._connect().execute(
+            "DELETE FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        )
+
+    def clear(self) -> int:
+        return self._connect().execute(
+            "DELETE FROM cache WHERE namespace = ?", (self.namespace,)
+        ).rowcount
+
+
+class RedisTTLCache(TTLCache):
+    """有効期限付きのキー・バリューキャッシュ（Redis）
+
+    複数ホストのワーカーからも同じ内容が見える。期限は Redis のキーの期限で管理する。
+    """
+
+    def __init__(self, url: str, namespace: str):
+        import redis
+
+        self.namespace = namespace
+        self._prefix = f"ttl_cache:{namespace}:"
+        self._client = redis.Redis.from_url(url)
+        self._watch_error = redis.WatchError
+
+    def _key(self, key: str) -> str:
+        return self._prefix + key
+
+    @staticmethod
+    def _ttl_ms(ttl_seconds: float) -> int:
+        return max(1, int(ttl_seconds * 1000))
+
+    def get(self, key: str) -> Tuple[bool, Optional[Any]]:
+        raw = self._client.get(self._key(key))
+        if raw is None:
+            return False, None
+        return True, json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        self._client.set(
+            self._key(key), json.dumps(value, ensure_ascii=False), px=self._ttl_ms(ttl_seconds)
+        )
+
+    def update(self, key: str, func: UpdateFunc, ttl_seconds: float) -> T:
+        # WATCH したキーが他から書き換えられたら読み直してやり直す（楽観的ロック）
+        name = self._key(key)
+        with self._client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(name)
+                    raw = pipe.get(name)
+                    value, result = func(None if raw is None else json.loads(raw))
+                    pipe.multi()
+                    pipe.set(name, json.dumps(value, ensure_ascii=False), px=self._ttl_ms(ttl_seconds))
+                    pipe.execute()
+                    return result
+                except self._watch_error:
+                    continue
+
+    def delete(self, key: str):
+        self._client.delete(self._key(key))
+
+    def clear(self) -> int:
+        count = 0
+        batch = []
+        for name in self._client.scan_iter(match=f"{self._prefix}*", count=500):
+            batch.append(name)
+            if len(batch) >= 500:
+                count += self._client.delete(*batch)
+                batch = []
+        if batch:
+            count += self._client.delete(*batch)
+        return count
+
+
+def _redis_available() -> bool:
+    """redis（redis-py）がインストールされていれば Redis を使える"""
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_ttl_cache(
+    namespace: str,
+    db_path: Optional[str] = None,
+    backend: Optional[str] = None
+) -> TTLCache:
+    """CACHE_BACKEND に従ってキャッシュを生成
+
+    memory はプロセス内のみ、sqlite は同じホストのワーカー間、redis は
+    ホストをまたいで共有する。redis がインストールされていなければ sqlite を使う。
+    db_path は sqlite のファイル（省略時は SHARED_CACHE_PATH）。
+    """
+    backend = (backend or settings.CACHE_BACKEND).lower()
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f"不明なキャッシュのバックエンド: {backend}（{', '.join(CACHE_BACKENDS)} のいずれか）")
+
+    if backend == "memory":
+        return MemoryTTLCache(namespace)
+    if backend == "redis":
+        if _redis_available():
+            return RedisTTLCache(settings.REDIS_URL, namespace)
+        logger.warning("redis がインストールされていないため SQLite のキャッシュを使います")
+    return SQLiteTTLCache(db_path or settings.SHARED_CACHE_PATH, namespace)
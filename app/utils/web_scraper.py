@@ -1,63 +1,114 @@
-import requests
 from bs4 import BeautifulSoup
+import asyncio
+import logging
 import re
-from typing import Optional
+from typing import Optional, Tuple
+from urllib.parse import urljoin
+from app.config import settings
+from app.utils.http_client import HttpClient, http_client as default_http_client
+from app.utils.metrics import record_cache, span
+from app.utils.resilience import CircuitOpenError, DeadlineExceeded
+from app.utils.singleflight import SingleFlight
+from app.utils.ttl_cache import TTLCache, create_ttl_cache
+
+logger = logging.getLogger(__name__)
 
 class WebScraper:
     """Webスクレイピングユーティリティ"""
     
-    def __init__(self):
-        self.headers = {"User-Agent": "Mozilla/5.0"}
+    def __init__(
+        self,
+        http_client: Optional[HttpClient] = None,
+        resolution_cache: Optional[TTLCache] = None
+    ):
+        self.http_client = http_client or default_http_client
+        self.resolution_cache = resolution_cache or create_ttl_cache(
+            "pdf_url", settings.RESOLUTION_CACHE_PATH
+        )
+        self._inflight = SingleFlight("pdf_url_resolution")
+    
+    async def fetch_securities_report_pdf(self, code: str) -> Optional[str]:
+        """企業コードから有価証券報告書PDFのURLを取得（解決結果はキャッシュ）"""
+        found, cached_url = await asyncio.to_thread(self.resolution_cache.get, code)
+        record_cache("pdf_url", "hit" if found else "miss")
+        if found:
+            return cached_url
+        
+        # 同じ企業コードの解決が実行中ならその結果を待つ
+        return await self._inflight.do(code, lambda: self._resolve_and_cache(code))
+    
+    async def _resolve_and_cache(self, code: str) -> Optional[str]:
+        with span("scrape.resolve"):
+            pdf_url, complete = await self._resolve_pdf_url(code)
+        
+        if pdf_url:
+            await asyncio.to_thread(
+                self.resolution_cache.set, code, pdf_url, settings.PDF_URL_CACHE_TTL_SECONDS
+            )
+        elif complete:
+            # 全候補を確認して見つからなかった場合のみ、短期間「なし」を覚える
+            await asyncio.to_thread(
+                self.resolution_cache.set, code, None, settings.PDF_URL_NEGATIVE_TTL_SECONDS
+            )
+        
+        return pdf_url
     
-    def fetch_securities_report_pdf(self, code: str) -> Optional[str]:
-        """企業コードから有価証券報告書PDFのURLを取得"""
-        url = f"https://www.nikkei.com/nkd/company/ednr/?scode={code}"
+    async def _resolve_pdf_url(self, code: str) -> Tuple[Optional[str], bool]:
+        """PDFのURLと、全候補を通信エラーなく確認できたかを返す"""
+        url = f"{settings.NIKKEI_BASE_URL}/nkd/company/ednr/?scode={code}"
         
         try:
-            res = requests.get(url, headers=self.headers)
-            res.raise_for_status()
+            with span("scrape.company_page"):
+                res = await self.http_client.get(url)
+                res.raise_for_status()
             soup = BeautifulSoup(res.text, "html.parser")
+        except (CircuitOpenError, DeadlineExceeded):
+            # 「見つからない」ではなく上流の障害・時間切れとして呼び出し元に伝える
+            raise
+        except Exception as e:
+            logger.warning(f"PDF取得エラー: {code}: {e}")
+            return None, False
+        
+        # 「有価証券報告書」を含むリンクを抽出
+        links = soup.find_all("a", string=re.compile("有価証券報告書"))
+        
+        complete = True
+        for link in links:
+            href = link.get("href")
+            if not href:
+                continue
             
-            # 「有価証券報告書」を含むリンクを抽出
-            links = soup.find_all("a", string=re.compile("有価証券報告書"))
-            
-            for link in links:
-                href = link.get("href")
-                if not href:
-                    continue
-                
-                full_url = requests.compat.urljoin(url, href)
-                
-                # PDFのURLを抽出
-                pdf_url = self._extract_pdf_url(full_url)
-                if pdf_url:
-                    return pdf_url
-            
-            return None
+            full_url = urljoin(url, href)
             
-        except Exception as e:
-            print(f"PDF取得エラー: {e}")
-            return None
+            # PDFのURLを抽出
+            try:
+                pdf_url = await self._extract_pdf_url(full_url)
+            except (CircuitOpenError, DeadlineExceeded):
+                raise
+            except Exception as e:
+                logger.warning(f"PDF URL抽出エラー: {full_url}: {e}")
+                complete = False
+                continue
+            if pdf_url:
+                return pdf_url, True
+        
+        return None, complete
     
-    def _extract_pdf_url(self, page_url: str) -> Optional[str]:
+    async def _extract_pdf_url(self, page_url: str) -> Optional[str]:
         """ページからPDFのURLを抽出"""
-        try:
-            res = requests.get(page_url, headers=self.headers)
+        with span("scrape.report_page"):
+            res = await self.http_client.get(page_url)
             res.raise_for_status()
-            soup = BeautifulSoup(res.text, "html.parser")
-            
-            # JavaScriptからPDFパスを抽出
-            script_text = "".join([
-                script.get_text() for script in soup.find_all("script")
-            ])
-            
-            match = re.search(r"window\['pdfLocation'\]\s*=\s*\"(.*?)\"", script_text)
-            if match:
-                pdf_path = match.group(1)
-                return f"https://www.nikkei.com{pdf_path}"
-            
-            return None
-            
-        except Exception as e:
-            print(f"PDF URL抽出エラー: {e}")
-            return None
\ No newline at end of file
+        soup = BeautifulSoup(res.text, "html.parser")
+        
+        # JavaScriptからPDFパスを抽出
+        script_text = "".join([
+            script.get_text() for script in soup.find_all("script")
+        ])
+        
+        match = re.search(r"window\['pdfLocation'\]\s*=\s*\"(.*?)\"", script_text)
+        if match:
+            pdf_path = match.group(1)
+            return f"{settings.NIKKEI_BASE_URL}{pdf_path}"
+        
+        return None
@@ -0,0 +1,65 @@
+"""GenerativeModel の代替（ベンチマーク用、API を呼ばない）
+
+generate_content / generate_content_async（stream=True を含む）を実装し、
+指定した遅延の後に指定した文字数の応答を返す。
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, List
+
+_FILLER = "顧客の課題と提案の方向性を整理します。"
+
+
+def _make_text(chars: int) -> str:
+    repeats = chars // len(_FILLER) + 1
+    return (_FILLER * repeats)[:chars]
+
+
+@dataclass
+class FakeResponse:
+    text: str
+
+
+class _FakeStream:
+    def __init__(self, chunks: List[str], delay: float):
+        self._chunks = chunks
+        self._delay = delay
+
+    def __aiter__(self) -> AsyncIterator[FakeResponse]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[FakeResponse]:
+        for chunk in self._chunks:
+            await asyncio.sleep(self._delay)
+            yield FakeResponse(chunk)
+
+
+class FakeGenerativeModel:
+    """遅延と出力サイズを指定できる GenerativeModel の代替"""
+
+    def __init__(self, latency_ms: float = 2000, output_chars: int = 2000, stream_chunks: int = 20):
+        self.latency = latency_ms / 1000
+        self.output_chars = output_chars
+        self.stream_chunks = max(1, stream_chunks)
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def _record(self, prompt: str):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+
+    def generate_content(self, prompt: str, **kwargs) -> FakeResponse:
+        self._record(prompt)
+        time.sleep(self.latency)
+        return FakeResponse(_make_text(self.output_chars))
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **kwargs):
+        self._record(prompt)
+        text = _make_text(self.output_chars)
+        if not stream:
+            await asyncio.sleep(self.latency)
+            return FakeResponse(text)
+        size = -(-len(text) // self.stream_chunks)
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        return _FakeStream(chunks, self.latency / len(chunks))
@@ -0,0 +1,145 @@
+"""nikkei.com の代替サーバー（ベンチマーク用）
+
+開示情報一覧（ednr）・報告書ページ（window['pdfLocation']）・報告書PDFを返す。
+HTML は benchmarks/fixtures/ の記録済みページをテンプレートとして使い、
+PDF は fixtures/*.pdf があればそれを、なければ見出し付きのPDFを生成して返す。
+
+    python -m benchmarks.fake_nikkei [--port 8765] [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import os
+import threading
+import time
+from typing import Optional
+
+import fitz  # PyMuPDF
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response
+from starlette.routing import Route
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# 生成するPDFの章（有価証券報告書の見出し）
+SECTIONS = [
+    "表紙",
+    "企業の概況",
+    "事業の内容",
+    "従業員の状況",
+    "経営方針、経営環境及び対処すべき課題等",
+    "サステナビリティに関する考え方及び取組",
+    "事業等のリスク",
+    "経営者による財政状態、経営成績及びキャッシュ・フローの状況の分析",
+    "研究開発活動",
+    "設備投資等の概要",
+    "株式等の状況",
+    "経理の状況",
+    "監査報告書",
+]
+
+
+def _read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def build_sample_pdf(pages_per_section: int = 4) -> bytes:
+    """章見出しと本文を持つ有価証券報告書風のPDFを生成"""
+    doc = fitz.open()
+    sentence = "当社グループは、外食事業を中心に店舗運営の効率化と人材確保に取り組んでおります。"
+    for index, title in enumerate(SECTIONS, start=1):
+        for page_number in range(pages_per_section):
+            page = doc.new_page()
+            y = 60
+            if page_number == 0:
+                page.insert_text((50, y), f"{index}【{title}】", fontname="japan", fontsize=12)
+                y += 24
+            while y < 800:
+                page.insert_text((50, y), sentence, fontname="japan", fontsize=9)
+                y += 14
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def create_app(latency_ms: float = 0, pdf_bytes: Optional[bytes] = None) -> Starlette:
+    listing_template = _read_fixture("ednr_listing.html")
+    report_template = _read_fixture("ednr_report.html")
+
+    if pdf_bytes is None:
+        recorded = sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.pdf")))
+        if recorded:
+            with open(recorded[0], "rb") as f:
+                pdf_bytes = f.read()
+        else:
+            pdf_bytes = build_sample_pdf()
+    etag = f'"{hashlib.sha256(pdf_bytes).hexdigest()[:16]}"'
+
+    async def delay():
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+    async def listing(request: Request):
+        await delay()
+        code = request.query_params.get("scode", "")
+        return HTMLResponse(listing_template.replace("{code}", code).replace("{company_name}", f"企業{code}"))
+
+    async def disclosure(request: Request):
+        await delay()
+        code = request.query_params.get("scode", "")
+        return HTMLResponse(report_template.replace("{code}", code))
+
+    async def pdf(request: Request):
+        await delay()
+        if request.headers.get("If-None-Match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(pdf_bytes, media_type="application/pdf", headers={"ETag": etag})
+
+    return Starlette(routes=[
+        Route("/nkd/company/ednr/", listing),
+        Route("/nkd/company/ednr/disclosure/", disclosure),
+        Route("/nkd/company/ednr/pdf/{code}/annual.pdf", pdf),
+    ])
+
+
+class _ThreadedServer(uvicorn.Server):
+    def install_signal_handlers(self):
+        # シグナルハンドラーはメインスレッドでしか登録できない
+        pass
+
+
+class FakeNikkeiServer:
+    """別スレッドで動く代替サーバー（port=0 なら空いているポートを使う）"""
+
+    def __init__(self, port: int = 0, latency_ms: float = 0):
+        self._server = _ThreadedServer(uvicorn.Config(
+            create_app(latency_ms), host="127.0.0.1", port=port, log_level="warning"
+        ))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self.base_url = ""
+
+    def start(self):
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("代替サーバーが起動しませんでした")
+            time.sleep(0.05)
+        host, port = self._server.servers[0].sockets[0].getsockname()[:2]
+        self.base_url = f"http://{host}:{port}"
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency_ms), host="127.0.0.1", port=args.port)
@@ -0,0 +1,249 @@
+"""オフライン負荷試験（nikkei.com・Gemini を代替して API を計測）
+
+代替の nikkei サーバーと GenerativeModel を使い、アプリを同一プロセス内
+（ASGI）で呼び出す。シナリオごとに requests/s、p50/p95/p99（/search-company は
+ステージ別も）、ピーク RSS を出力し、benchmarks/results/ に保存して
+前回の結果と比較する。
+
+    python -m benchmarks.load_test [--scenario all] [--concurrency 8] [--requests 200]
+        [--gemini-latency-ms 2000] [--gemini-output-chars 2000] [--nikkei-latency-ms 50]
+        [--cold-summaries]
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+SCENARIOS = ("search", "solutions", "pdf")
+
+PERSONAS = [
+    {"department_name": "店舗運営部", "position_name": "部長", "job_scope": "店舗の運営管理と省人化"},
+    {"department_name": "総務部", "position_name": "課長", "job_scope": "設備管理と衛生管理"},
+    {"department_name": "経営企画部", "position_name": "室長", "job_scope": "中期経営計画の推進"},
+]
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    """最近傍順位法によるパーセンタイル"""
+    ordered = sorted(samples)
+    rank = max(1, -(-int(q * len(ordered) * 100) // 100))
+    return round(ordered[min(rank, len(ordered)) - 1], 2)
+
+
+def _summarize(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    return {
+        "mean": round(statistics.mean(samples), 2),
+        "p50": _percentile(samples, 0.50),
+        "p95": _percentile(samples, 0.95),
+        "p99": _percentile(samples, 0.99),
+        "max": round(max(samples), 2),
+    }
+
+
+def _git_version() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def _peak_rss_mb() -> Dict[str, float]:
+    """ピーク RSS（子プロセスは終了済みのワーカーのうち最大のもの）"""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def _configure_environment(args: argparse.Namespace, nikkei_base_url: str):
+    """アプリの設定はインポート時に読まれるため、インポート前に環境変数で指定する"""
+    os.environ["GOOGLE_API_KEY"] = os.environ.get("GOOGLE_API_KEY") or "benchmark-dummy-key"
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="bench-cache-")
+    os.environ["NIKKEI_BASE_URL"] = nikkei_base_url
+    # 負荷試験ではレート制限・クォータ管理を無効にする
+    os.environ["RATE_LIMIT_PER_MINUTE"] = "0"
+    os.environ["RATE_LIMIT_LOOKUP_PER_MINUTE"] = "0"
+    os.environ["GEMINI_RPM_LIMIT"] = "0"
+    os.environ["GEMINI_TPM_LIMIT"] = "0"
+    if args.cold_summaries:
+        # 保存済み要約を使わず、毎回要約を生成させる
+        os.environ["SUMMARY_TTL_SECONDS"] = "0"
+
+
+async def _run_load(
+    send: Callable[[int], Any],
+    total: int,
+    concurrency: int,
+) -> Tuple[List[float], List[Any], int, float]:
+    """total 件を concurrency 並列で送り、(所要時間, 応答, エラー数, 経過秒) を返す"""
+    latencies: List[float] = []
+    responses: List[Any] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            started_at = time.perf_counter()
+            try:
+                response = await send(index)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started_at) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+            responses.append(response)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latencies, responses, errors, time.perf_counter() - started_at
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    from benchmarks.fake_gemini import FakeGenerativeModel
+    from benchmarks.fake_nikkei import FakeNikkeiServer
+
+    server = FakeNikkeiServer(args.nikkei_port, args.nikkei_latency_ms)
+    server.start()
+    _configure_environment(args, server.base_url)
+
+    import httpx
+    from app.data.company_codes import company_codes
+    from app.main import app
+    from app.services.container import container
+
+    await container.startup()
+    fake_model = FakeGenerativeModel(
+        args.gemini_latency_ms, args.gemini_output_chars, args.gemini_stream_chunks
+    )
+    container.gemini_service.model = fake_model
+    companies = list(company_codes)
+
+    def search(index: int):
+        payload = {"company_name": companies[index % len(companies)], **PERSONAS[index % len(PERSONAS)]}
+        return client.post("/search-company", json=payload)
+
+    def solutions(index: int):
+        return client.get("/solutions")
+
+    def pdf(index: int):
+        return client.post("/pdf/generate-report", json={
+            "company_data": {"company_name": f"bench-{index % 10}", "department_name": "営業部"},
+            "results": {"summary": "要約" * 500, "hypothesis": "仮説" * 300, "matching_result": "提案" * 300},
+            "solutions": [{"name": "空気質監視", "features": "CO2濃度を計測", "use_case": "換気"}] * 5,
+        })
+
+    senders = {"search": search, "solutions": solutions, "pdf": pdf}
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+
+    report: Dict[str, Any] = {
+        "version": _git_version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("compare",)
+        },
+        "scenarios": {},
+    }
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name in scenarios:
+            gemini_calls_before = fake_model.calls
+            latencies, responses, errors, elapsed = await _run_load(
+                senders[name], args.requests, args.concurrency
+            )
+            result: Dict[str, Any] = {
+                "requests": args.requests,
+                "errors": errors,
+                "requests_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0,
+                "latency_ms": _summarize(latencies),
+            }
+            if name == "search":
+                stage_samples: Dict[str, List[float]] = {}
+                failed = 0
+                for response in responses:
+                    body = response.json()
+                    failed += not body.get("success")
+                    for stage, ms in body.get("stage_timings", {}).items():
+                        stage_samples.setdefault(stage, []).append(ms)
+                result["unsuccessful"] = failed
+                result["stages_ms"] = {stage: _summarize(s) for stage, s in stage_samples.items()}
+                result["gemini_calls"] = fake_model.calls - gemini_calls_before
+            report["scenarios"][name] = result
+            print(f"[{name}] {json.dumps(result, ensure_ascii=False)}")
+
+    await container.shutdown()
+    server.stop()
+    report["peak_rss_mb"] = _peak_rss_mb()
+    return report
+
+
+def _save(report: Dict[str, Any]) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(RESULTS_DIR, f"{stamp}_{report['version']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def _compare(report: Dict[str, Any], baseline_path: str):
+    """基準の結果との差分（requests/s と p95/p99）を表示"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\n比較対象: {os.path.basename(baseline_path)} (version {baseline.get('version')})")
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        for label, now, before in [
+            ("req/s", current["requests_per_second"], previous["requests_per_second"]),
+            ("p95", current["latency_ms"].get("p95"), previous["latency_ms"].get("p95")),
+            ("p99", current["latency_ms"].get("p99"), previous["latency_ms"].get("p99")),
+        ]:
+            if now is None or not before:
+                continue
+            change = (now - before) / before * 100
+            print(f"  {name:<10} {label:<6} {before:>10} -> {now:>10} ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=("all",) + SCENARIOS, default="all")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="シナリオごとのリクエスト数")
+    parser.add_argument("--gemini-latency-ms", type=float, default=2000)
+    parser.add_argument("--gemini-output-chars", type=int, default=2000)
+    parser.add_argument("--gemini-stream-chunks", type=int, default=20)
+    parser.add_argument("--nikkei-latency-ms", type=float, default=50)
+    parser.add_argument("--nikkei-port", type=int, default=0, help="代替サーバーのポート（0 なら空きポート）")
+    parser.add_argument("--cold-summaries", action="store_true", help="保存済み要約を使わない")
+    parser.add_argument("--compare", help="比較する結果ファイル（省略時は直前の結果）")
+    parser.add_argument("--no-save", action="store_true", help="結果を保存しない")
+    args = parser.parse_args()
+
+    previous = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")))
+    report = asyncio.run(main(args))
+    print(f"peak RSS (MB): {report['peak_rss_mb']}")
+    if not args.no_save:
+        print(f"保存: {_save(report)}")
+    baseline = args.compare or (previous[-1] if previous else None)
+    if baseline:
+        _compare(report, baseline)
@@ -0,0 +1,60 @@
+"""リクエストごとのサービス生成コストのベンチマーク
+
+従来のリクエスト毎生成（CompanyService() / PDFService()）と、
+起動時に生成したサービスコンテナからの取得を比較する。
+外部通信は行わない（Gemini のモデル生成はローカル処理のみ）。
+
+    python -m benchmarks.service_overhead [--iterations 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-dummy-key")
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="bench-cache-"))
+
+from app.api.dependencies import get_company_service, get_pdf_renderer  # noqa: E402
+from app.services.company_service import CompanyService  # noqa: E402
+from app.services.container import container  # noqa: E402
+from app.services.pdf_service import PDFService  # noqa: E402
+
+
+def _report(label: str, samples_ms):
+    samples_ms = sorted(samples_ms)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1]
+    print(
+        f"{label:<28} mean={statistics.mean(samples_ms):8.3f}ms "
+        f"p50={statistics.median(samples_ms):8.3f}ms p95={p95:8.3f}ms"
+    )
+
+
+async def main(iterations: int):
+    before = []
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        CompanyService()
+        PDFService()
+        before.append((time.perf_counter() - started_at) * 1000)
+
+    await container.startup()
+    after = []
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        await get_company_service()
+        await get_pdf_renderer()
+        after.append((time.perf_counter() - started_at) * 1000)
+    await container.shutdown()
+
+    print(f"iterations: {iterations}")
+    _report("before (per-request)", before)
+    _report("after (service container)", after)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
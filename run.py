@@ -1,17 +1,106 @@
-import uvicorn
+"""サーバーの起動
+
+SERVER_MODE=development（既定）: uvicorn の自動リロード付きで1プロセス起動する。
+SERVER_MODE=production: gunicorn で WEB_CONCURRENCY 個のワーカーを起動する。
+    アプリ（PyMuPDF・reportlab・Gemini SDK などの重いモジュール）は fork 前に
+    一度だけ読み込む。終了時は GRACEFUL_TIMEOUT 秒まで処理中のリクエストを、
+    続けて LLM_DRAIN_SECONDS 秒まで実行中の Gemini 呼び出しの完了を待つ。
+    gunicorn がない環境（Windows など）では uvicorn のマルチプロセス起動を使う
+    （この場合はワーカーごとにアプリを読み込む）。
+"""
 import logging
+import math
+import os
+import shutil
+import uvicorn
 
-# ログ設定
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+from app.config import settings
+from app.utils.logging_config import configure_logging
 
-if __name__ == "__main__":
+# ログ設定（LOG_LEVEL・LOG_FORMAT で変更可能）
+configure_logging()
+
+logger = logging.getLogger(__name__)
+
+# ワーカーの終了処理（プロセスプールの停止など）に見込む秒数
+SHUTDOWN_MARGIN_SECONDS = 10
+
+
+def _prepare_metrics_dir():
+    """全ワーカーのメトリクスを集計するための共有ディレクトリを用意（起動ごとに空にする）
+
+    prometheus_client を読み込む前に環境変数を設定する必要がある。
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.path.join(settings.CACHE_DIR, "prometheus")
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+
+def run_development():
     uvicorn.run(
         "app.main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=settings.HOST,
+        port=settings.PORT,
         reload=True,
         log_level="info"
-    )
\ No newline at end of file
+    )
+
+
+def run_production():
+    _prepare_metrics_dir()
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        logger.warning("gunicorn がインストールされていないため uvicorn のマルチプロセスで起動します")
+        uvicorn.run(
+            "app.main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            workers=settings.WEB_CONCURRENCY,
+            # uvloop・httptools があれば使う
+            loop="auto",
+            http="auto",
+            timeout_graceful_shutdown=settings.GRACEFUL_TIMEOUT,
+            log_level="info"
+        )
+        return
+
+    from app.server import child_exit, server_impl
+
+    loop, http = server_impl()
+    logger.info(
+        f"本番モードで起動 (ワーカー {settings.WEB_CONCURRENCY}, ループ: {loop}, HTTP: {http})"
+    )
+    options = {
+        "bind": f"{settings.HOST}:{settings.PORT}",
+        "workers": settings.WEB_CONCURRENCY,
+        "worker_class": "app.server.ProductionWorker",
+        # fork 前にアプリを読み込み、重いモジュールのメモリをワーカー間で共有する
+        "preload_app": True,
+        # リクエストの完了待ち + Gemini 呼び出しの完了待ち + 終了処理を超えたら強制終了
+        "graceful_timeout": math.ceil(
+            settings.GRACEFUL_TIMEOUT + settings.LLM_DRAIN_SECONDS + SHUTDOWN_MARGIN_SECONDS
+        ),
+        "child_exit": child_exit,
+        "loglevel": "info",
+    }
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+            return app
+
+    Application().run()
+
+
+if __name__ == "__main__":
+    if settings.SERVER_MODE == "production":
+        run_production()
+    else:
+        run_development()
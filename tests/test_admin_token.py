@@ -0,0 +1,22 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import dependencies
+from app.api.dependencies import verify_admin_token
+
+
+def test_admin_api_is_closed_without_configured_token(monkeypatch):
+    monkeypatch.setattr(dependencies.settings, "ADMIN_API_TOKEN", "")
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(verify_admin_token(x_admin_token=None))
+    assert exc_info.value.status_code == 403
+
+
+def test_admin_token_must_match(monkeypatch):
+    monkeypatch.setattr(dependencies.settings, "ADMIN_API_TOKEN", "secret")
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(verify_admin_token(x_admin_token="wrong"))
+    assert exc_info.value.status_code == 403
+    assert asyncio.run(verify_admin_token(x_admin_token="secret")) is True
@@ -0,0 +1,62 @@
+import pytest
+
+from app.services.company_directory import CompanyDirectory, CompanyEntry, normalize_company_name
+
+
+@pytest.mark.parametrize(
+    ("name", "expected"),
+    [
+        ("トヨタ自動車株式会社", "トヨタ自動車"),
+        ("ｿﾆｰｸﾞﾙｰﾌﾟ", "ソニーg"),
+        ("そにーぐるーぷ", "ソニーg"),
+        ("ABC Holdings, Inc.", "abchd"),
+        ("ABC Hldgs.", "abchd"),
+        ("ＡＢＣ　ホールディングス", "abchd"),
+        ("Example Group", "exampleg"),
+        ("Cinco Corp.", "cinco"),
+        # 単語の一部は法人格・表記揺れとして扱わない
+        ("Groupon", "groupon"),
+        ("Incognito", "incognito"),
+        ("Corpus Holdings", "corpushd"),
+    ],
+)
+def test_normalize_company_name(name, expected):
+    assert normalize_company_name(name) == expected
+
+
+@pytest.fixture
+def directory():
+    return CompanyDirectory([
+        CompanyEntry(code="7203", name="トヨタ自動車", kana="トヨタジドウシャ"),
+        CompanyEntry(code="6758", name="ソニーグループ", kana="ソニーグループ"),
+        CompanyEntry(code="7550", name="ゼンショーホールディングス", kana="ゼンショーホールディングス"),
+        CompanyEntry(code="9999", name="Groupon Japan"),
+        CompanyEntry(code="1111", name="サンプル電機"),
+        CompanyEntry(code="2222", name="サンプル電気"),
+    ])
+
+
+def test_resolve_exact_match_ignores_notation(directory):
+    match = directory.resolve("ソニーグループ株式会社")
+    assert (match.code, match.score) == ("6758", 1.0)
+    assert directory.resolve("ゼンショーHD").code == "7550"
+
+
+def test_resolve_unique_prefix(directory):
+    match = directory.resolve("ゼンショー")
+    assert match.code == "7550"
+    assert 0 < match.score < 1
+
+
+def test_resolve_requires_minimum_prefix_length(directory):
+    assert directory.resolve("ゼン", prefix_min_chars=3) is None
+    assert directory.resolve("ゼンショ", prefix_min_chars=3).code == "7550"
+
+
+def test_resolve_ambiguous_name_returns_none(directory):
+    assert directory.resolve("サンプル") is None
+
+
+def test_resolve_does_not_treat_group_substring_as_synonym(directory):
+    assert directory.resolve("Groupon Japan").code == "9999"
+    assert directory.resolve("Japan G") is None
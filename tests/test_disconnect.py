@@ -0,0 +1,77 @@
+import asyncio
+
+from fastapi import FastAPI, Request
+
+from app.api.dependencies import cancel_on_disconnect
+from app.main import RequestMetricsMiddleware, app as main_app
+
+
+def _build_app(events):
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware)
+
+    @app.get("/slow")
+    async def slow(request: Request):
+        async def work():
+            try:
+                await asyncio.sleep(5)
+                events.append("finished")
+            except asyncio.CancelledError:
+                events.append("cancelled")
+                raise
+
+        return await cancel_on_disconnect(request, work(), poll_interval=0.01)
+
+    return app
+
+
+async def _call_then_disconnect(app, path):
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    sent = []
+    # クライアントが途中で接続を切った
+    disconnected = asyncio.Event()
+    asyncio.get_running_loop().call_later(0.05, disconnected.set)
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "client": ("127.0.0.1", 12345),
+        "server": ("testserver", 80),
+    }
+    await asyncio.wait_for(app(scope, receive, send), timeout=3)
+    return sent
+
+
+def test_disconnect_cancels_work_behind_metrics_middleware():
+    events = []
+    sent = asyncio.run(_call_then_disconnect(_build_app(events), "/slow"))
+
+    assert events == ["cancelled"]
+    assert sent[0]["type"] == "http.response.start"
+    assert sent[0]["status"] == 499
+
+
+def test_main_app_has_no_base_http_middleware():
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    assert not any(
+        isinstance(m.cls, type) and issubclass(m.cls, BaseHTTPMiddleware)
+        for m in main_app.user_middleware
+    )
@@ -0,0 +1,51 @@
+import asyncio
+import os
+import sqlite3
+
+from app.models.schemas import CompanySearchRequest, CompanySearchResponse
+from app.services.job_runner import JobRunner
+from app.services.job_store import JOB_SUCCEEDED, JobStore
+
+
+class FakeCompanyService:
+    async def analyze_company(self, request, **kwargs):
+        return CompanySearchResponse(success=True)
+
+
+class LockedOnceJobStore(JobStore):
+    """最初の claim_next だけロック待ちのタイムアウトで失敗する"""
+
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.failed = False
+
+    def claim_next(self, owner, lease_seconds):
+        if not self.failed:
+            self.failed = True
+            raise sqlite3.OperationalError("database is locked")
+        return super().claim_next(owner, lease_seconds)
+
+
+def test_worker_survives_claim_errors(tmp_path):
+    async def main():
+        store = LockedOnceJobStore(os.path.join(tmp_path, "jobs.sqlite3"))
+        runner = JobRunner(store, FakeCompanyService(), workers=1, poll_seconds=0.01)
+        request = CompanySearchRequest(
+            company_name="テスト", department_name="営業", position_name="部長", job_scope="全般"
+        )
+        job_id = await runner.submit(request)
+        runner.start()
+        try:
+            for _ in range(200):
+                job = await runner.get(job_id)
+                if job["status"] == JOB_SUCCEEDED:
+                    break
+                await asyncio.sleep(0.01)
+            return store.failed, job["status"], runner._tasks[0].done()
+        finally:
+            await runner.stop()
+
+    failed, status, worker_done = asyncio.run(main())
+    assert failed
+    assert status == JOB_SUCCEEDED
+    assert not worker_done
@@ -0,0 +1,43 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from app.utils.pdf_cache import PDFCache
+
+
+def _store(cache, url, content):
+    tmp_path = os.path.join(cache.cache_dir, f"{hashlib.md5(url.encode()).hexdigest()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    return cache._store(url, tmp_path, hashlib.sha256(content).hexdigest(), len(content), None, None)
+
+
+def test_pin_is_shared_between_processes(tmp_path):
+    # 同じディレクトリを使う2つのインスタンスで、別のワーカープロセスを模す
+    reader = PDFCache(cache_dir=str(tmp_path), max_bytes=150)
+    writer = PDFCache(cache_dir=str(tmp_path), max_bytes=150)
+
+    async def main():
+        old = _store(writer, "https://example.com/old.pdf", b"a" * 100)
+        async with reader.in_use(old.content_hash):
+            _store(writer, "https://example.com/new.pdf", b"b" * 100)
+            kept = os.path.exists(old.path)
+        return old, kept
+
+    old, kept = asyncio.run(main())
+    assert kept
+    # 読み込みが終わったら延期していた削除を行う
+    assert not os.path.exists(old.path)
+
+
+def test_pin_fails_when_blob_was_already_evicted(tmp_path):
+    cache = PDFCache(cache_dir=str(tmp_path))
+
+    async def main():
+        async with cache.in_use("0" * 64):
+            pass
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(main())
@@ -0,0 +1,29 @@
+import asyncio
+import os
+import signal
+
+from app.services.pdf_renderer import PDFRenderer
+from app.services.report_cache import ReportCache
+
+
+def test_recovers_from_dead_worker(tmp_path):
+    async def main():
+        renderer = PDFRenderer(
+            workers=1,
+            report_cache=ReportCache(str(tmp_path / "reports")),
+            spool_dir=str(tmp_path / "spool"),
+        )
+        await renderer.start()
+        try:
+            # ワーカーが OOM などで落ちた状態にする
+            for process in list(renderer._pool._processes.values()):
+                os.kill(process.pid, signal.SIGKILL)
+                process.join()
+            pdf = await renderer.render_simple_text_pdf("本文", title="テスト")
+            return pdf, renderer.restarts
+        finally:
+            renderer.shutdown()
+
+    pdf, restarts = asyncio.run(main())
+    assert pdf.size > 0
+    assert restarts == 1
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from app.services.llm_executor import LLMExecutor
+from app.services.quota_governor import QuotaGovernor
+from app.utils.resilience import CircuitBreaker, DeadlineExceeded, deadline_scope, wait_with_timeout
+
+
+def test_budget_capped_timeout_is_not_an_upstream_failure():
+    async def main():
+        breaker = CircuitBreaker("test", failure_threshold=1)
+        with deadline_scope(0.05):
+            with pytest.raises(DeadlineExceeded):
+                with breaker.guard():
+                    await wait_with_timeout(lambda: asyncio.sleep(1), 10)
+        return breaker
+
+    breaker = asyncio.run(main())
+    assert breaker.failures == 0
+    assert breaker.state == "closed"
+
+
+def test_call_timeout_is_an_upstream_failure():
+    async def main():
+        breaker = CircuitBreaker("test", failure_threshold=1)
+        with pytest.raises(asyncio.TimeoutError):
+            with breaker.guard():
+                await wait_with_timeout(lambda: asyncio.sleep(1), 0.05)
+        return breaker
+
+    breaker = asyncio.run(main())
+    assert breaker.failures == 1
+    assert breaker.state == "open"
+
+
+def test_failed_attempts_release_quota():
+    class FlakyModel:
+        calls = 0
+
+        def generate_content(self, prompt, **kwargs):
+            FlakyModel.calls += 1
+            if FlakyModel.calls < 3:
+                raise google_exceptions.ServiceUnavailable("unavailable")
+            return type("Response", (), {"text": "ok"})()
+
+    async def main():
+        quota = QuotaGovernor(requests_per_minute=100, tokens_per_minute=100000)
+        executor = LLMExecutor(quota=quota)
+        try:
+            response = await executor.generate(FlakyModel(), "prompt")
+        finally:
+            executor.shutdown()
+        return response, quota.stats()
+
+    response, stats = asyncio.run(main())
+    assert response.text == "ok"
+    assert FlakyModel.calls == 3
+    assert stats["requests_last_minute"] == 1
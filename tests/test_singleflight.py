@@ -0,0 +1,87 @@
+import asyncio
+
+from app.utils.singleflight import SingleFlight
+
+
+def test_coalesces_concurrent_calls():
+    async def main():
+        flight = SingleFlight("test")
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(3)))
+        return results, calls, flight.in_flight
+
+    results, calls, in_flight = asyncio.run(main())
+    assert results == ["done"] * 3
+    assert calls == 1
+    assert in_flight == 0
+
+
+def test_keeps_running_while_other_waiters_remain():
+    async def main():
+        flight = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.create_task(flight.do("key", work))
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_cancels_work_when_last_waiter_is_cancelled():
+    async def main():
+        flight = SingleFlight("test")
+        events = []
+
+        async def work():
+            events.append("started")
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                events.append("cancelled")
+                raise
+            events.append("finished")
+
+        waiter = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        return events, flight.in_flight
+
+    events, in_flight = asyncio.run(main())
+    assert events == ["started", "cancelled"]
+    assert in_flight == 0
+
+
+def test_new_call_after_cancellation_starts_fresh_work():
+    async def main():
+        flight = SingleFlight("test")
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return calls
+
+        waiter = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        result = await flight.do("key", work)
+        return result, calls
+
+    assert asyncio.run(main()) == (2, 2)